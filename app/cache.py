@@ -0,0 +1,389 @@
+"""
+Read-through cache for scripture content.
+
+Sutra text and its translations change rarely, so GET handlers serve them from
+`content_cache` and only query the database on a miss. Entries are keyed by a
+tuple `(project, chapter, number, kind, *variant)`, e.g.
+`("isha", 1, 3, "meaning", "en")`, and hold the JSON-ready response body.
+
+Writes invalidate by key prefix: a meaning update drops every
+`(project, chapter, number, "meaning", ...)` entry, a sutra update drops every
+entry of the verse and a project deletion drops the whole project.
+
+A miss is loaded outside of any lock, so a write may invalidate the key while
+the old row is being read. Each invalidation stamps its prefix; readers take
+the `generation` of the key (the stamps of its prefixes) before loading and
+pass it to `set`, which drops the value if the key was invalidated meanwhile.
+
+The backend is selected with `settings.cache_backend`:
+
+* `memory`: a per-process LRU cache. Only correct with a single worker.
+* `redis`: entries are shared between workers through a Redis server. Each
+  worker keeps a short-lived local copy of hot entries, and invalidations are
+  published on a pub/sub channel so every worker drops the same keys.
+"""
+
+import abc
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Callable, Hashable, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(*parts: Any) -> tuple:
+    """
+    Build a cache key, reducing enums to their values so that equal keys hash alike.
+    """
+    return tuple(part.value if isinstance(part, Enum) else part for part in parts)
+
+
+def invalidated_within(generation: tuple, seconds: float) -> bool:
+    """
+    Whether the generation of a key records an invalidation less than `seconds` ago.
+    """
+    return any(stamp is not None and float(stamp) > time.time() - seconds for stamp in generation)
+
+
+class CacheBackend(abc.ABC):
+    """
+    Interface of the content cache. Values must be JSON serializable.
+    """
+
+    @abc.abstractmethod
+    def get(self, key: tuple) -> Optional[Any]:
+        ...
+
+    @abc.abstractmethod
+    def set(self, key: tuple, value: Any, generation: Optional[tuple] = None) -> None:
+        """
+        Store `value`, unless `generation` is given and `key` was invalidated since it was taken.
+        """
+
+    @abc.abstractmethod
+    def generation(self, key: tuple) -> tuple:
+        """
+        The invalidation stamps of the prefixes of `key`, to take before loading its value.
+        """
+
+    @abc.abstractmethod
+    def invalidate(self, *prefix: Hashable) -> None:
+        """
+        Drop every entry whose key starts with `prefix`.
+        """
+
+    @property
+    @abc.abstractmethod
+    def invalidated_at(self) -> float:
+        """
+        Time of the last invalidation made or received by this process, 0 if none.
+        """
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abc.abstractmethod
+    def stats(self) -> dict:
+        ...
+
+    def get_or_load(self, key: tuple, loader: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for `key`, calling `loader` and caching its result on a miss.
+        Exceptions raised by `loader` (e.g. 404 responses) are not cached.
+        """
+        value = self.get(key)
+        if value is None:
+            generation = self.generation(key)
+            value = loader()
+            self.set(key, value, generation)
+        return value
+
+
+class MemoryCache(CacheBackend):
+    """
+    In-process LRU cache bounded by the total size of the serialized values,
+    with a time-to-live per entry.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, tuple[float, int, Any]] = OrderedDict()
+        self._stamps: dict[tuple, float] = {}  # prefix -> time of its last invalidation
+        self._invalidated_at = 0.0
+        self._bytes = 0
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def _drop(self, key: tuple) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key: tuple) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self._drop(key)
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry[2]
+
+    def _generation(self, key: tuple) -> tuple:
+        return tuple(self._stamps.get(key[:length]) for length in range(len(key) + 1))
+
+    def generation(self, key: tuple) -> tuple:
+        key = content_key(*key)
+        with self._lock:
+            return self._generation(key)
+
+    def set(self, key: tuple, value: Any, generation: Optional[tuple] = None) -> None:
+        size = len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and self._generation(key) != generation: return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+
+    def invalidate(self, *prefix: Hashable) -> None:
+        prefix = content_key(*prefix)
+        now = time.time()
+        with self._lock:
+            for key in [key for key in self._entries if key[: len(prefix)] == prefix]:
+                self._drop(key)
+                self._counters["invalidations"] += 1
+            # A stamp older than the TTL only matters to a load that started before it; forgetting
+            # it changes the generation of such a load, which then is not stored
+            self._stamps = {stamped: at for stamped, at in self._stamps.items() if at > now - self.ttl}
+            self._stamps[prefix] = self._invalidated_at = now
+
+    @property
+    def invalidated_at(self) -> float:
+        return self._invalidated_at
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                **self._counters,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache shared by all workers through a Redis server.
+
+    Values are stored as JSON under `{namespace}:{key}`. Every key is also added
+    to one tag set per prefix of the key, so that `invalidate` can find the keys
+    of a prefix without scanning the keyspace; it reads and deletes them in a
+    WATCH/MULTI transaction, so an entry stored meanwhile cannot outlive it.
+    The invalidation stamps are kept in Redis under `{namespace}:stamp:{prefix}`,
+    and a `set` with a generation WATCHes them. A `MemoryCache` in front of Redis
+    serves hot entries without a round-trip; after an invalidation the prefix is
+    published on `{namespace}:invalidate` and every worker drops it from its
+    local copy.
+
+    Redis errors are logged and treated as misses, so an unavailable server
+    degrades to database reads instead of failing requests.
+    """
+
+    def __init__(self, url: str, namespace: str, ttl: float, local_max_bytes: int, local_ttl: float):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.channel = f"{namespace}:invalidate"
+        self.local = MemoryCache(max_bytes=local_max_bytes, ttl=local_ttl)
+        self.subscribed = threading.Event()
+        self._id = uuid.uuid4().hex
+        import redis  # Only needed with this backend
+
+        self._redis = redis.Redis.from_url(url, socket_timeout=5, socket_connect_timeout=5)
+        self._errors = redis.exceptions
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "errors": 0, "invalidations": 0}
+        self._closed = threading.Event()
+        self._pubsub = None
+        self._listener = threading.Thread(target=self._listen, name="cache-invalidation", daemon=True)
+        self._listener.start()
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[counter] += amount
+
+    def _key(self, key: tuple) -> str:
+        return f"{self.namespace}:{json.dumps(list(key), ensure_ascii=False, separators=(',', ':'))}"
+
+    def _tag(self, prefix: tuple) -> str:
+        # The trailing "*" keeps tag names disjoint from entry names
+        return self._key(prefix)[:-1] + ",*]" if prefix else f"{self.namespace}:[*]"
+
+    def _stamp(self, prefix: tuple) -> str:
+        return f"{self.namespace}:stamp:{json.dumps(list(prefix), ensure_ascii=False, separators=(',', ':'))}"
+
+    def _stamps(self, key: tuple) -> list[str]:
+        return [self._stamp(key[:length]) for length in range(len(key) + 1)]
+
+    def get(self, key: tuple) -> Optional[Any]:
+        key = content_key(*key)
+        value = self.local.get(key)
+        if value is not None:
+            self._count("hits")
+            return value
+        generation = self.local.generation(key)
+        try:
+            raw = self._redis.get(self._key(key))
+        except self._errors.RedisError as error:
+            logger.warning("cache read failed: %s", error)
+            self._count("errors")
+            raw = None
+        if raw is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        value = json.loads(raw)
+        self.local.set(key, value, generation)
+        return value
+
+    def generation(self, key: tuple) -> tuple:
+        try:
+            return tuple(self._redis.mget(self._stamps(content_key(*key))))
+        except self._errors.RedisError as error:
+            logger.warning("cache read failed: %s", error)
+            self._count("errors")
+            return ()  # Matches no generation: the loaded value is not stored
+
+    def set(self, key: tuple, value: Any, generation: Optional[tuple] = None) -> None:
+        key = content_key(*key)
+        name, local_generation = self._key(key), self.local.generation(key)
+        try:
+            # In one transaction, so an invalidation sees the entry together with its tags
+            with self._redis.pipeline() as pipe:
+                if generation is not None:
+                    pipe.watch(*self._stamps(key))
+                    if tuple(pipe.mget(self._stamps(key))) != generation: return
+                    pipe.multi()
+                pipe.set(name, json.dumps(value, ensure_ascii=False), ex=int(self.ttl))
+                for length in range(len(key) + 1):
+                    tag = self._tag(key[:length])
+                    pipe.sadd(tag, name)
+                    pipe.expire(tag, int(self.ttl))
+                pipe.execute()
+        except self._errors.WatchError:
+            return  # Invalidated while being stored
+        except self._errors.RedisError as error:
+            logger.warning("cache write failed: %s", error)
+            self._count("errors")
+            if generation is not None: return
+        self.local.set(key, value, local_generation)
+
+    def invalidate(self, *prefix: Hashable) -> None:
+        prefix = content_key(*prefix)
+        self.local.invalidate(*prefix)
+        tag = self._tag(prefix)
+        message = json.dumps({"sender": self._id, "prefix": list(prefix)})
+
+        def drop(pipe) -> set:
+            # Retried by `transaction` if a `set` adds to the tag between the read and the delete
+            names = pipe.smembers(tag)
+            pipe.multi()
+            if names: pipe.delete(*names)
+            pipe.delete(tag)
+            pipe.set(self._stamp(prefix), time.time(), ex=int(self.ttl))
+            pipe.publish(self.channel, message)
+            return names
+
+        try:
+            names = self._redis.transaction(drop, tag, value_from_callable=True)
+            self._count("invalidations", len(names))
+        except self._errors.RedisError as error:
+            logger.warning("cache invalidation failed: %s", error)
+            self._count("errors")
+
+    @property
+    def invalidated_at(self) -> float:
+        # Invalidations of the other workers reach the local copy through the channel
+        return self.local.invalidated_at
+
+    def clear(self) -> None:
+        self.invalidate()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        return {"backend": "redis", **counters, "local": self.local.stats()}
+
+    def _on_message(self, message: dict) -> None:
+        payload = json.loads(message["data"])
+        if payload["sender"] != self._id:
+            self.local.invalidate(*payload["prefix"])
+
+    def _listen(self) -> None:
+        while not self._closed.is_set():
+            try:
+                self._pubsub = self._redis.pubsub()
+                self._pubsub.subscribe(self.channel)
+                while not self._closed.is_set():
+                    message = self._pubsub.get_message(timeout=1.0)
+                    if message is None: continue
+                    if message["type"] == "message": self._on_message(message)
+                    elif message["type"] == "subscribe":
+                        # Invalidations published while disconnected were missed
+                        self.local.clear()
+                        self.subscribed.set()
+            except (self._errors.RedisError, OSError, ValueError) as error:
+                if self._closed.is_set(): return
+                logger.warning("cache invalidation channel lost: %s", error)
+            self.subscribed.clear()
+            self._closed.wait(1)
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._pubsub is not None: self._pubsub.close()
+        self._redis.close()
+
+
+def create_cache() -> CacheBackend:
+    """
+    Build the content cache selected by the settings.
+    """
+    if settings.cache_backend == "redis":
+        return RedisCache(
+            url=settings.redis_url,
+            namespace=settings.cache_namespace,
+            ttl=settings.content_cache_ttl_seconds,
+            local_max_bytes=settings.content_cache_max_bytes,
+            local_ttl=settings.content_cache_local_ttl_seconds,
+        )
+    return MemoryCache(
+        max_bytes=settings.content_cache_max_bytes,
+        ttl=settings.content_cache_ttl_seconds,
+    )
+
+
+content_cache: CacheBackend = create_cache()
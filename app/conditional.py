@@ -0,0 +1,87 @@
+"""
+HTTP validators and conditional GET handling.
+
+Content responses carry a strong `ETag` derived from the (table, id, version,
+updated_at) of the rows they are built from, a `Last-Modified` date when it is known, and
+the `Cache-Control` policy from the settings. Requests whose `If-None-Match`
+(or, without it, `If-Modified-Since`) matches are answered with
+304 Not Modified from the validators alone, before the rows are serialized.
+"""
+
+import hashlib
+from datetime import UTC, datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, NamedTuple, Optional
+
+from fastapi import Request, Response, status
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+
+
+def http_date(value: datetime) -> str:
+    # Naive datetimes from the database are UTC
+    return format_datetime(value.replace(tzinfo=UTC), usegmt=True)
+
+
+class Validators(NamedTuple):
+    etag: str
+    last_modified: Optional[str] = None  # HTTP-date
+
+
+def row_validators(*rows: Any, last_modified: bool = True) -> Validators:
+    """
+    Compute the validators of a response built from `rows`.
+
+    Parameters:
+        rows: ORM rows with `id`, `version` and `updated_at` attributes.
+        last_modified (bool): Whether to emit Last-Modified. Responses that
+            aggregate collections should pass False, since removing a row from
+            the collection does not move the newest modification time.
+    """
+    # updated_at tells apart a row recreated under the id of a deleted one (tables created
+    # before AUTOINCREMENT on SQLite); both start at version 1
+    versions = ";".join(f"{row.__tablename__}:{row.id}:{row.version}:{row.updated_at}" for row in rows)
+    etag = '"' + hashlib.sha256(versions.encode("utf-8")).hexdigest()[:32] + '"'
+    dates = [row.updated_at for row in rows if row.updated_at is not None]
+    if not last_modified or not dates or len(dates) < len(rows):
+        return Validators(etag)
+    return Validators(etag, http_date(max(dates)))
+
+
+def is_not_modified(request: Request, validators: Validators) -> bool:
+    """
+    Evaluate If-None-Match, or If-Modified-Since when no If-None-Match is sent (RFC 9110 13.2.2).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*": return True
+        # Weak comparison: a W/ prefix sent back by an intermediary still matches
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return validators.etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or validators.last_modified is None: return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return parsedate_to_datetime(validators.last_modified) <= since
+
+
+def validator_headers(validators: Validators) -> dict:
+    headers = {"ETag": validators.etag, "Cache-Control": settings.content_cache_control}
+    if validators.last_modified: headers["Last-Modified"] = validators.last_modified
+    return headers
+
+
+def not_modified_response(validators: Validators) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validator_headers(validators))
+
+
+def conditional_response(request: Request, validators: Validators, body: Any) -> Response:
+    """
+    Answer 304 if the client's copy is current, the JSON body otherwise.
+    """
+    if is_not_modified(request, validators): return not_modified_response(validators)
+    return JSONResponse(body, headers=validator_headers(validators))
+
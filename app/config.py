@@ -11,16 +11,75 @@ class Settings(BaseSettings):
     db_url: str
     test_db_url: str
 
+    # Read replicas (comma-separated URLs) serving the GET handlers; writes always go to db_url
+    db_replica_urls: str = ""
+    db_replica_selection: Literal["round_robin", "least_connections"] = "round_robin"
+    # Reads of a client that just wrote go to the primary for this many seconds
+    db_read_your_writes_seconds: int = 10
+
+    # Connection pool, applied to the sync and the async engine
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30  # Seconds to wait for a connection before failing
+    db_pool_recycle: int = 1800  # Seconds; keep below MySQL's wait_timeout, -1 disables
+    db_pool_pre_ping: bool = True
+
     # JWT Config
     secret_key: str
     algorithm: str
     access_token_expire_minutes: int
     refresh_token_expire_minutes: int
+    # Tokens are trusted on their signed claims; enable to also check that the
+    # user still exists and is still an admin, through a short-lived cache
+    auth_verify_user: bool = False
+    auth_user_cache_ttl_seconds: int = 30
+
+    # Password hashing
+    bcrypt_rounds: int = 12  # Existing hashes with another cost are rehashed on login
+    password_hash_workers: int = 2
+    password_hash_queue_size: int = 32  # Queued + running hashes; more are rejected with 503
 
     # Environment
     env: Literal["development", "production"]
     cors_origins: str
 
+    # Pagination
+    count_cache_ttl_seconds: int = 60
+
+    # Projects
+    # Lifetime of the per-worker map of project names to ids; changes made
+    # through another worker are seen after at most this delay
+    project_registry_ttl_seconds: int = 60
+
+    # Content cache
+    # "memory" is per process; use "redis" when running several workers
+    cache_backend: Literal["memory", "redis"] = "memory"
+    redis_url: str = "redis://localhost:6379/0"
+    cache_namespace: str = "upanishads"
+    content_cache_max_bytes: int = 64 * 1024 * 1024
+    content_cache_ttl_seconds: int = 3600
+    # Lifetime of the per-worker copy of shared entries, bounds staleness if an invalidation is missed
+    content_cache_local_ttl_seconds: int = 60
+    # Cache-Control of content responses; clients revalidate with ETag / If-None-Match
+    content_cache_control: str = "public, max-age=60"
+
+    # Audio
+    audio_max_upload_bytes: int = 500 * 1024 * 1024
+    # Content-addressed store of the recordings, served under /static
+    audio_store_dir: str = "static/audio"
+    # Cache-Control of streamed audio: revalidated with the content hash ETag,
+    # except on URLs pinned with ?v=<sha256>, whose content never changes
+    audio_cache_control: str = "public, no-cache"
+    audio_immutable_cache_control: str = "public, max-age=31536000, immutable"
+    # Low/medium/high bitrate variants are encoded in the background with ffmpeg
+    audio_transcode_enabled: bool = True
+    ffmpeg_path: str = "ffmpeg"
+    audio_transcode_workers: int = 1
+    audio_transcode_timeout_seconds: int = 600  # Per variant
+    ffprobe_path: str = "ffprobe"
+    # Waveform resolution stored per recording
+    audio_peaks_count: int = 1000
+
     # Configuration for Pydantic Settings
     # The env_file parameter specifies the .env file to load the environment variables from
     model_config = SettingsConfigDict(env_file=".env")
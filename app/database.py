@@ -1,14 +1,36 @@
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
+from app.cache import content_cache
 from app.config import settings
+from app.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+from app.replicas import ReadRouter
 
 # Retrieve the database URL from the settings
 SQLALCHEMY_DATABASE_URL = settings.db_url
 
+
+def pool_options(name: str) -> dict:
+    """
+    Connection pool arguments of create_engine / create_async_engine, from the settings.
+    """
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        # Recycle connections before MySQL's wait_timeout closes them server-side
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        # Name under which the pool reports to /metrics/pool
+        "pool_logging_name": name,
+    }
+
+
 # Create an SQLAlchemy engine instance
 # The engine is responsible for connecting to the database and managing the connection pool
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=InstrumentedQueuePool, **pool_options("primary"))
 
 # Create a configured "Session" class
 # SessionLocal will be a factory for new Session objects
@@ -16,6 +38,39 @@ engine = create_engine(SQLALCHEMY_DATABASE_URL)
 # autoflush=False prevents automatic flushing of the session (committing changes to the database)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async drivers used by the read paths, by sync dialect
+ASYNC_DRIVERS = {"mysql": "aiomysql", "sqlite": "aiosqlite"}
+
+
+def to_async_url(url: str) -> str:
+    """
+    Return the URL of the same database with the async driver of its dialect,
+    e.g. mysql+pymysql://... -> mysql+aiomysql://...
+    """
+    url = make_url(url)
+    return url.set(drivername=f"{url.get_backend_name()}+{ASYNC_DRIVERS[url.get_backend_name()]}").render_as_string(hide_password=False)
+
+
+# Async engine and sessions for the GET handlers, so concurrent readers are not
+# bounded by the threadpool that runs sync handlers. Writes still use SessionLocal.
+async_engine = create_async_engine(
+    to_async_url(SQLALCHEMY_DATABASE_URL), poolclass=InstrumentedAsyncQueuePool, **pool_options("primary_async")
+)
+
+# expire_on_commit=False: attributes of returned rows must stay loaded, lazy loads are not allowed in async code
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Read replicas for the async read paths; without any, reads go to the primary
+replica_engines = [
+    create_async_engine(to_async_url(url.strip()), poolclass=InstrumentedAsyncQueuePool, **pool_options(f"replica{index}_async"))
+    for index, url in enumerate(settings.db_replica_urls.split(","))
+    if url.strip()
+]
+read_router = ReadRouter(
+    async_engine, replica_engines, settings.db_replica_selection,
+    lag=settings.db_read_your_writes_seconds, written_at=lambda: content_cache.invalidated_at,
+)
+
 # Create a base class for our declarative models to inherit from
 # This will allow SQLAlchemy to keep track of our models and their mappings to the database tables
 Base = declarative_base()
@@ -30,3 +85,10 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Dependency to get an async session object, for the read-only handlers
+# The session is opened on a replica unless the client or, for content, anyone has just written (see app.replicas)
+async def get_async_db(request: Request):
+    async with read_router.session(request) as db:
+        yield db
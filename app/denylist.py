@@ -0,0 +1,72 @@
+"""
+Revocation list of JWTs, keyed by their `jti` claim.
+
+Tokens are verified from their signature alone, so a token stays valid until it
+expires unless its `jti` is listed here. Entries only need to live as long as
+the token they revoke. With `settings.cache_backend == "redis"` the list is
+shared by all workers; the in-memory list is per process and lost on restart.
+"""
+
+import threading
+import time
+
+from app.config import settings
+
+
+class MemoryDenylist:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revoked: dict[str, float] = {}  # jti -> expiry timestamp of the token
+
+    def revoke(self, jti: str, expires_at: float) -> None:
+        now = time.time()
+        with self._lock:
+            # Drop entries of tokens that have expired anyway
+            for expired in [key for key, expiry in self._revoked.items() if expiry <= now]:
+                del self._revoked[expired]
+            if expires_at > now: self._revoked[jti] = expires_at
+
+    def is_revoked(self, jti: str) -> bool:
+        with self._lock:
+            expiry = self._revoked.get(jti)
+        return expiry is not None and expiry > time.time()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._revoked.clear()
+
+
+class RedisDenylist:
+    """
+    Denylist shared through Redis. Lookups fail (and the token is rejected)
+    when Redis is unreachable.
+    """
+
+    def __init__(self, url: str, namespace: str):
+        import redis  # Only needed with this backend
+
+        self.namespace = namespace
+        self._redis = redis.Redis.from_url(url, socket_timeout=5, socket_connect_timeout=5)
+
+    def _key(self, jti: str) -> str:
+        return f"{self.namespace}:revoked:{jti}"
+
+    def revoke(self, jti: str, expires_at: float) -> None:
+        ttl = int(expires_at - time.time()) + 1
+        if ttl > 0: self._redis.set(self._key(jti), 1, ex=ttl)
+
+    def is_revoked(self, jti: str) -> bool:
+        return bool(self._redis.exists(self._key(jti)))
+
+    def clear(self) -> None:
+        for key in self._redis.scan_iter(self._key("*")):
+            self._redis.delete(key)
+
+
+def create_denylist():
+    if settings.cache_backend == "redis":
+        return RedisDenylist(settings.redis_url, settings.cache_namespace)
+    return MemoryDenylist()
+
+
+token_denylist = create_denylist()
@@ -113,3 +113,15 @@ def server_error_response(
     Helper function to raise a 500 Internal Server Error response.
     """
     error_response(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=error)
+
+
+def service_unavailable_error_response(detail: Optional[str] = None, retry_after: int = 1) -> None:
+    """
+    Helper function to raise a 503 Service Unavailable error response, asking the client to retry later.
+    """
+    message = detail or "The server is busy, please retry shortly."
+    error_response(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=message,
+        headers={"Retry-After": str(retry_after)},
+    )
@@ -0,0 +1,78 @@
+"""
+Password hashing on a dedicated, bounded worker pool.
+
+bcrypt costs hundreds of milliseconds of CPU per call by design. Hashes are
+computed on `password_hash_workers` threads (bcrypt releases the GIL), so a
+burst of logins uses at most that many cores instead of every threadpool
+thread of the worker. At most `password_hash_queue_size` calls may be queued
+or running; further calls are rejected with 503 and a Retry-After header
+rather than piling up behind the queue.
+
+The request handlers are async and await the `*_async` methods, so a request
+waiting for its hash holds neither the event loop nor a threadpool thread.
+
+The cost factor is `settings.bcrypt_rounds`. Hashes made with another cost are
+reported by `needs_rehash` so that login can upgrade them transparently.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+import bcrypt
+
+from app.config import settings
+from app.errors import service_unavailable_error_response
+
+T = TypeVar("T")
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, queue_size: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(queue_size)
+
+    def _submit(self, fn: Callable[..., T], *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            service_unavailable_error_response("Too many concurrent authentication requests, please retry shortly.")
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _run(self, fn: Callable[..., T], *args) -> T:
+        return self._submit(fn, *args).result()
+
+    def hash(self, plain_password: str) -> str:
+        salt = bcrypt.gensalt(rounds=settings.bcrypt_rounds)
+        return self._run(bcrypt.hashpw, plain_password.encode("utf-8"), salt).decode("utf-8")
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._run(bcrypt.checkpw, plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+
+    async def hash_async(self, plain_password: str) -> str:
+        salt = bcrypt.gensalt(rounds=settings.bcrypt_rounds)
+        future = self._submit(bcrypt.hashpw, plain_password.encode("utf-8"), salt)
+        return (await asyncio.wrap_future(future)).decode("utf-8")
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        future = self._submit(bcrypt.checkpw, plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+        return await asyncio.wrap_future(future)
+
+    @staticmethod
+    def needs_rehash(hashed_password: str) -> bool:
+        # bcrypt hashes read $2b$<cost>$<salt and hash>
+        try:
+            return int(hashed_password.split("$")[2]) != settings.bcrypt_rounds
+        except (IndexError, ValueError):
+            return True
+
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    queue_size=settings.password_hash_queue_size,
+)
@@ -0,0 +1,257 @@
+"""
+Bulk import of a project's sutras and their translations.
+
+A bundle holds sutras with their meanings, transliterations, interpretations
+and bhashyams, in one of three formats:
+
+* `ndjson`: one sutra per line, shaped like `/sutras/{project}/{chapter}/{no}/full`
+  (and like the lines of `/export`, so an export can be imported again).
+* `json`: an array of the same objects.
+* `csv`: one text per row, with the columns `chapter, number, kind, language,
+  philosophy, text`, where `kind` is `sutra`, `meaning`, `transliteration`,
+  `interpretation` or `bhashyam`.
+
+Records are validated in batches with the API schemas, and nothing is written
+unless the whole bundle is valid. Rows are then upserted with multi-row
+`INSERT ... ON CONFLICT/DUPLICATE KEY UPDATE` statements on the unique content
+indexes, in a single transaction: existing texts are replaced (and their
+version bumped), others are kept. The search index and the statistics of the
+touched chapters are then brought up to date. Import from the command line with:
+
+    python -m app.ingest <project> <bundle> [--format csv|json|ndjson]
+"""
+
+import argparse
+import csv
+import json
+from typing import IO, Any, Iterable, Iterator, Literal, Optional
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import Connection, case, or_, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.cache import content_cache
+from app.isha import models, schemas
+from app.isha.models import utcnow
+from app.isha.search import index_entity
+from app.isha.stats import refresh_chapter
+from app.pagination import count_cache
+from app.registry import project_registry
+
+Format = Literal["csv", "json", "ndjson"]
+
+VALIDATION_BATCH_SIZE = 500
+UPSERT_CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 20
+
+# Collection of SutraImport -> (model, unique key columns besides sutra_id)
+CONTENT = {
+    "meanings": (models.Meaning, ("language",)),
+    "transliterations": (models.Transliteration, ("language",)),
+    "interpretations": (models.Interpretation, ("language", "philosophy")),
+    "bhashyams": (models.Bhashyam, ("language", "philosophy")),
+}
+
+# Search index kind of each collection
+INDEX_KINDS = {"meanings": "meaning", "transliterations": "transliteration", "interpretations": "interpretation", "bhashyams": "bhashyam"}
+
+
+class BundleError(ValueError):
+    """
+    The bundle cannot be imported; `errors` describes the offending records.
+    """
+
+    def __init__(self, errors: list[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def guess_format(filename: Optional[str]) -> Format:
+    suffix = (filename or "").rsplit(".", 1)[-1].lower()
+    if suffix in ("csv", "json", "ndjson"): return suffix
+    if suffix == "jsonl": return "ndjson"
+    raise BundleError([f"Cannot tell the format of {filename!r}, pass one of csv, json, ndjson"])
+
+
+def read_records(stream: IO[str], format: Format) -> Iterator[dict]:
+    """
+    Yield the raw sutra records of a bundle.
+    """
+    if format == "ndjson":
+        for line_no, line in enumerate(stream, 1):
+            if not line.strip(): continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as error:
+                raise BundleError([f"line {line_no}: {error}"])
+    elif format == "json":
+        try:
+            records = json.load(stream)
+        except json.JSONDecodeError as error:
+            raise BundleError([str(error)])
+        if not isinstance(records, list): raise BundleError(["a JSON bundle must be an array of sutras"])
+        yield from records
+    else:
+        # Group the rows of each sutra, in order of first appearance
+        grouped: dict[tuple, dict] = {}
+        for row_no, row in enumerate(csv.DictReader(stream), 2):
+            key = (row.get("chapter"), row.get("number"))
+            record = grouped.setdefault(key, {"chapter": key[0], "number": key[1]})
+            kind = (row.get("kind") or "").strip()
+            if kind == "sutra":
+                record["text"] = row.get("text")
+                continue
+            if kind + "s" not in CONTENT: raise BundleError([f"row {row_no}: unknown kind {kind!r}"])
+            entry = {"language": row.get("language"), "text": row.get("text")}
+            if row.get("philosophy"): entry["philosophy"] = row["philosophy"]
+            record.setdefault(kind + "s", []).append(entry)
+        yield from grouped.values()
+
+
+def validate(records: Iterable[Any]) -> list[schemas.SutraImport]:
+    """
+    Validate the records in batches. Raises BundleError listing the first invalid ones.
+    """
+    adapter = TypeAdapter(list[schemas.SutraImport])
+    valid, errors, batch, start = [], [], [], 0
+
+    def flush():
+        try:
+            valid.extend(adapter.validate_python(batch))
+        except ValidationError as error:
+            for detail in error.errors():
+                index, *location = detail["loc"]
+                errors.append(f"record {start + index + 1}, {'.'.join(map(str, location)) or 'record'}: {detail['msg']}")
+
+    for record in records:
+        batch.append(record)
+        if len(batch) == VALIDATION_BATCH_SIZE:
+            flush()
+            start, batch = start + len(batch), []
+    if batch: flush()
+    if errors: raise BundleError(errors[:MAX_REPORTED_ERRORS])
+    return valid
+
+
+def chunks(rows: list, size: int = UPSERT_CHUNK_SIZE) -> Iterator[list]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def upsert(connection: Connection, model, rows: list[dict], keys: tuple[str, ...], columns: tuple[str, ...] = ("text",)) -> None:
+    """
+    Insert `rows`, updating `columns` of the rows that already exist under the unique `keys`.
+    """
+    table = model.__table__
+    dialect = connection.dialect.name
+    insert = {"mysql": mysql.insert, "postgresql": postgresql.insert}.get(dialect, sqlite.insert)
+    now = utcnow()
+    for chunk in chunks([{**row, "version": 1, "updated_at": now} for row in rows]):
+        statement = insert(table).values(chunk)
+        new = statement.inserted if dialect == "mysql" else statement.excluded
+        changed = or_(*[table.c[column] != new[column] for column in columns])
+        # Version and date first: MySQL evaluates the assignments in order
+        updates = [
+            ("version", case((changed, table.c.version + 1), else_=table.c.version)),
+            ("updated_at", case((changed, now), else_=table.c.updated_at)),
+            *[(column, new[column]) for column in columns],
+        ]
+        if dialect == "mysql":
+            statement = statement.on_duplicate_key_update(updates)
+        else:
+            statement = statement.on_conflict_do_update(index_elements=list(keys), set_=dict(updates))
+        connection.execute(statement)
+
+
+def reindex(db: Session, kind: str, model, column, ids: list[int]) -> None:
+    # Core statements bypass the mapper events that maintain the search index
+    connection = db.connection()
+    for chunk in chunks(ids):
+        for row in db.scalars(select(model).where(column.in_(chunk))).all():
+            index_entity(connection, kind, row)
+        db.expunge_all()
+
+
+def import_bundle(db: Session, project_name: str, records: list[schemas.SutraImport]) -> schemas.ImportResult:
+    """
+    Upsert validated records into a project in one transaction.
+    """
+    project = project_registry.get(project_name, db)
+    if project is None: raise LookupError(f"Project {project_name} not found")
+    project_id = project.id
+
+    # A sutra listed twice is imported once, with its last texts
+    sutras = {(record.chapter, record.number): record for record in records}
+    connection = db.connection()
+    texts = [
+        {"project_id": project_id, "chapter": chapter, "number": number, "text": record.text}
+        for (chapter, number), record in sutras.items() if record.text is not None
+    ]
+    upsert(connection, models.Sutra, texts, ("project_id", "chapter", "number"))
+
+    ids = {}
+    for chapter_numbers in chunks(list({chapter for chapter, _ in sutras})):
+        rows = db.execute(
+            select(models.Sutra.id, models.Sutra.chapter, models.Sutra.number)
+            .where(models.Sutra.project_id == project_id, models.Sutra.chapter.in_(chapter_numbers))
+        )
+        ids.update({(row.chapter, row.number): row.id for row in rows})
+    missing = [key for key in sutras if key not in ids]
+    if missing:
+        db.rollback()
+        raise BundleError([f"sutra {chapter}.{number} has no text and does not exist" for chapter, number in missing[:MAX_REPORTED_ERRORS]])
+
+    counts = {"sutras": len(texts)}
+    for collection, (model, keys) in CONTENT.items():
+        rows = {}
+        for key, record in sutras.items():
+            for entry in getattr(record, collection):
+                row = {"sutra_id": ids[key], **entry.model_dump(mode="json")}
+                rows[(row["sutra_id"], *(row[column] for column in keys))] = row
+        upsert(connection, model, list(rows.values()), ("sutra_id", *keys))
+        counts[collection] = len(rows)
+
+    touched = sorted(ids[key] for key in sutras)
+    if texts: reindex(db, "sutra", models.Sutra, models.Sutra.id, [ids[(row["chapter"], row["number"])] for row in texts])
+    for collection, (model, _) in CONTENT.items():
+        if counts[collection]: reindex(db, INDEX_KINDS[collection], model, model.sutra_id, touched)
+    for chapter in sorted({chapter for chapter, _ in sutras}):
+        refresh_chapter(connection, project_id, chapter)
+    db.commit()
+
+    count_cache.invalidate(("sutras", project_id))
+    content_cache.invalidate(project_name)
+    return schemas.ImportResult(project=project_name, **counts)
+
+
+def ingest(db: Session, project_name: str, stream: IO[str], format: Format) -> schemas.ImportResult:
+    """
+    Read, validate and import a bundle.
+    """
+    return import_bundle(db, project_name, validate(read_records(stream, format)))
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.ingest", description="Import sutras and their translations into a project.")
+    parser.add_argument("project", help="name of an existing project")
+    parser.add_argument("bundle", help="CSV, JSON or NDJSON file")
+    parser.add_argument("--format", choices=["csv", "json", "ndjson"], help="default: from the file extension")
+    args = parser.parse_args(argv)
+
+    from app.database import SessionLocal
+
+    try:
+        format = args.format or guess_format(args.bundle)
+        with open(args.bundle, encoding="utf-8", newline="") as stream, SessionLocal() as db:
+            result = ingest(db, args.project, stream, format)
+    except (BundleError, LookupError) as error:
+        for message in getattr(error, "errors", [str(error)]):
+            print(f"error: {message}")
+        return 1
+    print(", ".join(f"{name}: {value}" for name, value in result.model_dump().items()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,6 +1,6 @@
 # Create database tables
 from app.database import engine
 
-from . import models
+from . import models, search, stats  # search and stats register their maintenance events
 
 models.Base.metadata.create_all(bind=engine)
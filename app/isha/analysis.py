@@ -0,0 +1,146 @@
+"""
+Duration, loudness and waveform peaks of uploaded audio.
+
+The player draws the waveform and shows the duration from these few KB
+instead of downloading and decoding the recording. They are computed once after
+each upload, by the background jobs of `app.isha.transcoding`, with NumPy over
+the decoded PCM, mixed down to mono:
+
+* `peaks`: the maximum absolute amplitude (0 to 1) of `audio_peaks_count`
+  equal slices of the recording.
+* `loudness`: RMS level of the whole recording in dBFS. A full scale sine
+  reads -3 dBFS; this is not a perceptual (LUFS) measure.
+
+WAV files are read with the standard library; other formats are decoded by
+ffmpeg when it is installed, which is killed after `audio_transcode_timeout_seconds`.
+The PCM is consumed block by block, so memory does not grow with the length of
+the recording.
+"""
+
+import json
+import logging
+import shutil
+import subprocess
+import threading
+import wave
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+BLOCK_FRAMES = 64 * 1024
+WINDOW_SECONDS = 0.01  # Resolution of the peaks before they are merged into slices
+
+
+class AudioMetadata(NamedTuple):
+    duration: float  # Seconds
+    sample_rate: int  # Hz
+    channels: int
+    loudness: Optional[float]  # dBFS, None for digital silence
+    peaks: list[float]
+
+
+def _wav_samples(path: Path) -> tuple[int, int, Iterator[np.ndarray]]:
+    reader = wave.open(str(path), "rb")
+    channels, width, rate = reader.getnchannels(), reader.getsampwidth(), reader.getframerate()
+
+    def blocks():
+        with reader:
+            while frames := reader.readframes(BLOCK_FRAMES):
+                if width == 1:
+                    samples = np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128
+                elif width == 3:
+                    # Little-endian 24-bit: pad to 32 bits, the sign lands in the top byte
+                    raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+                    samples = (np.pad(raw, ((0, 0), (1, 0))).view("<i4").ravel() >> 8).astype(np.float32)
+                else:
+                    samples = np.frombuffer(frames, dtype=f"<i{width}").astype(np.float32)
+                yield samples.reshape(-1, channels).mean(axis=1) / float(2 ** (8 * width - 1))
+
+    return rate, channels, blocks()
+
+
+def _ffmpeg_samples(path: Path) -> tuple[int, int, Iterator[np.ndarray]]:
+    probe = subprocess.run(
+        [settings.ffprobe_path, "-v", "error", "-select_streams", "a:0",
+         "-show_entries", "stream=sample_rate,channels", "-of", "json", str(path)],
+        check=True, capture_output=True, timeout=60,
+    )
+    streams = json.loads(probe.stdout).get("streams") or []
+    if not streams: raise ValueError("no audio stream")
+    rate, channels = int(streams[0].get("sample_rate", 0)), int(streams[0].get("channels", 0))
+    if rate <= 0 or channels <= 0: raise ValueError("no sample rate or channel count")
+
+    def blocks():
+        decoder = subprocess.Popen(
+            [settings.ffmpeg_path, "-nostdin", "-v", "error", "-i", str(path), "-vn", "-ac", "1", "-f", "f32le", "-"],
+            stdout=subprocess.PIPE,
+        )
+        # Bounds the reads below too: killing the decoder ends its output
+        deadline = threading.Timer(settings.audio_transcode_timeout_seconds, decoder.kill)
+        deadline.start()
+        try:
+            while data := decoder.stdout.read(BLOCK_FRAMES * 4):
+                # A read may end inside a sample
+                while len(data) % 4: data += decoder.stdout.read(4 - len(data) % 4) or b"\0"
+                yield np.frombuffer(data, dtype="<f4")
+        finally:
+            deadline.cancel()
+            decoder.stdout.close()
+            if decoder.wait(timeout=60) != 0: raise subprocess.CalledProcessError(decoder.returncode, settings.ffmpeg_path)
+
+    return rate, channels, blocks()
+
+
+def _samples(path: Path) -> Optional[tuple[int, int, Iterator[np.ndarray]]]:
+    try:
+        return _wav_samples(path)
+    except (wave.Error, EOFError):
+        pass
+    if shutil.which(settings.ffmpeg_path) is None or shutil.which(settings.ffprobe_path) is None: return None
+    return _ffmpeg_samples(path)
+
+
+def analyze(path: Path, peaks: Optional[int] = None) -> Optional[AudioMetadata]:
+    """
+    Measure a recording. Returns None when its format cannot be decoded here.
+    """
+    peaks = settings.audio_peaks_count if peaks is None else peaks
+    try:
+        decoded = _samples(path)
+        if decoded is None: return None
+        rate, channels, blocks = decoded
+
+        window = max(1, round(rate * WINDOW_SECONDS))
+        window_peaks, total, squares = [], 0, 0.0
+        pending = np.empty(0, dtype=np.float32)
+        for block in blocks:
+            total += len(block)
+            squares += float(np.dot(block, block))
+            # Whole windows only; the rest is carried over to the next block
+            pending = np.concatenate((pending, np.abs(block)))
+            whole = len(pending) - len(pending) % window
+            if whole: window_peaks.append(pending[:whole].reshape(-1, window).max(axis=1))
+            pending = pending[whole:]
+        if len(pending): window_peaks.append(pending.max(keepdims=True))
+    except (OSError, ValueError, subprocess.SubprocessError) as error:
+        logger.warning("could not analyze %s: %s", path, error)
+        return None
+
+    if total == 0: return AudioMetadata(0.0, rate, channels, None, [])
+    windows = np.concatenate(window_peaks)
+    # Merge the windows into at most `peaks` equal slices
+    bounds = np.linspace(0, len(windows), min(peaks, len(windows)) + 1).astype(int)[:-1]
+    slices = np.maximum.reduceat(windows, bounds)
+    rms = np.sqrt(squares / total)
+    return AudioMetadata(
+        duration=round(total / rate, 3),
+        sample_rate=rate,
+        channels=channels,
+        loudness=round(float(20 * np.log10(rms)), 2) if rms > 0 else None,
+        peaks=[round(float(peak), 3) for peak in np.minimum(slices, 1.0)],
+    )
@@ -1,10 +1,46 @@
-from sqlalchemy import ForeignKey, Integer, String, Text
+from datetime import UTC, datetime
+from typing import Optional
+
+from sqlalchemy import JSON, DateTime, Float, ForeignKey, Index, Integer, LargeBinary, String, Text, literal_column
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
 
-class Sutra(Base):
+
+def utcnow() -> datetime:
+    # Naive UTC, as stored by DATETIME columns
+    return datetime.now(UTC).replace(tzinfo=None, microsecond=0)
+
+
+# SQLite reuses the rowid of the last deleted row unless the table is declared
+# AUTOINCREMENT; a recreated row would then repeat the (id, version) of the
+# deleted one, and with it the ETag a client cached
+NEVER_REUSE_IDS = {"sqlite_autoincrement": True}
+
+
+class Versioned:
+    """
+    Row version and modification time of a content row, used as HTTP validators.
+
+    `version` is incremented in every UPDATE issued by the ORM, so an ETag can
+    be derived from (id, version) without loading or serializing the content.
+    It is a plain counter, not an optimistic lock: of two overlapping edits the
+    last one wins. `updated_at` is NULL for rows written before the column existed.
+    """
+
+    version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("version") + 1
+    )
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, default=utcnow, onupdate=utcnow)
+
+
+class Sutra(Versioned, Base):
     __tablename__ = "sutras"
+    __table_args__ = (
+        # Every per-verse lookup resolves (project, chapter, number); keep it a single index seek
+        Index("ix_sutras_project_chapter_number", "project_id", "chapter", "number", unique=True),
+        NEVER_REUSE_IDS,
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     chapter: Mapped[int] = mapped_column(Integer)
@@ -31,8 +67,12 @@ class Sutra(Base):
     )
 
 
-class Transliteration(Base):
+class Transliteration(Versioned, Base):
     __tablename__ = "transliterations"
+    __table_args__ = (
+        Index("ix_transliterations_sutra_language", "sutra_id", "language", unique=True),
+        NEVER_REUSE_IDS,
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     language: Mapped[str] = mapped_column(String(50), nullable=False)
@@ -44,8 +84,12 @@ class Transliteration(Base):
     sutra: Mapped["Sutra"] = relationship("Sutra", back_populates="transliterations")
 
 
-class Meaning(Base):
+class Meaning(Versioned, Base):
     __tablename__ = "meanings"
+    __table_args__ = (
+        Index("ix_meanings_sutra_language", "sutra_id", "language", unique=True),
+        NEVER_REUSE_IDS,
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     language: Mapped[str] = mapped_column(String(50), nullable=False)
@@ -57,8 +101,12 @@ class Meaning(Base):
     sutra: Mapped["Sutra"] = relationship("Sutra", back_populates="meanings")
 
 
-class Interpretation(Base):
+class Interpretation(Versioned, Base):
     __tablename__ = "interpretations"
+    __table_args__ = (
+        Index("ix_interpretations_sutra_language_philosophy", "sutra_id", "language", "philosophy", unique=True),
+        NEVER_REUSE_IDS,
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     language: Mapped[str] = mapped_column(String(50), nullable=False)
@@ -68,19 +116,62 @@ class Interpretation(Base):
 
     sutra: Mapped["Sutra"] = relationship("Sutra", back_populates="interpretations")
 
-class Audio(Base):
+class Audio(Versioned, Base):
     __tablename__ = "audio"
+    __table_args__ = (
+        Index("ix_audio_sutra_mode", "sutra_id", "mode", unique=True),
+        Index("ix_audio_file_path", "file_path"),  # Reference counts of stored files
+        NEVER_REUSE_IDS,
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    file_path: Mapped[str] = mapped_column(String(500))  # Relative to static directory
+    file_path: Mapped[str] = mapped_column(String(500))  # Content-addressed, see app.isha.storage
     mode: Mapped[str] = mapped_column(String(10))
+    sha256: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)  # Of the stored file
+    size: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # Bytes
+    # Measured at upload, see app.isha.analysis; NULL when the format could not be decoded
+    duration: Mapped[Optional[float]] = mapped_column(Float, nullable=True)  # Seconds
+    sample_rate: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    channels: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    loudness: Mapped[Optional[float]] = mapped_column(Float, nullable=True)  # dBFS
+    peaks: Mapped[Optional[list]] = mapped_column(JSON, nullable=True)
     sutra_id: Mapped[int] = mapped_column(ForeignKey("sutras.id", ondelete="CASCADE"))
 
     sutra: Mapped["Sutra"] = relationship("Sutra", back_populates="audios")
+    variants: Mapped[list["AudioVariant"]] = relationship(
+        "AudioVariant", back_populates="audio", cascade="all, delete-orphan"
+    )
+
+
+class AudioVariant(Versioned, Base):
+    """
+    Transcoded copy of an `Audio` recording at a lower bitrate, see app.isha.transcoding.
+    """
+
+    __tablename__ = "audio_variants"
+    __table_args__ = (
+        Index("ix_audio_variants_audio_quality", "audio_id", "quality", unique=True),
+        Index("ix_audio_variants_file_path", "file_path"),
+        NEVER_REUSE_IDS,
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    quality: Mapped[str] = mapped_column(String(10))
+    bitrate: Mapped[int] = mapped_column(Integer)  # kbit/s
+    file_path: Mapped[str] = mapped_column(String(500))  # Content-addressed, see app.isha.storage
+    sha256: Mapped[str] = mapped_column(String(64))
+    size: Mapped[int] = mapped_column(Integer)
+    audio_id: Mapped[int] = mapped_column(ForeignKey("audio.id", ondelete="CASCADE"))
+
+    audio: Mapped["Audio"] = relationship("Audio", back_populates="variants")
 
 
-class Bhashyam(Base):
+class Bhashyam(Versioned, Base):
     __tablename__ = "bhashyams"
+    __table_args__ = (
+        Index("ix_bhashyams_sutra_language_philosophy", "sutra_id", "language", "philosophy", unique=True),
+        NEVER_REUSE_IDS,
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     language: Mapped[str] = mapped_column(String(50), nullable=False)
@@ -89,3 +180,48 @@ class Bhashyam(Base):
     sutra_id: Mapped[int] = mapped_column(ForeignKey("sutras.id", ondelete="CASCADE"))
 
     sutra: Mapped["Sutra"] = relationship("Sutra", back_populates="bhashyams")
+
+
+class SearchDocument(Base):
+    # One row per indexed content row (sutra text, meaning, transliteration, ...)
+    __tablename__ = "search_documents"
+    __table_args__ = (
+        Index("ix_search_documents_kind_entity", "kind", "entity_id", unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    language: Mapped[str] = mapped_column(String(50), nullable=True)
+    philosophy: Mapped[str] = mapped_column(String(50), nullable=True)
+    length: Mapped[int] = mapped_column(Integer, nullable=False)  # Number of terms
+    sutra_id: Mapped[int] = mapped_column(ForeignKey("sutras.id", ondelete="CASCADE"), index=True)
+
+
+class SearchPosting(Base):
+    # Inverted index: term -> documents containing it
+    __tablename__ = "search_postings"
+
+    term: Mapped[str] = mapped_column(String(100), primary_key=True)
+    document_id: Mapped[int] = mapped_column(
+        ForeignKey("search_documents.id", ondelete="CASCADE"), primary_key=True, index=True
+    )
+    tf: Mapped[int] = mapped_column(Integer, nullable=False)  # Term frequency in the document
+
+
+class ContentStat(Base):
+    # Verses of a chapter that have a kind of content, maintained by app.isha.stats
+    __tablename__ = "content_stats"
+    __table_args__ = (
+        Index("ix_content_stats_key", "project_id", "chapter", "kind", "language", "philosophy", unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id", ondelete="CASCADE"))
+    chapter: Mapped[int] = mapped_column(Integer, nullable=False)
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)
+    # "" rather than NULL when the kind has no language / philosophy, so that the unique index applies
+    language: Mapped[str] = mapped_column(String(50), nullable=False, default="")
+    philosophy: Mapped[str] = mapped_column(String(50), nullable=False, default="")
+    count: Mapped[int] = mapped_column(Integer, nullable=False)  # Number of verses
+    coverage: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)  # Bit n is set if verse n has the content
@@ -0,0 +1,127 @@
+"""
+Text normalization and tokenization for search.
+
+Content is written in Devanagari, Kannada, Telugu, Tamil and Malayalam scripts
+and in IAST romanization. The same word is routinely spelled in several
+byte-wise different ways, so both indexed text and queries go through
+`normalize` before they are compared:
+
+* Unicode NFC, then zero-width characters (ZWJ, ZWNJ, ZWSP, BOM, soft hyphen)
+  are removed and Malayalam chillu letters are spelled as consonant + virama.
+* Vedic accents, nukta and avagraha are dropped and chandrabindu is folded
+  into anusvara.
+* A nasal consonant + virama before another consonant or at the end of a word
+  is folded into anusvara (गङ्गा / गंगा, इदम् / इदं).
+* IAST and other Latin diacritics are folded (ā -> a, ṣ -> s, ṃ -> m) and the
+  text is case folded.
+* Digits of every script become ASCII digits.
+
+Normalization runs when content is indexed, so queries only pay for
+normalizing the handful of characters typed by the user.
+"""
+
+import unicodedata
+from typing import List
+
+MAX_TERM_LENGTH = 100
+
+ZERO_WIDTH = dict.fromkeys([0x200B, 0x200C, 0x200D, 0x2060, 0xFEFF, 0x00AD])
+
+# Malayalam atomic chillu letters -> consonant + virama
+CHILLU = {
+    "ൺ": "ണ്",
+    "ൻ": "ന്",
+    "ർ": "ര്",
+    "ൽ": "ല്",
+    "ൾ": "ള്",
+    "ൿ": "ക്",
+}
+
+# Brahmic blocks laid out after ISCII share offsets for the signs folded below.
+# Tamil spells nasals explicitly and has no anusvara convention, so it only gets
+# the script-independent folding.
+ANUSVARA_SCRIPTS = (0x0900, 0x0C00, 0x0C80, 0x0D00)  # Devanagari, Telugu, Kannada, Malayalam
+CANDRABINDU, ANUSVARA, NUKTA, AVAGRAHA, VIRAMA = 0x01, 0x02, 0x3C, 0x3D, 0x4D
+NASALS = (0x19, 0x1E, 0x23, 0x28, 0x2E)  # ṅa, ña, ṇa, na, ma
+CONSONANTS = range(0x15, 0x3A)
+VEDIC_ACCENTS = range(0x51, 0x55)  # udatta, anudatta, grave, acute (Devanagari)
+
+
+def _script_base(char: str) -> int | None:
+    code = ord(char)
+    for base in ANUSVARA_SCRIPTS:
+        if base <= code < base + 0x80:
+            return base
+    return None
+
+
+def _is_dropped(char: str) -> bool:
+    code = ord(char)
+    if 0x0300 <= code <= 0x036F:  # Latin combining diacritics (IAST after NFD)
+        return True
+    if 0x1CD0 <= code <= 0x1CFF or 0xA8E0 <= code <= 0xA8F1:  # Vedic extensions
+        return unicodedata.category(char) == "Mn"
+    base = _script_base(char)
+    if base is None:
+        return False
+    offset = code - base
+    return offset in (NUKTA, AVAGRAHA) or (base == 0x0900 and offset in VEDIC_ACCENTS)
+
+
+def _fold_nasals(text: str) -> str:
+    # nasal + virama before a consonant or at the end of a word -> anusvara
+    chars = list(text)
+    out = []
+    i = 0
+    while i < len(chars):
+        char = chars[i]
+        base = _script_base(char)
+        if (
+            base is not None
+            and ord(char) - base in NASALS
+            and i + 1 < len(chars)
+            and ord(chars[i + 1]) == base + VIRAMA
+        ):
+            following = chars[i + 2] if i + 2 < len(chars) else ""
+            at_word_end = not following or unicodedata.category(following)[0] not in "LM"
+            if at_word_end or (_script_base(following) == base and ord(following) - base in CONSONANTS):
+                out.append(chr(base + ANUSVARA))
+                i += 2
+                continue
+        if base is not None and ord(char) - base == CANDRABINDU:
+            char = chr(base + ANUSVARA)
+        out.append(char)
+        i += 1
+    return "".join(out)
+
+
+def normalize(text: str) -> str:
+    """
+    Return the canonical search form of a piece of text.
+    """
+    text = unicodedata.normalize("NFC", text).translate(ZERO_WIDTH)
+    text = "".join(CHILLU.get(char, char) for char in text)
+    # NFD exposes Latin diacritics and nukta as separate marks so they can be dropped
+    text = "".join(char for char in unicodedata.normalize("NFD", text) if not _is_dropped(char))
+    text = unicodedata.normalize("NFC", text).casefold()
+    text = "".join(
+        str(unicodedata.digit(char)) if unicodedata.category(char) == "Nd" else char for char in text
+    )
+    return _fold_nasals(text)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Normalize text and split it into terms. Letters, combining marks and digits
+    are word characters, so vowel signs and viramas stay inside their word.
+    """
+    terms, current = [], []
+    for char in normalize(text):
+        if unicodedata.category(char)[0] in "LMN":
+            current.append(char)
+        elif current:
+            terms.append("".join(current))
+            current = []
+    if current:
+        terms.append("".join(current))
+    return [term[:MAX_TERM_LENGTH] for term in terms]
@@ -1,21 +1,43 @@
-from pathlib import Path
+import os
+from typing import Callable, Optional
 
-from fastapi import APIRouter, Depends, File, UploadFile, status
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, File, Query, Request, UploadFile, status
+from fastapi.responses import FileResponse, JSONResponse
+from fastapi.routing import APIRoute
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 
-from app import models as app_models
 from app import oauth2, utils
-from app.database import get_db
+from app.cache import content_key
+from app.conditional import Validators, row_validators
+from app.config import settings
+from app.database import get_async_db, get_db
 from app.errors import conflict_error_response, not_found_error_response
 from app.isha import models, schemas
+from app.isha.storage import audio_files, reject_oversized, release, save_upload, store_lock
+from app.isha.streaming import stream_audio
+from app.isha.transcoding import transcoder
 
-from .utils import get_sutra_or_404
+from .utils import cached_content, get_content_or_404_async, get_sutra_or_404, invalidate_content
 
-STATIC_AUDIO_DIR = Path("static/isha/")
-STATIC_AUDIO_DIR.mkdir(parents=True, exist_ok=True)
+class UploadRoute(APIRoute):
+    """
+    Route checking the size of uploads before FastAPI parses (and spools) the multipart body.
+    Dependencies run too late for that: the body is read before they are solved.
+    """
 
-router = APIRouter(prefix="/sutras", tags=["Audio"])
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def limited_handler(request: Request):
+            if request.method in ("POST", "PUT"): reject_oversized(request, settings.audio_max_upload_bytes)
+            return await handler(request)
+
+        return limited_handler
+
+
+router = APIRouter(prefix="/sutras", tags=["Audio"], route_class=UploadRoute)
 
 
 def get_audio_or_404(sutra_id: int, mode: utils.Mode, db: Session):
@@ -31,11 +53,75 @@ def get_audio_or_404(sutra_id: int, mode: utils.Mode, db: Session):
     return db_audio
 
 
+def preferred_quality(request: Request, quality: Optional[utils.Quality]) -> Optional[utils.Quality]:
+    """
+    The variant asked for with `quality=`, or the low one for clients sending `Save-Data: on`.
+    None selects the recording as uploaded.
+    """
+    if quality is not None: return quality
+    if request.headers.get("save-data", "").strip().lower() == "on": return utils.Quality.low
+    return None
+
+
+def select_variant(audio: models.Audio, quality: Optional[utils.Quality]):
+    # Falls back to the original until the variant has been transcoded
+    if quality is None: return audio
+    return next((variant for variant in audio.variants if variant.quality == quality.value), audio)
+
+
+def audio_validators(audio: models.Audio, quality: Optional[utils.Quality]) -> Validators:
+    # Covers every variant: one appearing changes what Save-Data clients get. The quality
+    # asked for is part of the ETag, the original and a variant being different representations.
+    validators = row_validators(audio, *audio.variants)
+    return validators._replace(etag=f'{validators.etag[:-1]}-{quality.value if quality else "original"}"')
+
+
 @router.get("/{sutra_project}/{sutra_chapter}/{sutra_no}/audio", response_model=schemas.Audio)
-def get_audio(sutra_project: str, sutra_chapter: int, sutra_no: int, mode: utils.Mode, db: Session = Depends(get_db)):
-    sutra = get_sutra_or_404(sutra_project, sutra_chapter, sutra_no, db)
-    audio = get_audio_or_404(sutra.id, mode, db)
-    return audio
+async def get_audio(
+    request: Request,
+    sutra_project: str,
+    sutra_chapter: int,
+    sutra_no: int,
+    mode: utils.Mode,
+    quality: Optional[utils.Quality] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    quality = preferred_quality(request, quality)
+    loaded = {}
+    async def load():
+        audio = await get_content_or_404_async(models.Audio, sutra_project, sutra_chapter, sutra_no, db, selectinload(models.Audio.variants), mode=mode)
+        loaded["audio"] = audio
+        return select_variant(audio, quality)
+    key = content_key(sutra_project, sutra_chapter, sutra_no, "audio", mode, quality or "original")
+    response = await cached_content(request, key, load, schemas.Audio, validators=lambda _: audio_validators(loaded["audio"], quality))
+    response.headers["Vary"] = "Save-Data"
+    return response
+
+
+@router.get("/{sutra_project}/{sutra_chapter}/{sutra_no}/audio/meta", response_model=schemas.AudioMeta)
+async def get_audio_meta(request: Request, sutra_project: str, sutra_chapter: int, sutra_no: int, mode: utils.Mode, db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        return await get_content_or_404_async(models.Audio, sutra_project, sutra_chapter, sutra_no, db, mode=mode)
+    return await cached_content(request, content_key(sutra_project, sutra_chapter, sutra_no, "audio", "meta", mode), load, schemas.AudioMeta)
+
+
+@router.get("/{sutra_project}/{sutra_chapter}/{sutra_no}/audio/stream", response_class=FileResponse)
+async def get_audio_stream(
+    request: Request,
+    sutra_project: str,
+    sutra_chapter: int,
+    sutra_no: int,
+    mode: utils.Mode,
+    quality: Optional[utils.Quality] = None,
+    v: Optional[str] = Query(None, description="SHA-256 of the recording; pinned URLs are cacheable indefinitely"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    audio = await get_content_or_404_async(models.Audio, sutra_project, sutra_chapter, sutra_no, db, selectinload(models.Audio.variants), mode=mode)
+    selected = select_variant(audio, preferred_quality(request, quality))
+    if not os.path.isfile(selected.file_path): return not_found_error_response()
+    response = stream_audio(request, selected.file_path, selected.sha256, v)
+    response.headers["Vary"] = "Save-Data"
+    return response
 
 
 @router.post("/{sutra_project}/{sutra_chapter}/{sutra_no}/audio", status_code=status.HTTP_201_CREATED)
@@ -46,28 +132,29 @@ def create_audio(
     mode: utils.Mode,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: app_models.User = Depends(oauth2.get_current_user),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user),
 ):
     sutra = get_sutra_or_404(sutra_project, sutra_chapter, sutra_no, db)
-    db_audio = (db.query(models.Audio).filter(models.Audio.sutra_id == sutra.id, models.Audio.mode == mode).first())
-
-    if db_audio:return conflict_error_response(f"Audio for {sutra_project} sutra chapter {sutra_chapter} number {sutra_no} in {mode} mode already exists!")
-
-    mode_dir = STATIC_AUDIO_DIR / mode
-    mode_dir.mkdir(parents=True, exist_ok=True)
-    file_extension = Path(file.filename or "").suffix
-    file_path = mode_dir / f"sutra_{sutra_no}{file_extension}"
-
-    with open(file_path, "wb") as buffer: buffer.write(file.file.read())
-
-    audio = models.Audio(file_path=str(file_path), sutra_id=sutra.id, mode=mode)
-    db.add(audio)
-    db.commit()
+    with store_lock():
+        stored = save_upload(file, settings.audio_max_upload_bytes)
+        audio = models.Audio(file_path=str(stored.path), sha256=stored.sha256, size=stored.size, sutra_id=sutra.id, mode=mode)
+        db.add(audio)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            audio = None
+    if audio is None:
+        release(db, str(stored.path))
+        return conflict_error_response(f"Audio for {sutra_project} sutra chapter {sutra_chapter} number {sutra_no} in {mode} mode already exists!")
+
+    invalidate_content(sutra_project, sutra_chapter, sutra_no, "audio")
     db.refresh(audio)
+    transcoder.submit(audio.id)
 
     return JSONResponse(
         status_code=status.HTTP_201_CREATED,
-        content={"audio": {"id": audio.id, "file_path": audio.file_path}},
+        content={"audio": {"id": audio.id, "file_path": audio.file_path, "sha256": audio.sha256}},
     )
 
 
@@ -79,22 +166,23 @@ def update_audio(
     mode: utils.Mode,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: app_models.User = Depends(oauth2.get_current_user),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user),
 ):
     sutra = get_sutra_or_404(sutra_project, sutra_chapter, sutra_no, db)
     db_audio = get_audio_or_404(sutra.id, mode, db)
-
-    mode_dir = STATIC_AUDIO_DIR / mode
-    mode_dir.mkdir(parents=True, exist_ok=True)
-    file_extension = Path(file.filename or "").suffix
-    file_path = mode_dir / f"sutra_{sutra_no}{file_extension}"
-
-    with open(file_path, "wb") as buffer:
-        buffer.write(file.file.read())
-
-    db_audio.file_path = str(file_path)
-    db.commit()
+    previous = audio_files(db_audio)
+    with store_lock():
+        stored = save_upload(file, settings.audio_max_upload_bytes)
+        db_audio.file_path = str(stored.path)
+        db_audio.sha256, db_audio.size = stored.sha256, stored.size
+        # Measured again by the transcoder
+        db_audio.duration, db_audio.sample_rate, db_audio.channels, db_audio.loudness, db_audio.peaks = (None,) * 5
+        db_audio.variants = []  # Transcoded from the previous recording
+        db.commit()
+    release(db, *previous)
+    invalidate_content(sutra_project, sutra_chapter, sutra_no, "audio")
     db.refresh(db_audio)
+    transcoder.submit(db_audio.id)
 
 
 @router.delete("/{sutra_project}/{sutra_chapter}/{sutra_no}/audio", status_code=status.HTTP_204_NO_CONTENT)
@@ -104,10 +192,13 @@ def delete_audio(
     sutra_no: int,
     mode: utils.Mode,
     db: Session = Depends(get_db),
-    current_admin: app_models.User = Depends(oauth2.get_current_admin),
+    current_admin: oauth2.Principal = Depends(oauth2.get_current_admin),
 ):
     sutra = get_sutra_or_404(sutra_project, sutra_chapter, sutra_no, db)
     audio = get_audio_or_404(sutra.id, mode, db)
 
+    files = audio_files(audio)
     db.delete(audio)
     db.commit()
+    release(db, *files)
+    invalidate_content(sutra_project, sutra_chapter, sutra_no, "audio")
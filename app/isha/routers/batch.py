@@ -0,0 +1,92 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
+
+from app.cache import content_key
+from app.conditional import Validators, row_validators
+from app.database import get_async_db
+from app.errors import bad_request_error_response
+from app.isha import models, schemas
+from app.utils import Language, Philosophy
+
+from .utils import cached_content, get_project_or_404_async, selected_project
+
+# Content of many verses of a chapter in one request and one query, e.g.
+# /meanings?project_name=isha&chapter=1&numbers=1-18&lang=en for a chapter view
+router = APIRouter(tags=["Batch"])
+
+# Upper bound of the verse numbers a request may list one by one
+MAX_LISTED_NUMBERS = 500
+
+
+def parse_numbers(numbers: Optional[str]) -> list[tuple[int, int]]:
+    """
+    Parse "1-18" or "1,3,5-7" into inclusive ranges. None selects the whole chapter.
+    """
+    if numbers is None: return []
+    ranges = []
+    try:
+        for part in numbers.split(","):
+            first, dash, last = part.strip().partition("-")
+            ranges.append((int(first), int(last) if dash else int(first)))
+    except ValueError:
+        bad_request_error_response(f"Invalid verse numbers {numbers!r}, expected e.g. 1-18 or 1,3,5-7")
+    if len(ranges) > MAX_LISTED_NUMBERS or any(first > last for first, last in ranges):
+        bad_request_error_response(f"Invalid verse numbers {numbers!r}, expected e.g. 1-18 or 1,3,5-7")
+    return ranges
+
+
+def batch_validators(rows: list) -> Validators:
+    # The sutra rows carry the verse numbers of the response
+    return row_validators(*rows, *dict.fromkeys(row.sutra for row in rows), last_modified=False)
+
+
+async def get_chapter_content(model, sutra_project: str, sutra_chapter: int, ranges: list[tuple[int, int]], db: AsyncSession, **filters) -> list:
+    # Sutras and content resolved by a single join, served by the
+    # (project_id, chapter, number) and (sutra_id, language, ...) indexes
+    # An unknown project is a 404, raised before anything is cached
+    project = await get_project_or_404_async(sutra_project, db)
+    query = (
+        select(model)
+        .join(model.sutra)
+        .options(contains_eager(model.sutra))
+        .where(
+            models.Sutra.project_id == project.id,
+            models.Sutra.chapter == sutra_chapter,
+            *[getattr(model, column) == value for column, value in filters.items()],
+        )
+        .order_by(models.Sutra.number)
+    )
+    if ranges: query = query.where(or_(*[models.Sutra.number.between(first, last) for first, last in ranges]))
+    return list((await db.scalars(query)).all())
+
+
+async def chapter_content(request: Request, kind: str, model, schema, project_name: str, chapter: int, numbers: Optional[str], db: AsyncSession, **filters):
+    ranges = parse_numbers(numbers)
+    key = content_key(project_name, chapter, "batch", kind, tuple(ranges), *filters.values())
+    async def load():
+        return await get_chapter_content(model, project_name, chapter, ranges, db, **filters)
+    return await cached_content(request, key, load, schema, batch_validators)
+
+
+@router.get("/meanings", response_model=List[schemas.VerseMeaningOut])
+async def get_meanings(request: Request, chapter: int, numbers: Optional[str] = None, lang: Language = Language.en, project_name: str = Depends(selected_project), db: AsyncSession = Depends(get_async_db)):
+    return await chapter_content(request, "meaning", models.Meaning, schemas.VerseMeanings, project_name, chapter, numbers, db, language=lang)
+
+
+@router.get("/transliterations", response_model=List[schemas.VerseTransliterationOut])
+async def get_transliterations(request: Request, chapter: int, numbers: Optional[str] = None, lang: Language = Language.en, project_name: str = Depends(selected_project), db: AsyncSession = Depends(get_async_db)):
+    return await chapter_content(request, "transliteration", models.Transliteration, schemas.VerseTransliterations, project_name, chapter, numbers, db, language=lang)
+
+
+@router.get("/interpretations", response_model=List[schemas.VerseInterpretationOut])
+async def get_interpretations(request: Request, chapter: int, numbers: Optional[str] = None, lang: Language = Language.en, phil: Philosophy = Philosophy.advaita, project_name: str = Depends(selected_project), db: AsyncSession = Depends(get_async_db)):
+    return await chapter_content(request, "interpretation", models.Interpretation, schemas.VerseInterpretations, project_name, chapter, numbers, db, language=lang, philosophy=phil)
+
+
+@router.get("/bhashyams", response_model=List[schemas.VerseBhashyamOut])
+async def get_bhashyams(request: Request, chapter: int, numbers: Optional[str] = None, lang: Language = Language.en, phil: Philosophy = Philosophy.advaita, project_name: str = Depends(selected_project), db: AsyncSession = Depends(get_async_db)):
+    return await chapter_content(request, "bhashyam", models.Bhashyam, schemas.VerseBhashyams, project_name, chapter, numbers, db, language=lang, philosophy=phil)
@@ -1,15 +1,17 @@
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, Request, status, HTTPException
 from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app import models as app_models
 from app import oauth2
-from app.database import get_db
+from app.cache import content_key
+from app.database import get_async_db, get_db
 from app.errors import conflict_error_response, not_found_error_response
 from app.isha import models, schemas
 from app.utils import Language, Philosophy
 
-from .utils import get_sutra_or_404
+from .utils import cached_content, get_content_or_404_async, get_sutra_or_404, invalidate_content
 
 router = APIRouter(prefix="/sutras", tags=["Bhashyams"])
 
@@ -20,10 +22,10 @@ def get_bhashyam_or_404(sutra_id: int, language: Language, philosophy: Philosoph
     return db_bhashyam
 
 @router.get("/{sutra_project}/{sutra_chapter}/{sutra_no}/bhashyam", response_model=schemas.BhashyamOut)
-def get_bhashyam(sutra_project: str, sutra_chapter: int, sutra_no: int, lang: Language = Language.en, phil: Philosophy = Philosophy.advaita, db: Session = Depends(get_db)):
-    sutra = get_sutra_or_404(sutra_project, sutra_chapter, sutra_no, db)
-    bhashyam = get_bhashyam_or_404(sutra.id, lang, phil, db)
-    return bhashyam
+async def get_bhashyam(request: Request, sutra_project: str, sutra_chapter: int, sutra_no: int, lang: Language = Language.en, phil: Philosophy = Philosophy.advaita, db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        return await get_content_or_404_async(models.Bhashyam, sutra_project, sutra_chapter, sutra_no, db, language=lang, philosophy=phil)
+    return await cached_content(request, content_key(sutra_project, sutra_chapter, sutra_no, "bhashyam", lang, phil), load, schemas.BhashyamOut)
 @router.post("/{sutra_project}/{sutra_chapter}/{sutra_no}/bhashyam", status_code=status.HTTP_201_CREATED)
 def add_bhashyam(
     sutra_project: str,
@@ -31,45 +33,47 @@ def add_bhashyam(
     sutra_no: int,
     bhashyam: schemas.BhashyamCreate,
     db: Session = Depends(get_db),
-    current_user: app_models.User = Depends(oauth2.get_current_user),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user),
 ):
     # Retrieve sutra or raise 404 if not found
     sutra = get_sutra_or_404(sutra_project, sutra_chapter, sutra_no, db)
-    # Check if bhashyam for the given sutra and language already exists
-    db_bhashyam = (
-        db.query(models.Bhashyam)
-        .filter(models.Bhashyam.sutra_id == sutra.id)
-        .filter(models.Bhashyam.language == bhashyam.language)
-        .filter(models.Bhashyam.philosophy == bhashyam.philosophy)
-        .first()
-    )
-
-    if db_bhashyam:conflict_error_response(f"Bhashyam for {sutra_project} sutra chapter {sutra_chapter} number {sutra_no} in language {bhashyam.language} philosophy {bhashyam.philosophy} already exists!")
     new_bhashyam = models.Bhashyam(**bhashyam.model_dump(), sutra_id=sutra.id)
     db.add(new_bhashyam)
-    db.commit()
+    # The unique (sutra_id, language, philosophy) index rejects duplicates
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        conflict_error_response(f"Bhashyam for {sutra_project} sutra chapter {sutra_chapter} number {sutra_no} in language {bhashyam.language} philosophy {bhashyam.philosophy} already exists!")
+    invalidate_content(sutra_project, sutra_chapter, sutra_no, "bhashyam")
     db.refresh(new_bhashyam)
     return {"id": new_bhashyam.id}
 
 @router.put("/{sutra_project}/{sutra_chapter}/{sutra_no}/bhashyam", status_code=status.HTTP_204_NO_CONTENT)
 def update_bhashyam(
     bhashyam: schemas.BhashyamUpdate,
-    sutra_project: str='isha',
+    sutra_project: str,
     sutra_chapter: int=0,
     sutra_no: int=0,
     lang: Language='en',
     phil: Philosophy="adv",
     db: Session = Depends(get_db),
-    current_user: app_models.User = Depends(oauth2.get_current_user),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user),
 ):
     sutra = get_sutra_or_404(sutra_project, sutra_chapter, sutra_no, db)
 
-    db_bhashyam = get_bhashyam_or_404(sutra.id, lang, db)
+    db_bhashyam = get_bhashyam_or_404(sutra.id, lang, phil, db)
 
     if db_bhashyam:
         # Update the fields
         for key, value in bhashyam.model_dump().items(): setattr(db_bhashyam, key, value)
-        db.commit()
+        # Changing the language or philosophy may collide with another bhashyam of the sutra
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            conflict_error_response(f"Bhashyam for {sutra_project} sutra chapter {sutra_chapter} number {sutra_no} in language {bhashyam.language} philosophy {bhashyam.philosophy} already exists!")
+        invalidate_content(sutra_project, sutra_chapter, sutra_no, "bhashyam")
         db.refresh(db_bhashyam)
         return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=f'Updated sutra {sutra_project} chapter {sutra_chapter} sutra {sutra_no} text "{bhashyam.model_dump()["text"]}"')
     else: raise HTTPException(status_code=404, detail=f"Project {sutra_project} chapter {sutra_chapter} sutra {sutra_no} bhashyam {bhashyam.model_dump()["language"]} not found")
@@ -83,13 +87,14 @@ def delete_bhashyam(
     lang: Language,
     phil: Philosophy,
     db: Session = Depends(get_db),
-    current_admin: app_models.User = Depends(oauth2.get_current_admin),
+    current_admin: oauth2.Principal = Depends(oauth2.get_current_admin),
 ):
     sutra = get_sutra_or_404(sutra_project, sutra_chapter, sutra_no, db)
-    bhashyam = get_bhashyam_or_404(sutra.id, lang, db)
+    bhashyam = get_bhashyam_or_404(sutra.id, lang, phil, db)
     if bhashyam:
         db.delete(bhashyam)
         db.commit()
+        invalidate_content(sutra_project, sutra_chapter, sutra_no, "bhashyam")
         return JSONResponse(status_code=status.HTTP_200_OK, content=f"Deleted sutra {sutra_project} chapter {sutra_chapter} sutra {sutra_no} bhashyam")
     else: raise HTTPException(status_code=404, detail=f"Project {sutra_project} chapter {sutra_chapter} sutra {sutra_no} bhashyam not found")
 
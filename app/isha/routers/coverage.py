@@ -0,0 +1,53 @@
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_async_db
+from app.isha import models, schemas
+from app.isha.stats import verses
+from app.utils import Language, Philosophy
+
+from .utils import get_project_or_404_async, selected_project
+
+# Which verses of each chapter have which content, e.g. the meanings still
+# missing in Kannada, from the statistics kept by app.isha.stats
+router = APIRouter(prefix="/coverage", tags=["Coverage"])
+
+Kind = Literal["sutra", "meaning", "transliteration", "interpretation", "bhashyam"]
+
+
+@router.get("", response_model=List[schemas.Coverage])
+async def get_coverage(
+    chapter: Optional[int] = None,
+    kind: Optional[Kind] = None,
+    lang: Optional[Language] = None,
+    phil: Optional[Philosophy] = None,
+    project_name: str = Depends(selected_project),
+    db: AsyncSession = Depends(get_async_db),
+):
+    project = await get_project_or_404_async(project_name, db)
+    stat = models.ContentStat
+    query = select(stat).where(stat.project_id == project.id).order_by(stat.chapter, stat.kind, stat.language, stat.philosophy)
+    if chapter is not None: query = query.where(stat.chapter == chapter)
+    rows = (await db.scalars(query)).all()
+
+    # The sutra rows tell which verses each chapter has
+    sutras = {row.chapter: set(verses(row.coverage)) for row in rows if row.kind == "sutra"}
+    coverage = []
+    for row in rows:
+        if kind is not None and row.kind != kind: continue
+        if lang is not None and row.language != lang.value: continue
+        if phil is not None and row.philosophy != phil.value: continue
+        numbers = verses(row.coverage)
+        coverage.append(schemas.Coverage(
+            chapter=row.chapter,
+            kind=row.kind,
+            language=row.language or None,
+            philosophy=row.philosophy or None,
+            count=row.count,
+            verses=numbers,
+            missing=sorted(sutras.get(row.chapter, set()).difference(numbers)),
+        ))
+    return coverage
@@ -0,0 +1,64 @@
+from typing import AsyncIterator, List, Literal, Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_async_db
+from app.isha import models, schemas
+from app.utils import Language, Mode, Philosophy
+
+from .utils import full_sutra_options, get_project_or_404_async, selected_project
+
+# Sutras loaded (with their content collections) per round-trip while streaming
+EXPORT_BATCH_SIZE = 100
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+
+async def iter_full_sutras(db: AsyncSession, project_id: int, chapter: Optional[int], options: list) -> AsyncIterator[models.Sutra]:
+    # Keyset-walk the sutras in (chapter, number) order so only one batch is held in memory
+    last = None
+    while True:
+        query = select(models.Sutra).options(*options).where(models.Sutra.project_id == project_id)
+        if chapter is not None: query = query.where(models.Sutra.chapter == chapter)
+        if last is not None:
+            query = query.where(or_(models.Sutra.chapter > last[0], and_(models.Sutra.chapter == last[0], models.Sutra.number > last[1])))
+        batch = (await db.scalars(query.order_by(models.Sutra.chapter, models.Sutra.number).limit(EXPORT_BATCH_SIZE))).all()
+        if not batch: return
+        for sutra in batch: yield sutra
+        last = (batch[-1].chapter, batch[-1].number)
+        db.expunge_all()
+
+
+@router.get("", response_class=StreamingResponse)
+async def export_sutras(
+    project_name: str = Depends(selected_project),
+    chapter: Optional[int] = None,
+    langs: List[Language] = Query(None),
+    phils: List[Philosophy] = Query(None),
+    modes: List[Mode] = Query(None),
+    format: Literal["ndjson", "json"] = "ndjson",
+    db: AsyncSession = Depends(get_async_db),
+):
+    project_id = (await get_project_or_404_async(project_name, db)).id
+    options = full_sutra_options(langs, phils, modes)
+
+    async def generate() -> AsyncIterator[str]:
+        # Each sutra is serialized with the same schema as /sutras/{project}/{chapter}/{no}/full
+        try:
+            if format == "json": yield "["
+            index = 0
+            async for sutra in iter_full_sutras(db, project_id, chapter, options):
+                body = schemas.SutraFullOut.model_validate(sutra, from_attributes=True).model_dump_json()
+                if format == "json": yield ("," if index else "") + body
+                else: yield body + "\n"
+                index += 1
+            if format == "json": yield "]"
+        finally:
+            # The request-scoped session is released before the body is streamed; release it again
+            await db.close()
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "application/json"
+    return StreamingResponse(generate(), media_type=media_type)
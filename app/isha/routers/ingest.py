@@ -0,0 +1,34 @@
+import io
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from sqlalchemy.orm import Session
+
+from app import oauth2
+from app.database import get_db
+from app.ingest import BundleError, guess_format, ingest
+from app.isha import schemas
+
+from .utils import selected_project
+
+router = APIRouter(prefix="/import", tags=["Import"])
+
+
+@router.post("", response_model=schemas.ImportResult)
+def import_sutras(
+    project_name: str = Depends(selected_project),
+    format: Optional[Literal["csv", "json", "ndjson"]] = None,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_admin: oauth2.Principal = Depends(oauth2.get_current_admin),
+):
+    # Sutras, meanings, transliterations, interpretations and bhashyams of a whole text in one transaction, see app.ingest
+    try:
+        stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+        return ingest(db, project_name, stream, format or guess_format(file.filename))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=["The bundle must be UTF-8 encoded"])
+    except BundleError as error:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=error.errors)
+    except LookupError as error:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(error))
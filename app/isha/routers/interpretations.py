@@ -1,15 +1,17 @@
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, Request, status, HTTPException
 from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app import models as app_models
 from app import oauth2
-from app.database import get_db
+from app.cache import content_key
+from app.database import get_async_db, get_db
 from app.errors import conflict_error_response, not_found_error_response
 from app.isha import models, schemas
 from app.utils import Language, Philosophy
 
-from .utils import get_sutra_or_404
+from .utils import cached_content, get_content_or_404_async, get_sutra_or_404, invalidate_content
 
 router = APIRouter(prefix="/sutras", tags=["Interpretations"])
 
@@ -26,10 +28,10 @@ def get_interpretation_or_404(sutra_id: int, language: Language, phil: Philosoph
     return db_interpretation
 
 @router.get("/{sutra_project}/{sutra_chapter}/{sutra_no}/interpretation", response_model=schemas.InterpretationOut)
-def get_interpretation(sutra_project: str, sutra_chapter: int, sutra_no: int, lang: Language = Language.en, phil: Philosophy = Philosophy.advaita, db: Session = Depends(get_db)):
-    sutra = get_sutra_or_404(sutra_project, sutra_chapter, sutra_no, db)
-    interpretation = get_interpretation_or_404(sutra.id, lang, phil, db)
-    return interpretation
+async def get_interpretation(request: Request, sutra_project: str, sutra_chapter: int, sutra_no: int, lang: Language = Language.en, phil: Philosophy = Philosophy.advaita, db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        return await get_content_or_404_async(models.Interpretation, sutra_project, sutra_chapter, sutra_no, db, language=lang, philosophy=phil)
+    return await cached_content(request, content_key(sutra_project, sutra_chapter, sutra_no, "interpretation", lang, phil), load, schemas.InterpretationOut)
 
 @router.post("/{sutra_project}/{sutra_chapter}/{sutra_no}/interpretation", status_code=status.HTTP_201_CREATED)
 def add_interpretation(
@@ -38,42 +40,45 @@ def add_interpretation(
     sutra_no: int,
     interpretation: schemas.InterpretationCreate,
     db: Session = Depends(get_db),
-    current_user: app_models.User = Depends(oauth2.get_current_user),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user),
 ):
     # Retrieve sutra or raise 404 if not found
     sutra = get_sutra_or_404(sutra_project, sutra_chapter, sutra_no, db)
-    # Check if interpretation for the given sutra and language already exists
-    db_interpretation = (
-        db.query(models.Interpretation)
-        .filter(models.Interpretation.sutra_id == sutra.id)
-        .filter(models.Interpretation.language == interpretation.language)
-        .filter(models.Interpretation.philosophy == interpretation.philosophy)
-        .first()
-    )
-    if db_interpretation:conflict_error_response(f"Interpretation for {sutra_project} sutra chapter {sutra_chapter} number {sutra_no} in language {interpretation.language} philosophy {interpretation.philosophy} already exists!")
     new_interpretation = models.Interpretation(**interpretation.model_dump(), sutra_id=sutra.id)
     db.add(new_interpretation)
-    db.commit()
+    # The unique (sutra_id, language, philosophy) index rejects duplicates
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        conflict_error_response(f"Interpretation for {sutra_project} sutra chapter {sutra_chapter} number {sutra_no} in language {interpretation.language} philosophy {interpretation.philosophy} already exists!")
+    invalidate_content(sutra_project, sutra_chapter, sutra_no, "interpretation")
     db.refresh(new_interpretation)
     return {"id": new_interpretation.id}
 
 @router.put("/{sutra_project}/{sutra_chapter}/{sutra_no}/interpretation", status_code=status.HTTP_204_NO_CONTENT)
 def update_interpretation(
     interpretation: schemas.InterpretationUpdate,
-    sutra_project: str='isha',
+    sutra_project: str,
     sutra_chapter: int=0,
     sutra_no: int=0,
     lang: Language='en',
     phil: Philosophy="adv",
     db: Session = Depends(get_db),
-    current_user: app_models.User = Depends(oauth2.get_current_user),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user),
 ):
     sutra = get_sutra_or_404(sutra_project, sutra_chapter, sutra_no, db)
     db_interpretation = get_interpretation_or_404(sutra.id, lang, phil, db)
     if db_interpretation:
         # Update the fields
         for key, value in interpretation.model_dump().items(): setattr(db_interpretation, key, value)
-        db.commit()
+        # Changing the language or philosophy may collide with another interpretation of the sutra
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            conflict_error_response(f"Interpretation for {sutra_project} sutra chapter {sutra_chapter} number {sutra_no} in language {interpretation.language} philosophy {interpretation.philosophy} already exists!")
+        invalidate_content(sutra_project, sutra_chapter, sutra_no, "interpretation")
         db.refresh(db_interpretation)
         return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=f'Updated sutra {sutra_project} chapter {sutra_chapter} sutra {sutra_no} text "{interpretation.model_dump()["text"]}"')
     else: raise HTTPException(status_code=404, detail=f"Project {sutra_project} chapter {sutra_chapter} sutra {sutra_no} interpretation {interpretation.model_dump()["language"]} not found")
@@ -86,13 +91,14 @@ def delete_interpretation(
     lang: Language,
     phil: Philosophy,
     db: Session = Depends(get_db),
-    current_admin: app_models.User = Depends(oauth2.get_current_admin),
+    current_admin: oauth2.Principal = Depends(oauth2.get_current_admin),
 ):
     sutra = get_sutra_or_404(sutra_project, sutra_chapter, sutra_no, db)
     interpretation = get_interpretation_or_404(sutra.id, lang, phil, db)
     if interpretation:
         db.delete(interpretation)
         db.commit()
+        invalidate_content(sutra_project, sutra_chapter, sutra_no, "interpretation")
         return JSONResponse(status_code=status.HTTP_200_OK, content=f"Deleted sutra {sutra_project} chapter {sutra_chapter} sutra {sutra_no} interpretation")
     else: raise HTTPException(status_code=404, detail=f"Project {sutra_project} chapter {sutra_chapter} sutra {sutra_no} interpretation not found")
 
@@ -1,53 +1,24 @@
 from typing import List
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm.session import Session
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app.isha import models, schemas
+from app.database import get_async_db
+from app.isha import schemas, search as search_index
+from .utils import selected_project
 
 
 router = APIRouter(prefix="/search", tags=["Search"])
 
 
 @router.get("/{term}", response_model=List[schemas.Result])
-def search(term: str, db: Session = Depends(get_db)):
-    results = []
-
-    sutras = db.query(models.Sutra).filter(models.Sutra.text.ilike(f"%{term}%")).all()
-    for sutra in sutras:
-        results.append({
-            "text": sutra.text,
-            "sutra_no": sutra.number,
-            "mode": "chant",
-            "lang": None
-        })
-
-    meanings = db.query(models.Meaning).filter(models.Meaning.text.ilike(f"%{term}%")).all()
-    for meaning in meanings:
-        results.append({
-            "text": meaning.text,
-            "sutra_no": meaning.sutra.number,
-            "mode": "chant",
-            "lang": meaning.language
-        })
-
-
-    transliterations = db.query(models.Transliteration).filter(models.Transliteration.text.ilike(f"%{term}%")).all()
-    for transliteration in transliterations:
-        results.append({
-            "text": transliteration.text,
-            "sutra_no": transliteration.sutra.number,
-            "mode": "chant",
-            "lang": transliteration.language
-        })
-
-    interpretations = db.query(models.Interpretation).filter(models.Interpretation.text.ilike(f"%{term}%")).all()
-    for interpretation in interpretations:
-        results.append({
-            "text": interpretation.text,
-            "sutra_no": interpretation.sutra.number,
-            "mode": f"interpretation - {interpretation.philosophy}",
-            "lang": interpretation.language
-        })
-
-    return results
+async def search(
+    term: str,
+    project_name: str = Depends(selected_project),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Ranked matches across sutras, meanings, transliterations, interpretations and bhashyams
+    # of the Upanishad in the URL, or of the project named in the query.
+    # The index queries are shared with the sync code and run on the async connection.
+    return await db.run_sync(search_index.search, term, project_name=project_name, limit=limit, offset=offset)
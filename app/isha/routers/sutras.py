@@ -1,16 +1,32 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, Query, Request, Response, status, HTTPException
 from fastapi.responses import JSONResponse
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
 
 from app import oauth2
-from app.database import get_db
+from app.cache import content_key
+from app.database import get_async_db, get_db
 from app.errors import conflict_error_response
+from app.pagination import PageParams, count_cache, decode_cursor, paginate
 from app.isha import models, schemas
-from app import models as app_models, schemas as app_schemas
-from .utils import get_sutra_or_404
+from app.isha.storage import audio_files, release
+from app import schemas as app_schemas
+from app.utils import Language, Mode, Philosophy
+from .utils import (
+    cached_content,
+    full_sutra_options,
+    full_sutra_validators,
+    get_project_or_404,
+    get_project_or_404_async,
+    get_sutra_or_404,
+    get_sutra_or_404_async,
+    invalidate_content,
+    selected_project,
+)
 
 router = APIRouter(prefix="/sutras", tags=["Sutras"])
 
@@ -22,29 +38,64 @@ def get_sutra_by_id_or_404(sutra_id: int, db: Session):
             detail=f"Sutra ID {sutra_id} not found",
         )
     return sutra
+async def count_sutras(project_id: int, db: AsyncSession) -> int:
+    # Served from the count cache; add/delete handlers drop the entry. A miss
+    # sums the per chapter counts of app.isha.stats instead of scanning sutras,
+    # unless they were never computed for this database (see app.migrations)
+    async def count():
+        query = select(func.sum(models.ContentStat.count)).where(models.ContentStat.project_id == project_id, models.ContentStat.kind == "sutra")
+        total = await db.scalar(query)
+        if total is None: total = await db.scalar(select(func.count(models.Sutra.id)).where(models.Sutra.project_id == project_id))
+        return total
+    return await count_cache.get_async(("sutras", project_id), count)
 @router.get("/total-count", response_model=int)
-def get_sutras_count(project_name: str = "isha", db: Session = Depends(get_db)):
-    db_project = db.query(app_models.Project).filter(app_models.Project.name == project_name).first()
-    if db_project is None: raise HTTPException(status_code=404, detail=f"Project {project_name} not found")
-    sutras_count = db.query(models.Sutra.project_id, models.Sutra.id, models.Sutra.number).filter(models.Sutra.project_id == db_project.id).count()
-    return sutras_count
+async def get_sutras_count(project_name: str = Depends(selected_project), db: AsyncSession = Depends(get_async_db)):
+    db_project = await get_project_or_404_async(project_name, db)
+    return await count_sutras(db_project.id, db)
 
 @router.get("/", response_model=List[schemas.SutraListOut])
-def get_sutras(project_name: str = "isha", db: Session = Depends(get_db)):
-    db_project = db.query(app_models.Project).filter(app_models.Project.name == project_name).first()
-    if db_project is None:
-        raise HTTPException(status_code=404, detail=f"Project {project_name} not found")
-    sutras = db.query(models.Sutra.project_id, models.Sutra.id, models.Sutra.number).filter(models.Sutra.project_id == db_project.id).all()
-    return sutras
+async def get_sutras(response: Response, project_name: str = Depends(selected_project), page: PageParams = Depends(), db: AsyncSession = Depends(get_async_db)):
+    db_project = await get_project_or_404_async(project_name, db)
+    # Keyset pagination on (chapter, number), served by the (project_id, chapter, number) index
+    query = select(models.Sutra.project_id, models.Sutra.id, models.Sutra.chapter, models.Sutra.number).where(models.Sutra.project_id == db_project.id)
+    if page.cursor:
+        chapter, number = decode_cursor(page.cursor, int, int)
+        query = query.where(or_(models.Sutra.chapter > chapter, and_(models.Sutra.chapter == chapter, models.Sutra.number > number)))
+    sutras = (await db.execute(query.order_by(models.Sutra.chapter, models.Sutra.number).limit(page.fetch_size))).all()
+    total = await count_sutras(db_project.id, db) if page.include_total else None
+    return paginate(response, sutras, page, lambda sutra: (sutra.chapter, sutra.number), lambda: total)
     # return db.query(models.Sutra.id, models.Sutra.number).all()
 
 
 @router.get("/{sutra_project}/{sutra_chapter}/{sutra_no}", response_model=schemas.SutraOut)
-def get_sutra(sutra_project: str='isha', sutra_chapter: int=0, sutra_no: int=0, db: Session = Depends(get_db)):
-    return get_sutra_or_404(sutra_project, sutra_chapter, sutra_no, db)
+async def get_sutra(request: Request, sutra_project: str, sutra_chapter: int=0, sutra_no: int=0, db: AsyncSession = Depends(get_async_db)):
+    return await cached_content(
+        request,
+        content_key(sutra_project, sutra_chapter, sutra_no, "sutra"),
+        lambda: get_sutra_or_404_async(sutra_project, sutra_chapter, sutra_no, db),
+        schemas.SutraOut,
+    )
+@router.get("/{sutra_project}/{sutra_chapter}/{sutra_no}/full", response_model=schemas.SutraFullOut)
+async def get_sutra_full(
+    request: Request,
+    sutra_project: str,
+    sutra_chapter: int,
+    sutra_no: int,
+    langs: List[Language] = Query(None),
+    phils: List[Philosophy] = Query(None),
+    modes: List[Mode] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # The sutra and all of its content in one request: one sutra query plus one query per collection
+    def load():
+        return get_sutra_or_404_async(sutra_project, sutra_chapter, sutra_no, db, *full_sutra_options(langs, phils, modes))
+    filters = [tuple(sorted(content_key(*values))) if values else None for values in (langs, phils, modes)]
+    key = content_key(sutra_project, sutra_chapter, sutra_no, "full", *filters)
+    return await cached_content(request, key, load, schemas.SutraFullOut, full_sutra_validators)
 @router.get("_by_id/{sutra_id}")
-def get_project(sutra_id: int, db: Session = Depends(get_db)):
-    sutra = get_sutra_by_id_or_404(sutra_id, db)
+async def get_project(sutra_id: int, db: AsyncSession = Depends(get_async_db)):
+    sutra = await db.get(models.Sutra, sutra_id)
+    if not sutra: raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Sutra ID {sutra_id} not found")
     return sutra
 @router.post("/", status_code=status.HTTP_201_CREATED)
 
@@ -52,18 +103,9 @@ def add_sutra(
     project: app_schemas.ProjectCreate,
     sutra: schemas.SutraCreate,
     db: Session = Depends(get_db),
-    current_user: app_models.User = Depends(oauth2.get_current_user),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user),
 ):
-    db_project = db.query(app_models.Project).filter(app_models.Project.name == project.name).first()
-    if db_project is None:
-        raise HTTPException(status_code=404, detail=f"Project {project.name} not found")
-
-    sutra_db = (
-        db.query(models.Sutra).filter(and_(models.Sutra.project_id == db_project.id, models.Sutra.chapter == sutra.chapter, models.Sutra.number == sutra.number)).first()
-    )
-
-    if sutra_db:
-        conflict_error_response(f"{project.name} Sutra - chapter {sutra.chapter}, number {sutra.number} already exists!")
+    db_project = get_project_or_404(project.name, db)
 
     sutra = models.Sutra(
         chapter=sutra.chapter,
@@ -72,7 +114,15 @@ def add_sutra(
         project_id=db_project.id
     )
     db.add(sutra)
-    db.commit()
+    # The unique (project_id, chapter, number) index rejects duplicates
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        conflict_error_response(f"{project.name} Sutra - chapter {sutra.chapter}, number {sutra.number} already exists!")
+    count_cache.invalidate(("sutras", db_project.id))
+    # Drops the chapter's batch responses, and starts the replication lag window of the verse
+    invalidate_content(project.name, sutra.chapter, sutra.number)
     db.refresh(sutra)
 
     return JSONResponse(
@@ -84,12 +134,12 @@ def add_sutra(
 # @router.put("/", status_code=status.HTTP_204_NO_CONTENT)
 def update_sutra(
     sutra_update: schemas.SutraUpdate,
-    sutra_project: str='isha',
+    sutra_project: str,
     sutra_chapter: int=0,
     sutra_no: int=0,
     # sutra_text: str="?",
     db: Session = Depends(get_db),
-    current_user: app_models.User = Depends(oauth2.get_current_user),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user),
 ):
     sutra = get_sutra_or_404(sutra_project, sutra_chapter, sutra_no, db)
     if sutra:
@@ -97,29 +147,45 @@ def update_sutra(
         sutra_text = sutra_update_items["text"]
         for key, value in sutra_update_items.items():
             setattr(sutra, key, value)
-        db.commit()
+        # Moving the sutra onto another verse of the project may collide with the sutra there
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            conflict_error_response(f"{sutra_project} Sutra - chapter {sutra_update.chapter}, number {sutra_update.number} already exists!")
+        invalidate_content(sutra_project, sutra_chapter, sutra_no)
+        invalidate_content(sutra_project, sutra.chapter, sutra.number)
         return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=f"Updated sutra {sutra_project} chapter {sutra_chapter} sutra {sutra_no} text {sutra_text}")
     else: raise HTTPException(status_code=404, detail=f"Project {sutra_project} chapter {sutra_chapter} sutra {sutra_no} not found")
 
 @router.delete("/{sutra_project}/{sutra_chapter}/{sutra_no}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_sutra(
-    sutra_project: str='isha',
+    sutra_project: str,
     sutra_chapter: int=0,
     sutra_no: int=0,
     db: Session = Depends(get_db),
-    current_admin: app_models.User = Depends(oauth2.get_current_admin),
+    current_admin: oauth2.Principal = Depends(oauth2.get_current_admin),
 ):
     sutra = get_sutra_or_404(sutra_project, sutra_chapter, sutra_no, db)
     if sutra:
+        project_id, files = sutra.project_id, audio_files(*sutra.audios)
         db.delete(sutra)
         db.commit()
+        release(db, *files)
+        count_cache.invalidate(("sutras", project_id))
+        invalidate_content(sutra_project, sutra_chapter, sutra_no)
         return JSONResponse(status_code=status.HTTP_200_OK, content=f"Deleted sutra {sutra_project} chapter {sutra_chapter} sutra {sutra_no}")
     else: raise HTTPException(status_code=404, detail=f"Project {sutra_project} chapter {sutra_chapter} sutra {sutra_no} not found")
 @router.delete("_by_id/{sutra_id}")
 def delete_sutra_by_id(sutra_id: int, db: Session = Depends(get_db)):
     sutra = get_sutra_by_id_or_404(sutra_id, db)
     if sutra:
+        project_id, verse = sutra.project_id, (sutra.project.name, sutra.chapter, sutra.number)
+        files = audio_files(*sutra.audios)
         db.delete(sutra)
         db.commit()
+        release(db, *files)
+        count_cache.invalidate(("sutras", project_id))
+        invalidate_content(*verse)
         return JSONResponse(status_code=status.HTTP_200_OK, content=f"Deleted sutra {sutra_id}")
     else: raise HTTPException(status_code=404, detail=f"Project {sutra_id}not found")
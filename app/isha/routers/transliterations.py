@@ -1,15 +1,17 @@
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, Request, status, HTTPException
 from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app import models as app_models
 from app import oauth2
-from app.database import get_db
+from app.cache import content_key
+from app.database import get_async_db, get_db
 from app.errors import conflict_error_response, not_found_error_response
 from app.isha import models, schemas
 from app.utils import Language
 
-from .utils import get_sutra_or_404
+from .utils import cached_content, get_content_or_404_async, get_sutra_or_404, invalidate_content
 
 router = APIRouter(prefix="/sutras", tags=["Transliterations"])
 
@@ -29,11 +31,11 @@ def get_transliteration_or_404(sutra_id: int, language: Language, db: Session):
 
 
 @router.get("/{sutra_project}/{sutra_chapter}/{sutra_no}/transliteration", response_model=schemas.TransliterationOut)
-def get_transliteration(
-    sutra_project: str, sutra_chapter: int, sutra_no: int, lang: Language = Language.en, db: Session = Depends(get_db)):
-    sutra = get_sutra_or_404(sutra_project, sutra_chapter, sutra_no, db)
-    transliteration = get_transliteration_or_404(sutra.id, lang, db)
-    return transliteration
+async def get_transliteration(
+    request: Request, sutra_project: str, sutra_chapter: int, sutra_no: int, lang: Language = Language.en, db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        return await get_content_or_404_async(models.Transliteration, sutra_project, sutra_chapter, sutra_no, db, language=lang)
+    return await cached_content(request, content_key(sutra_project, sutra_chapter, sutra_no, "transliteration", lang), load, schemas.TransliterationOut)
 
 @router.post("/{sutra_project}/{sutra_chapter}/{sutra_no}/transliteration", status_code=status.HTTP_201_CREATED)
 def add_transliteration(
@@ -42,41 +44,45 @@ def add_transliteration(
     sutra_no: int,
     transliteration: schemas.TransliterationCreate,
     db: Session = Depends(get_db),
-    current_user: app_models.User = Depends(oauth2.get_current_user),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user),
 ):
     # Retrieve sutra or raise 404 if not found
     sutra = get_sutra_or_404(sutra_project, sutra_chapter, sutra_no, db)
 
-    # Check if transliteration for the given sutra and language already exists
-    db_transliteration = (
-        db.query(models.Transliteration)
-        .filter(models.Transliteration.sutra_id == sutra.id)
-        .filter(models.Transliteration.language == transliteration.language)
-        .first()
-    )
-    if db_transliteration: conflict_error_response(f"Transliteration for {sutra_project} sutra chapter {sutra_chapter} number {sutra_no} in language {transliteration.language} already exists!")
     new_transliteration = models.Transliteration(**transliteration.model_dump(), sutra_id=sutra.id)
     db.add(new_transliteration)
-    db.commit()
+    # The unique (sutra_id, language) index rejects duplicates
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        conflict_error_response(f"Transliteration for {sutra_project} sutra chapter {sutra_chapter} number {sutra_no} in language {transliteration.language} already exists!")
+    invalidate_content(sutra_project, sutra_chapter, sutra_no, "transliteration")
     db.refresh(new_transliteration)
     return {"id": new_transliteration.id}
 
 @router.put("/{sutra_project}/{sutra_chapter}/{sutra_no}/transliteration", status_code=status.HTTP_204_NO_CONTENT)
 def update_transliteration(
     transliteration: schemas.TransliterationUpdate,
-    sutra_project: str='isha',
+    sutra_project: str,
     sutra_chapter: int=0,
     sutra_no: int=0,
     lang: Language='en',
     db: Session = Depends(get_db),
-    current_user: app_models.User = Depends(oauth2.get_current_user),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user),
 ):
     sutra = get_sutra_or_404(sutra_project, sutra_chapter, sutra_no, db)
     db_transliteration = get_transliteration_or_404(sutra.id, lang, db)
     if db_transliteration:
         # Update the fields
         for key, value in transliteration.model_dump().items(): setattr(db_transliteration, key, value)
-        db.commit()
+        # Changing the language may collide with another transliteration of the sutra
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            conflict_error_response(f"Transliteration for {sutra_project} sutra chapter {sutra_chapter} number {sutra_no} in language {transliteration.language} already exists!")
+        invalidate_content(sutra_project, sutra_chapter, sutra_no, "transliteration")
         db.refresh(db_transliteration)
         return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=f'Updated sutra {sutra_project} chapter {sutra_chapter} sutra {sutra_no} text "{transliteration.model_dump()["text"]}"')
     else: raise HTTPException(status_code=404, detail=f"Project {sutra_project} chapter {sutra_chapter} sutra {sutra_no} transliteration {transliteration.model_dump()["language"]} not found")
@@ -88,12 +94,13 @@ def delete_transliteration(
     sutra_no: int,
     lang: Language,
     db: Session = Depends(get_db),
-    current_admin: app_models.User = Depends(oauth2.get_current_admin),
+    current_admin: oauth2.Principal = Depends(oauth2.get_current_admin),
 ):
     sutra = get_sutra_or_404(sutra_project, sutra_chapter, sutra_no, db)
     transliteration = get_transliteration_or_404(sutra.id, lang, db)
     if transliteration:
         db.delete(transliteration)
         db.commit()
+        invalidate_content(sutra_project, sutra_chapter, sutra_no, "transliteration")
         return JSONResponse(status_code=status.HTTP_200_OK, content=f"Deleted sutra {sutra_project} chapter {sutra_chapter} sutra {sutra_no} transliteration")
     else: raise HTTPException(status_code=404, detail=f"Project {sutra_project} chapter {sutra_chapter} sutra {sutra_no} transliteration not found")
@@ -1,14 +1,169 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from typing import Any, Awaitable, Callable, List, Optional, Type
 
+from fastapi import HTTPException, Request, Response
+from pydantic import BaseModel
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.interfaces import LoaderOption
+
+from app.cache import content_cache, invalidated_within
+from app.conditional import Validators, conditional_response, is_not_modified, not_modified_response, row_validators
+from app.config import settings
+from app.database import Base, read_router
 from app.errors import not_found_error_response
 from app.isha import models
-from app import models as app_models
+from app.registry import ProjectInfo, project_registry
+from app.utils import Language, Mode, Philosophy
+
+
+def select_sutra(project_id: int, sutra_chapter: int, sutra_no: int, *options: LoaderOption) -> Select:
+    # Served by the unique (project_id, chapter, number) index
+    return (
+        select(models.Sutra)
+        .options(*options)
+        .where(
+            models.Sutra.project_id == project_id,
+            models.Sutra.chapter == sutra_chapter,
+            models.Sutra.number == sutra_no,
+        )
+        .limit(1)
+    )
+
 
+def get_sutra_or_404(sutra_project: str, sutra_chapter: int, sutra_no: int, db: Session, *options: LoaderOption) -> models.Sutra:
+    project = project_registry.get(sutra_project, db)
+    sutra = project and db.scalars(select_sutra(project.id, sutra_chapter, sutra_no, *options)).first()
+    if not sutra: not_found_error_response()
+    return sutra
 
-def get_sutra_or_404(sutra_project: str, sutra_chapter: int, sutra_no: int, db: Session) -> models.Sutra:
-    project = db.query(app_models.Project).filter(app_models.Project.name == sutra_project).first()
-    if not project: not_found_error_response()
-    sutra = db.query(models.Sutra).filter(and_(models.Sutra.chapter == sutra_chapter, models.Sutra.number == sutra_no)).first()
+
+async def get_sutra_or_404_async(sutra_project: str, sutra_chapter: int, sutra_no: int, db: AsyncSession, *options: LoaderOption) -> models.Sutra:
+    project = await project_registry.get_async(sutra_project, db)
+    sutra = project and (await db.scalars(select_sutra(project.id, sutra_chapter, sutra_no, *options))).first()
     if not sutra: not_found_error_response()
     return sutra
+
+
+async def get_content_or_404_async(model: Type[Base], sutra_project: str, sutra_chapter: int, sutra_no: int, db: AsyncSession, *options: LoaderOption, **filters: Any):
+    """
+    Fetch one content row (meaning, audio, ...) of a sutra by its column values,
+    resolving the sutra in the same query.
+    """
+    project = await project_registry.get_async(sutra_project, db)
+    if project is None: not_found_error_response()
+    query = (
+        select(model)
+        .options(*options)
+        .join(models.Sutra, model.sutra_id == models.Sutra.id)
+        .where(
+            models.Sutra.project_id == project.id,
+            models.Sutra.chapter == sutra_chapter,
+            models.Sutra.number == sutra_no,
+            *[getattr(model, column) == value for column, value in filters.items()],
+        )
+        .limit(1)
+    )
+    row = (await db.scalars(query)).first()
+    if not row: not_found_error_response()
+    return row
+
+
+def selected_project(upanishad: str, project_name: Optional[str] = None) -> str:
+    # The Upanishad of the URL, unless the query names another project
+    return project_name or upanishad
+
+
+def get_project_or_404(project_name: str, db: Session) -> ProjectInfo:
+    project = project_registry.get(project_name, db)
+    if project is None: raise HTTPException(status_code=404, detail=f"Project {project_name} not found")
+    return project
+
+
+async def get_project_or_404_async(project_name: str, db: AsyncSession) -> ProjectInfo:
+    project = await project_registry.get_async(project_name, db)
+    if project is None: raise HTTPException(status_code=404, detail=f"Project {project_name} not found")
+    return project
+
+
+def full_sutra_options(
+    langs: Optional[List[Language]] = None,
+    phils: Optional[List[Philosophy]] = None,
+    modes: Optional[List[Mode]] = None,
+) -> List[LoaderOption]:
+    """
+    Eager-load every content collection of a sutra, one SELECT ... IN per collection.
+
+    Each filter is optional; when omitted the whole collection is loaded.
+    """
+    def criteria(model, langs=None, phils=None, modes=None):
+        clauses = []
+        if langs: clauses.append(model.language.in_(langs))
+        if phils: clauses.append(model.philosophy.in_(phils))
+        if modes: clauses.append(model.mode.in_(modes))
+        return clauses
+
+    collections = [
+        (models.Sutra.meanings, criteria(models.Meaning, langs)),
+        (models.Sutra.transliterations, criteria(models.Transliteration, langs)),
+        (models.Sutra.interpretations, criteria(models.Interpretation, langs, phils)),
+        (models.Sutra.bhashyams, criteria(models.Bhashyam, langs, phils)),
+        (models.Sutra.audios, criteria(models.Audio, modes=modes)),
+    ]
+    return [selectinload(relation.and_(*clauses) if clauses else relation) for relation, clauses in collections]
+
+
+def dump(schema: Type[BaseModel], obj: Any) -> dict:
+    # JSON-ready response body, as stored in the content cache
+    return schema.model_validate(obj, from_attributes=True).model_dump(mode="json")
+
+
+def full_sutra_validators(sutra: models.Sutra) -> Validators:
+    rows = [sutra, *sutra.meanings, *sutra.transliterations, *sutra.interpretations, *sutra.bhashyams, *sutra.audios]
+    return row_validators(*rows, last_modified=False)
+
+
+async def cached_content(
+    request: Request,
+    key: tuple,
+    load: Callable[[], Awaitable[Any]],
+    schema: Type[BaseModel],
+    validators: Callable[[Any], Validators] = row_validators,
+) -> Response:
+    """
+    Serve a content GET from the content cache, with HTTP validators.
+
+    On a miss `load` fetches the row(s) and the validators are computed from
+    their versions; a matching If-None-Match is answered with 304 before the
+    row is serialized. The cache stores the validators next to the body, so
+    repeat readers are answered without touching the database.
+
+    A row loaded within the replication lag of a write of the key is not
+    cached: reads go to the primary then, but another worker may not have
+    received the invalidation yet and read a replica.
+    """
+    entry = content_cache.get(key)
+    if entry is None:
+        generation = content_cache.generation(key)
+        obj = await load()
+        current = validators(obj)
+        if is_not_modified(request, current): return not_modified_response(current)
+        entry = {"validators": list(current), "body": dump(schema, obj)}
+        if not (read_router.replicas and invalidated_within(generation, settings.db_read_your_writes_seconds)):
+            content_cache.set(key, entry, generation)
+    return conditional_response(request, Validators(*entry["validators"]), entry["body"])
+
+
+def invalidate_content(sutra_project: str, sutra_chapter: int, sutra_no: int, kind: Optional[str] = None) -> None:
+    """
+    Drop cached content of a sutra after a write: one kind (and the aggregated
+    full view), or everything cached for the sutra when no kind is given. The
+    chapter's batch responses of that kind are dropped with it.
+    """
+    if kind is None:
+        content_cache.invalidate(sutra_project, sutra_chapter, sutra_no)
+        content_cache.invalidate(sutra_project, sutra_chapter, "batch")
+    else:
+        content_cache.invalidate(sutra_project, sutra_chapter, sutra_no, kind)
+        content_cache.invalidate(sutra_project, sutra_chapter, sutra_no, "full")
+        content_cache.invalidate(sutra_project, sutra_chapter, "batch", kind)
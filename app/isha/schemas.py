@@ -1,9 +1,16 @@
-from pydantic import BaseModel
+from typing import Annotated, List, Optional
 
-from app.utils import Language, Philosophy
+from pydantic import BaseModel, Field, RootModel
+
+from app.utils import Language, Mode, Philosophy
 from app.schemas import Project
 
 
+# Verse numbers accepted on writes; coverage bitmaps (app.isha.stats) grow with the largest one
+MAX_VERSE_NUMBER = 10_000
+VerseNumber = Annotated[int, Field(ge=0, le=MAX_VERSE_NUMBER)]
+
+
 class SutraBase(BaseModel):
     id: int = None  # Make id optional
     chapter: int
@@ -12,16 +19,17 @@ class SutraBase(BaseModel):
 
 
 class SutraCreate(SutraBase):
-    pass
+    number: VerseNumber
 
 
 class SutraOut(SutraBase):
     id: int
 class SutraListOut(BaseModel):
     id: int
+    chapter: int
     number: int
 class SutraUpdate(SutraBase):
-    pass
+    number: VerseNumber
 class Sutra(SutraBase):
     id: int
     project: Project
@@ -76,6 +84,14 @@ class Interpretation(InterpretationBase):
 
 class Audio(BaseModel):
     file_path: str
+class AudioOut(Audio):
+    mode: Mode
+class AudioMeta(BaseModel):
+    duration: Optional[float] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    loudness: Optional[float] = None
+    peaks: Optional[List[float]] = None
 
 class BhashyamBase(BaseModel):
     language: Language
@@ -93,8 +109,65 @@ class Bhashyam(BhashyamBase):
     class Config:
         orm_mode = True
 
+class SutraFullOut(SutraOut):
+    meanings: List[MeaningOut] = []
+    transliterations: List[TransliterationOut] = []
+    interpretations: List[InterpretationOut] = []
+    bhashyams: List[BhashyamOut] = []
+    audios: List[AudioOut] = []
+
+class SutraImport(BaseModel):
+    # Same shape as SutraFullOut, so an export can be imported again; ids and audios are ignored
+    chapter: int
+    number: VerseNumber
+    text: Optional[str] = None  # None keeps the text of an existing sutra
+    meanings: List[MeaningCreate] = []
+    transliterations: List[TransliterationCreate] = []
+    interpretations: List[InterpretationCreate] = []
+    bhashyams: List[BhashyamCreate] = []
+class ImportResult(BaseModel):
+    project: str
+    sutras: int
+    meanings: int
+    transliterations: int
+    interpretations: int
+    bhashyams: int
+
+# Content of several verses of a chapter, see routers/batch.py
+class VerseMeaningOut(MeaningOut):
+    sutra: SutraListOut
+class VerseTransliterationOut(TransliterationOut):
+    sutra: SutraListOut
+class VerseInterpretationOut(InterpretationOut):
+    sutra: SutraListOut
+class VerseBhashyamOut(BhashyamOut):
+    sutra: SutraListOut
+class VerseMeanings(RootModel[List[VerseMeaningOut]]):
+    pass
+class VerseTransliterations(RootModel[List[VerseTransliterationOut]]):
+    pass
+class VerseInterpretations(RootModel[List[VerseInterpretationOut]]):
+    pass
+class VerseBhashyams(RootModel[List[VerseBhashyamOut]]):
+    pass
+
+# Verses of a chapter having one kind of content, see routers/coverage.py
+class Coverage(BaseModel):
+    chapter: int
+    kind: str
+    language: str | None = None
+    philosophy: str | None = None
+    count: int
+    verses: List[int]
+    missing: List[int]  # Sutras of the chapter without this content
+
 class Result(BaseModel):
     text: str
     sutra_no: int
     mode: str | None
     lang: str | None
+    chapter: int
+    project: str
+    kind: str
+    philosophy: str | None = None
+    score: float
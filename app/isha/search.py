@@ -0,0 +1,244 @@
+"""
+Full-text search over sutra content.
+
+Every sutra, meaning, transliteration, interpretation and bhashyam is normalized
+and tokenized (see `app.isha.normalize`) when it is written and stored as an
+inverted index in the `search_documents` / `search_postings` tables. The index
+is kept in sync by mapper events, so the routers do not have to know about it.
+Queries are prefix matches on the indexed terms, ranked with BM25, and only
+touch the index tables plus one lookup per content kind for the page that is
+returned.
+
+Existing databases are indexed with:
+
+    python -m app.isha.search
+"""
+
+import math
+from collections import Counter
+from typing import Iterable, List, Optional
+
+from sqlalchemy import Connection, and_, case, delete, desc, event, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app import models as app_models
+from app.isha import models
+from app.isha.normalize import tokenize
+
+# Content kinds that are indexed, and the model holding their text
+INDEXED_MODELS = {
+    "sutra": models.Sutra,
+    "meaning": models.Meaning,
+    "transliteration": models.Transliteration,
+    "interpretation": models.Interpretation,
+    "bhashyam": models.Bhashyam,
+}
+
+# Query terms shorter than this only match whole terms, not prefixes
+MIN_PREFIX_LENGTH = 3
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def unindex_entity(connection: Connection, kind: str, entity_id: int) -> None:
+    documents = select(models.SearchDocument.id).where(
+        models.SearchDocument.kind == kind, models.SearchDocument.entity_id == entity_id
+    )
+    connection.execute(delete(models.SearchPosting).where(models.SearchPosting.document_id.in_(documents)))
+    connection.execute(
+        delete(models.SearchDocument).where(
+            models.SearchDocument.kind == kind, models.SearchDocument.entity_id == entity_id
+        )
+    )
+
+
+def index_entity(connection: Connection, kind: str, target) -> None:
+    """
+    (Re)build the index entries of a single content row.
+    """
+    unindex_entity(connection, kind, target.id)
+    terms = Counter(tokenize(target.text or ""))
+    if not terms:
+        return
+
+    document_id = connection.execute(
+        insert(models.SearchDocument).values(
+            kind=kind,
+            entity_id=target.id,
+            language=getattr(target, "language", None),
+            philosophy=getattr(target, "philosophy", None),
+            length=sum(terms.values()),
+            sutra_id=target.id if kind == "sutra" else target.sutra_id,
+        )
+    ).inserted_primary_key[0]
+    connection.execute(
+        insert(models.SearchPosting),
+        [{"document_id": document_id, "term": term, "tf": tf} for term, tf in terms.items()],
+    )
+
+
+def _register(kind: str, model) -> None:
+    @event.listens_for(model, "after_insert")
+    @event.listens_for(model, "after_update")
+    def _index(mapper, connection, target):
+        index_entity(connection, kind, target)
+
+    @event.listens_for(model, "after_delete")
+    def _unindex(mapper, connection, target):
+        unindex_entity(connection, kind, target.id)
+
+
+for _kind, _model in INDEXED_MODELS.items():
+    _register(_kind, _model)
+
+
+def rebuild_index(db: Session) -> int:
+    """
+    Drop and rebuild the whole index. Returns the number of indexed rows.
+    """
+    connection = db.connection()
+    connection.execute(delete(models.SearchPosting))
+    connection.execute(delete(models.SearchDocument))
+    indexed = 0
+    for kind, model in INDEXED_MODELS.items():
+        last_id = 0
+        while batch := db.query(model).filter(model.id > last_id).order_by(model.id).limit(500).all():
+            for row in batch:
+                index_entity(connection, kind, row)
+            indexed += len(batch)
+            last_id = batch[-1].id
+            db.expunge_all()
+    db.commit()
+    return indexed
+
+
+def _expand_terms(db: Session, tokens: List[str]) -> dict:
+    """
+    Map every indexed term matching a query token to (positions of the tokens
+    it matches, document frequency). A term may match several tokens when one
+    token is a prefix of another, e.g. "brahman" matches "brahma" and "brahman".
+    """
+    conditions = [
+        models.SearchPosting.term.startswith(token, autoescape=True)
+        if len(token) >= MIN_PREFIX_LENGTH
+        else models.SearchPosting.term == token
+        for token in tokens
+    ]
+    rows = db.execute(
+        select(models.SearchPosting.term, func.count(models.SearchPosting.document_id))
+        .where(or_(*conditions))
+        .group_by(models.SearchPosting.term)
+    ).all()
+
+    expanded = {}
+    for term, df in rows:
+        positions = tuple(
+            position for position, token in enumerate(tokens)
+            if term == token or (len(token) >= MIN_PREFIX_LENGTH and term.startswith(token))
+        )
+        if positions: expanded[term] = (positions, df)
+    return expanded
+
+
+def search(db: Session, term: str, project_name: Optional[str] = None, limit: int = 20, offset: int = 0) -> List[dict]:
+    """
+    Return content rows matching every term of the query, best matches first.
+    """
+    tokens = list(dict.fromkeys(tokenize(term)))
+    if not tokens:
+        return []
+    expanded = _expand_terms(db, tokens)
+    if len({position for positions, _ in expanded.values() for position in positions}) < len(tokens):
+        return []
+
+    total_documents, average_length = db.execute(
+        select(func.count(models.SearchDocument.id), func.avg(models.SearchDocument.length))
+    ).one()
+    average_length = float(average_length or 1)
+    idf = {
+        term: math.log(1 + (total_documents - df + 0.5) / (df + 0.5))
+        for term, (_, df) in expanded.items()
+    }
+
+    tf = models.SearchPosting.tf
+    length_norm = K1 * (1 - B + B * models.SearchDocument.length / average_length)
+    score = func.sum(case(idf, value=models.SearchPosting.term) * tf * (K1 + 1) / (tf + length_norm))
+    # Every token must be matched by at least one term of the document
+    matches_every_token = and_(*[
+        func.max(case((models.SearchPosting.term.in_([t for t, (positions, _) in expanded.items() if position in positions]), 1), else_=0)) == 1
+        for position in range(len(tokens))
+    ])
+
+    query = (
+        select(models.SearchDocument.id, score.label("score"))
+        .join(models.SearchPosting, models.SearchPosting.document_id == models.SearchDocument.id)
+        .where(models.SearchPosting.term.in_(expanded))
+        .group_by(models.SearchDocument.id)
+        .having(matches_every_token)
+        .order_by(desc("score"), models.SearchDocument.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    if project_name is not None:
+        query = (
+            query.join(models.Sutra, models.Sutra.id == models.SearchDocument.sutra_id)
+            .join(app_models.Project, app_models.Project.id == models.Sutra.project_id)
+            .where(app_models.Project.name == project_name)
+        )
+    ranked = db.execute(query).all()
+    if not ranked:
+        return []
+
+    return _hydrate(db, [(document_id, score) for document_id, score in ranked])
+
+
+def _hydrate(db: Session, ranked: Iterable[tuple]) -> List[dict]:
+    # Load the ranked page with its sutra and project, then the texts: one query per kind present
+    ranked = list(ranked)
+    rows = db.execute(
+        select(models.SearchDocument, models.Sutra.chapter, models.Sutra.number, app_models.Project.name)
+        .join(models.Sutra, models.Sutra.id == models.SearchDocument.sutra_id)
+        .join(app_models.Project, app_models.Project.id == models.Sutra.project_id)
+        .where(models.SearchDocument.id.in_([document_id for document_id, _ in ranked]))
+    ).all()
+    documents = {row[0].id: row for row in rows}
+
+    texts = {}
+    by_kind = {}
+    for document, *_ in rows:
+        by_kind.setdefault(document.kind, []).append(document.entity_id)
+    for kind, entity_ids in by_kind.items():
+        model = INDEXED_MODELS[kind]
+        for entity_id, text in db.execute(select(model.id, model.text).where(model.id.in_(entity_ids))):
+            texts[(kind, entity_id)] = text
+
+    results = []
+    for document_id, score in ranked:
+        if document_id not in documents:
+            continue
+        document, chapter, number, project = documents[document_id]
+        if document.kind in ("interpretation", "bhashyam"):
+            mode = f"{document.kind} - {document.philosophy}"
+        else:
+            mode = "chant"
+        results.append({
+            "text": texts.get((document.kind, document.entity_id), ""),
+            "sutra_no": number,
+            "chapter": chapter,
+            "project": project,
+            "kind": document.kind,
+            "mode": mode,
+            "lang": document.language,
+            "philosophy": document.philosophy,
+            "score": round(float(score), 4),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    with SessionLocal() as db:
+        print(f"indexed {rebuild_index(db)} rows")
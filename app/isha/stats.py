@@ -0,0 +1,219 @@
+"""
+Per chapter statistics of the content of each project.
+
+`content_stats` holds one row per (project, chapter, kind, language,
+philosophy), e.g. (isha, 1, "meaning", "en", ""), with the number of verses
+having that content and a coverage bitmap of their numbers: bit n (byte n // 8,
+bit n % 8) is set if verse n has it. The API only accepts verse numbers up to
+`MAX_VERSE_NUMBER`, which bounds a bitmap to 1.25 KB. Sutras themselves are
+counted under kind "sutra", so `/sutras/total-count` and `/coverage` (which
+verses lack which translation) are answered from a few small rows instead of
+scanning the content tables.
+
+Like the search index, the table is kept in sync by mapper events, in the
+transaction of the write. Core statements (`app.ingest`) refresh the chapters
+they touched with `refresh_chapter`. Existing databases are filled, or the
+table rebuilt after writes that bypassed the ORM, with:
+
+    python -m app.isha.stats
+"""
+
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from sqlalchemy import Connection, delete, event, func, insert, inspect, literal, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.isha import models
+from app.isha.schemas import MAX_VERSE_NUMBER
+
+# Content kinds counted besides "sutra", and the model holding them
+COUNTED_MODELS = {
+    "meaning": models.Meaning,
+    "transliteration": models.Transliteration,
+    "interpretation": models.Interpretation,
+    "bhashyam": models.Bhashyam,
+}
+
+
+def to_bitmap(numbers: Iterable[int]) -> bytes:
+    bitmap = bytearray()
+    for number in numbers:
+        if not 0 <= number <= MAX_VERSE_NUMBER: continue  # Only rows written around the API can be out of range
+        if number // 8 >= len(bitmap): bitmap.extend(bytes(number // 8 + 1 - len(bitmap)))
+        bitmap[number // 8] |= 1 << number % 8
+    return bytes(bitmap)
+
+
+def verses(bitmap: bytes) -> list[int]:
+    """
+    The verse numbers set in a coverage bitmap, in order.
+    """
+    return [index * 8 + bit for index, byte in enumerate(bitmap) if byte for bit in range(8) if byte >> bit & 1]
+
+
+def _key(kind: str, language=None, philosophy=None) -> tuple[str, str, str]:
+    # Enum members and NULLs reduced to the stored strings
+    return kind, getattr(language, "value", language) or "", getattr(philosophy, "value", philosophy) or ""
+
+
+def _adjust(connection: Connection, project_id: int, chapter: int, number: int, key: tuple[str, str, str], present: bool) -> None:
+    """
+    Record that verse `number` of a chapter has (or no longer has) the content `key`.
+    """
+    if not 0 <= number <= MAX_VERSE_NUMBER: return
+    table = models.ContentStat.__table__
+    kind, language, philosophy = key
+    match = (
+        table.c.project_id == project_id, table.c.chapter == chapter,
+        table.c.kind == kind, table.c.language == language, table.c.philosophy == philosophy,
+    )
+    if present:
+        # Create the row if it is missing. The conflict branch locks an existing row, so a
+        # concurrent first insert waits for this one instead of hitting the unique index.
+        dialect = connection.dialect.name
+        statement = {"mysql": mysql.insert, "postgresql": postgresql.insert}.get(dialect, sqlite.insert)(table).values(
+            project_id=project_id, chapter=chapter, kind=kind, language=language, philosophy=philosophy,
+            count=0, coverage=b"",
+        )
+        if dialect == "mysql":
+            statement = statement.on_duplicate_key_update(count=table.c.count)
+        else:
+            statement = statement.on_conflict_do_update(
+                index_elements=["project_id", "chapter", "kind", "language", "philosophy"], set_={"count": table.c.count}
+            )
+        connection.execute(statement)
+    # The row is locked until the write commits, so concurrent writers cannot lose each other's bits
+    row = connection.execute(select(table.c.id, table.c.count, table.c.coverage).where(*match).with_for_update()).first()
+    if row is None: return
+    coverage = bytearray(row.coverage)
+    byte, bit = number // 8, 1 << number % 8
+    if (byte < len(coverage) and coverage[byte] & bit != 0) == present: return
+
+    if not present and row.count <= 1:
+        connection.execute(delete(table).where(table.c.id == row.id))
+    else:
+        if present:
+            if byte >= len(coverage): coverage.extend(bytes(byte + 1 - len(coverage)))
+            coverage[byte] |= bit
+        else:
+            coverage[byte] &= ~bit
+        connection.execute(
+            update(table).where(table.c.id == row.id)
+            .values(count=table.c.count + (1 if present else -1), coverage=bytes(coverage.rstrip(b"\0")))
+        )
+
+
+def refresh_chapter(connection: Connection, project_id: int, chapter: int) -> None:
+    """
+    Recompute the statistics of one chapter from the content tables.
+    """
+    connection.execute(delete(models.ContentStat).where(
+        models.ContentStat.project_id == project_id, models.ContentStat.chapter == chapter
+    ))
+    numbers = defaultdict(list)
+    in_chapter = (models.Sutra.project_id == project_id, models.Sutra.chapter == chapter)
+    for (number,) in connection.execute(select(models.Sutra.number).where(*in_chapter)):
+        numbers[_key("sutra")].append(number)
+    for kind, model in COUNTED_MODELS.items():
+        columns = (models.Sutra.number, model.language, getattr(model, "philosophy", literal("")))
+        query = select(*columns).join(models.Sutra, model.sutra_id == models.Sutra.id).where(*in_chapter)
+        for number, language, philosophy in connection.execute(query):
+            numbers[_key(kind, language, philosophy)].append(number)
+    rows = []
+    for (kind, language, philosophy), key_numbers in numbers.items():
+        coverage = to_bitmap(key_numbers)
+        rows.append({
+            "project_id": project_id, "chapter": chapter, "kind": kind, "language": language, "philosophy": philosophy,
+            "count": len(verses(coverage)), "coverage": coverage,
+        })
+    if rows: connection.execute(insert(models.ContentStat), rows)
+
+
+def _history(target, attribute: str) -> tuple:
+    # (value before the flush, current value)
+    history = inspect(target).attrs[attribute].history
+    current = getattr(target, attribute)
+    return (history.deleted[0] if history.deleted else current), current
+
+
+def _verse(connection: Connection, sutra_id: int) -> Optional[tuple[int, int, int]]:
+    return connection.execute(
+        select(models.Sutra.project_id, models.Sutra.chapter, models.Sutra.number).where(models.Sutra.id == sutra_id)
+    ).first()
+
+
+@event.listens_for(models.Sutra, "after_insert")
+def _count_sutra(mapper, connection, target):
+    _adjust(connection, target.project_id, target.chapter, target.number, _key("sutra"), True)
+
+
+@event.listens_for(models.Sutra, "after_update")
+def _move_sutra(mapper, connection, target):
+    # A sutra moved to another verse takes its content along: recount both chapters
+    changes = [_history(target, attribute) for attribute in ("project_id", "chapter", "number")]
+    if all(old == new for old, new in changes): return
+    (old_project, project_id), (old_chapter, chapter), _ = changes
+    refresh_chapter(connection, old_project, old_chapter)
+    if (old_project, old_chapter) != (project_id, chapter): refresh_chapter(connection, project_id, chapter)
+
+
+@event.listens_for(models.Sutra, "before_delete")
+def _uncount_sutra(mapper, connection, target):
+    _adjust(connection, target.project_id, target.chapter, target.number, _key("sutra"), False)
+
+
+def _register(kind: str, model) -> None:
+    def key(target, index: int = 1):
+        values = [_history(target, attribute)[index] for attribute in ("language", "philosophy") if hasattr(model, attribute)]
+        return _key(kind, *values)
+
+    @event.listens_for(model, "after_insert")
+    def _count(mapper, connection, target):
+        verse = _verse(connection, target.sutra_id)
+        if verse: _adjust(connection, *verse, key(target), True)
+
+    @event.listens_for(model, "after_update")
+    def _recount(mapper, connection, target):
+        old_sutra, sutra_id = _history(target, "sutra_id")
+        if old_sutra == sutra_id and key(target, 0) == key(target): return
+        old_verse, verse = _verse(connection, old_sutra), _verse(connection, sutra_id)
+        if old_verse: _adjust(connection, *old_verse, key(target, 0), False)
+        if verse: _adjust(connection, *verse, key(target), True)
+
+    @event.listens_for(model, "before_delete")
+    def _uncount(mapper, connection, target):
+        verse = _verse(connection, target.sutra_id)
+        if verse: _adjust(connection, *verse, key(target), False)
+
+
+for _kind, _model in COUNTED_MODELS.items():
+    _register(_kind, _model)
+
+
+def rebuild_stats(db: Session, project_id: Optional[int] = None) -> int:
+    """
+    Recompute the statistics of every chapter, or of one project. Returns the number of rows.
+    """
+    connection = db.connection()
+    stats = delete(models.ContentStat)
+    chapters = select(models.Sutra.project_id, models.Sutra.chapter).distinct()
+    if project_id is not None:
+        stats = stats.where(models.ContentStat.project_id == project_id)
+        chapters = chapters.where(models.Sutra.project_id == project_id)
+    connection.execute(stats)
+    for chapter_project, chapter in connection.execute(chapters).all():
+        refresh_chapter(connection, chapter_project, chapter)
+    count = select(func.count(models.ContentStat.id))
+    if project_id is not None: count = count.where(models.ContentStat.project_id == project_id)
+    rows = connection.scalar(count)
+    db.commit()
+    return rows
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    with SessionLocal() as db:
+        print(f"computed {rebuild_stats(db)} statistics rows")
@@ -0,0 +1,189 @@
+"""
+Content-addressed storage of uploaded audio files.
+
+Recordings are stored once per content under `settings.audio_store_dir`, at
+`<store>/<ab>/<cd>/<sha256><ext>` where `ab` and `cd` are the first bytes of
+the hash, so no directory grows too large. `Audio.file_path` holds that path:
+identical uploads share one file, whichever project, chapter or sutra they
+belong to, and a path always refers to the same bytes, so clients and CDNs can
+cache it forever. Transcoded variants are stored the same way. A file is
+deleted when the last `Audio` or `AudioVariant` row referencing it goes away.
+
+Between moving a file into the store and committing the row that references
+it, nothing in the database tells `release` that the file is in use, and an
+identical file released meanwhile would take it along. Writers hold
+`store_lock` (shared between the workers, exclusive on Windows) across that
+window, and `release` holds it exclusively while it checks the references and
+deletes.
+
+Starlette spools a multipart body to a temporary file before the handler
+runs, so the upload routes reject a request whose Content-Length exceeds the
+limit before its body is read (`reject_oversized`); the body of a request
+without one (chunked) is spooled, and `save_upload` stops copying it once it
+exceeds the limit. Uploads are copied in fixed-size chunks, so the memory used
+per upload does not depend on the size of the recording. The data goes to a temporary file
+in the store and is renamed into place once complete, so readers never see a
+partially written file. The SHA-256 of the content is computed while copying.
+"""
+
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+from fastapi import HTTPException, Request, UploadFile, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.isha import models
+
+CHUNK_SIZE = 1024 * 1024
+# Room for the multipart boundaries and part headers around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class StoredFile(NamedTuple):
+    path: Path
+    sha256: str
+    size: int
+
+
+def too_large(max_bytes: int) -> None:
+    raise HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Audio files are limited to {max_bytes} bytes",
+    )
+
+
+def reject_oversized(request: Request, max_bytes: int) -> None:
+    """
+    Answer 413 from the Content-Length of an upload, before its body is read.
+    """
+    try:
+        length = int(request.headers.get("content-length", 0))
+    except ValueError:
+        return
+    if length > max_bytes + MULTIPART_OVERHEAD: too_large(max_bytes)
+
+
+def blob_path(sha256: str, suffix: str = "") -> Path:
+    return Path(settings.audio_store_dir) / sha256[:2] / sha256[2:4] / f"{sha256}{suffix.lower()}"
+
+
+@contextmanager
+def store_lock(exclusive: bool = False) -> Iterator[None]:
+    """
+    Hold the lock of the store, shared by default. Writers hold it from storing
+    a file until the row referencing it is committed; `release` takes it
+    exclusively, so it must not be called while holding it.
+    """
+    store = Path(settings.audio_store_dir)
+    store.mkdir(parents=True, exist_ok=True)
+    # Both kinds of locks belong to the open file, so threads conflict like processes do
+    with open(store / ".lock", "a") as lock:
+        if os.name == "nt":
+            import msvcrt
+
+            # Windows has no shared locks: writers take turns as well.
+            # LK_LOCK gives up after 10 attempts, so keep trying.
+            lock.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+
+def save_upload(upload: UploadFile, max_bytes: int) -> StoredFile:
+    """
+    Copy an upload into the store, aborting with 413 once it exceeds `max_bytes`.
+    Returns the content-addressed path, shared with any identical upload.
+
+    The request body has already been spooled by then: this bounds what is
+    copied to the store, `reject_oversized` keeps large bodies from being read.
+    """
+    if upload.size is not None and upload.size > max_bytes: too_large(max_bytes)
+    store = Path(settings.audio_store_dir)
+    store.mkdir(parents=True, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=store, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while chunk := upload.file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes: too_large(max_bytes)
+                digest.update(chunk)
+                buffer.write(chunk)
+            buffer.flush()
+            os.fsync(buffer.fileno())
+        return _move_to_store(Path(temp_path), digest.hexdigest(), size, Path(upload.filename or "").suffix)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+
+
+def save_file(path: Path, suffix: str) -> StoredFile:
+    """
+    Move a file written inside the store (e.g. by the transcoder) to its content-addressed path.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return _move_to_store(path, digest.hexdigest(), path.stat().st_size, suffix)
+
+
+def _move_to_store(path: Path, sha256: str, size: int, suffix: str) -> StoredFile:
+    destination = blob_path(sha256, suffix)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    # Replacing an existing copy is harmless (same bytes) and restores it if
+    # a concurrent release removed it in the meantime
+    os.replace(path, destination)
+    return StoredFile(destination, sha256, size)
+
+
+def audio_files(*audios: models.Audio) -> list[str]:
+    """
+    Stored files of recordings and their variants, to `release` after deleting them.
+    """
+    return [path for audio in audios for path in (audio.file_path, *(variant.file_path for variant in audio.variants))]
+
+
+def release(db: Session, *file_paths: str) -> list[str]:
+    """
+    Delete the stored files that no `Audio` or `AudioVariant` row references any more.
+    Call after committing the change that dropped the references, without holding
+    `store_lock`. Files outside the store (uploaded before content addressing) are kept.
+
+    Returns:
+        list[str]: The deleted paths.
+    """
+    store = Path(settings.audio_store_dir).resolve()
+    candidates = {path for path in file_paths if Path(path).resolve().is_relative_to(store)}
+    if not candidates: return []
+    with store_lock(exclusive=True):
+        db.rollback()  # References committed while waiting for the lock must be visible
+        referenced = set(db.scalars(
+            select(models.Audio.file_path).where(models.Audio.file_path.in_(candidates))
+            .union(select(models.AudioVariant.file_path).where(models.AudioVariant.file_path.in_(candidates)))
+        ))
+        deleted = sorted(candidates - referenced)
+        for path in deleted:
+            Path(path).unlink(missing_ok=True)
+    return deleted
@@ -0,0 +1,86 @@
+"""
+Serving of stored audio files with byte ranges.
+
+`AudioFileResponse` is a `FileResponse` whose validators come from the SHA-256
+recorded at upload instead of the file's mtime, so every copy of a recording
+has the same `ETag` and a `Range` request with `If-Range` keeps resuming after
+the file is moved or restored. Players seek with `Range` and get 206 Partial
+Content with just the requested bytes.
+
+The file is streamed in chunks through the event loop. Neither uvicorn nor
+hypercorn implement the `http.response.zerocopysend` extension, but a server
+offering it is handed the open file and copies it to the socket with
+`sendfile`. To serve large volumes of audio without Python in the data path,
+let the reverse proxy serve `audio_store_dir` (e.g. nginx `sendfile` with an
+internal location reached through `X-Accel-Redirect`).
+"""
+
+import os
+from typing import Optional
+
+from fastapi import Request, Response, status
+from fastapi.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+from app.config import settings
+from app.conditional import Validators, is_not_modified
+
+ZERO_COPY_EXTENSION = "http.response.zerocopysend"
+
+
+def audio_etag(sha256: str) -> str:
+    return f'"{sha256}"'
+
+
+class AudioFileResponse(FileResponse):
+    def __init__(self, path: str | os.PathLike[str], sha256: Optional[str] = None, immutable: bool = False, **kwargs):
+        headers = dict(kwargs.pop("headers", None) or {})
+        # Hash-versioned URLs never change content; other URLs are revalidated with the ETag
+        headers["Cache-Control"] = settings.audio_immutable_cache_control if immutable else settings.audio_cache_control
+        if sha256: headers["ETag"] = audio_etag(sha256)
+        super().__init__(path, headers=headers, content_disposition_type="inline", **kwargs)
+        self._zero_copy = False
+
+    def _should_use_range(self, http_if_range: str, stat_result: os.stat_result) -> bool:
+        etag = self.headers.get("etag")
+        if etag is not None and http_if_range == etag: return True
+        return super()._should_use_range(http_if_range, stat_result)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self._zero_copy = ZERO_COPY_EXTENSION in scope.get("extensions", {})
+        await super().__call__(scope, receive, send)
+
+    async def _send_file(self, send: Send, start: int, count: int) -> None:
+        with open(self.path, "rb") as file:
+            # The extension takes the file object, the server calls os.sendfile on its fileno()
+            await send({"type": ZERO_COPY_EXTENSION, "file": file, "offset": start, "count": count, "more_body": False})
+
+    async def _handle_simple(self, send: Send, send_header_only: bool) -> None:
+        if not self._zero_copy or send_header_only:
+            return await super()._handle_simple(send, send_header_only)
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        await self._send_file(send, 0, int(self.headers["content-length"]))
+
+    async def _handle_single_range(self, send: Send, start: int, end: int, file_size: int, send_header_only: bool) -> None:
+        if not self._zero_copy or send_header_only:
+            return await super()._handle_single_range(send, start, end, file_size, send_header_only)
+        self.headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+        self.headers["content-length"] = str(end - start)
+        await send({"type": "http.response.start", "status": status.HTTP_206_PARTIAL_CONTENT, "headers": self.raw_headers})
+        await self._send_file(send, start, end - start)
+
+
+def stream_audio(request: Request, path: str, sha256: Optional[str], version: Optional[str] = None) -> Response:
+    """
+    Serve the audio file at `path`, or 304 if the client's copy is current.
+
+    Parameters:
+        sha256: Content hash recorded at upload, None for files uploaded before hashing.
+        version: The `v` query parameter; responses to URLs pinned to the
+            current hash may be cached indefinitely.
+    """
+    immutable = sha256 is not None and version == sha256
+    if sha256 and is_not_modified(request, Validators(audio_etag(sha256))):
+        cache_control = settings.audio_immutable_cache_control if immutable else settings.audio_cache_control
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": audio_etag(sha256), "Cache-Control": cache_control})
+    return AudioFileResponse(path, sha256=sha256, immutable=immutable)
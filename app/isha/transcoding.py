@@ -0,0 +1,186 @@
+"""
+Background processing of uploaded audio: measurements and lower bitrate variants.
+
+Uploads are kept as they are, often WAV or high bitrate MP3. After an upload is
+committed its id is submitted to `transcoder`, which on `audio_transcode_workers`
+threads of this process (no external queue):
+
+* measures the recording (`app.isha.analysis`), which decodes all of it, and
+  stores the duration, loudness and peaks on the `Audio` row. Until then the
+  `/audio/meta` fields are null;
+* encodes a MP3 variant per `Quality` with ffmpeg. Variants are stored
+  content-addressed next to the original and recorded as `AudioVariant` rows;
+  until they exist, and when ffmpeg is not installed, clients get the original.
+
+A job whose recording was replaced or deleted while it ran discards its output.
+Jobs still queued when the process exits are dropped; at startup `resume` queues
+again the recordings left without measurements or, when ffmpeg is available,
+without variants.
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import sessionmaker
+
+from app.cache import content_cache
+from app.config import settings
+from app.database import SessionLocal
+from app.isha import models
+from app.isha.analysis import analyze
+from app.isha.storage import StoredFile, release, save_file, store_lock
+from app.utils import Quality
+
+logger = logging.getLogger(__name__)
+
+# kbit/s and channels of each variant; speech stays intelligible at 32 kbit/s mono
+VARIANTS = {
+    Quality.low: (32, 1),
+    Quality.medium: (64, 1),
+    Quality.high: (128, 2),
+}
+
+
+class Transcoder:
+    def __init__(self, workers: int, session_factory: sessionmaker = SessionLocal):
+        self.session_factory = session_factory
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="audio-transcode")
+        self._lock = threading.Lock()
+        self._pending: set[Future] = set()
+
+    @property
+    def available(self) -> bool:
+        return settings.audio_transcode_enabled and shutil.which(settings.ffmpeg_path) is not None
+
+    def submit(self, audio_id: int) -> Future:
+        """
+        Queue the measurement and transcoding of a committed `Audio` row.
+        """
+        future = self._executor.submit(self.process, audio_id)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def resume(self) -> int:
+        """
+        Queue the recordings whose jobs did not complete, e.g. dropped by a restart.
+        Returns the number of jobs queued.
+        """
+        unprocessed = models.Audio.duration.is_(None)
+        if self.available: unprocessed = or_(unprocessed, ~models.Audio.variants.any())
+        with self.session_factory() as db:
+            audio_ids = db.scalars(select(models.Audio.id).where(unprocessed).order_by(models.Audio.id)).all()
+        for audio_id in audio_ids:
+            self.submit(audio_id)
+        return len(audio_ids)
+
+    def _done(self, future: Future) -> None:
+        with self._lock:
+            self._pending.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("audio transcoding failed", exc_info=future.exception())
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """
+        Wait for the queued jobs to finish.
+        """
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending, timeout=timeout)
+
+    def encode(self, source: Path, destination: Path, bitrate: int, channels: int) -> None:
+        subprocess.run(
+            [
+                settings.ffmpeg_path, "-nostdin", "-y", "-loglevel", "error",
+                "-i", str(source), "-vn", "-map_metadata", "-1",
+                "-ac", str(channels), "-codec:a", "libmp3lame", "-b:a", f"{bitrate}k",
+                "-f", "mp3", str(destination),
+            ],
+            check=True,
+            capture_output=True,
+            timeout=settings.audio_transcode_timeout_seconds,
+        )
+
+    def process(self, audio_id: int) -> list[StoredFile]:
+        self.measure(audio_id)
+        if not self.available:
+            logger.info("audio transcoding unavailable, serving audio %s as uploaded", audio_id)
+            return []
+        return self.transcode(audio_id)
+
+    def measure(self, audio_id: int) -> None:
+        with self.session_factory() as db:
+            audio = db.get(models.Audio, audio_id)
+            if audio is None: return
+            source, sha256 = Path(audio.file_path), audio.sha256
+
+        metadata = analyze(source)
+        with self.session_factory() as db:
+            audio = db.get(models.Audio, audio_id)
+            if audio is None or audio.sha256 != sha256: return
+            audio.duration, audio.sample_rate, audio.channels, audio.loudness, audio.peaks = metadata or (None,) * 5
+            verse = (audio.sutra.project.name, audio.sutra.chapter, audio.sutra.number)
+            db.commit()
+            content_cache.invalidate(*verse, "audio")
+
+    def transcode(self, audio_id: int) -> list[StoredFile]:
+        with self.session_factory() as db:
+            audio = db.get(models.Audio, audio_id)
+            if audio is None: return []
+            source, sha256 = Path(audio.file_path), audio.sha256
+
+        # Encode without holding a database connection nor the store lock
+        encoded: dict[Quality, tuple[int, Path]] = {}
+        Path(settings.audio_store_dir).mkdir(parents=True, exist_ok=True)
+        try:
+            for quality, (bitrate, channels) in VARIANTS.items():
+                fd, temp_path = tempfile.mkstemp(dir=settings.audio_store_dir, prefix=".transcode-", suffix=".mp3")
+                os.close(fd)  # ffmpeg overwrites the file itself
+                encoded[quality] = (bitrate, Path(temp_path))
+                self.encode(source, Path(temp_path), bitrate, channels)
+
+            variants: dict[Quality, tuple[int, StoredFile]] = {}
+            with self.session_factory() as db:
+                try:
+                    with store_lock():
+                        audio = db.get(models.Audio, audio_id)
+                        # Replaced or deleted meanwhile; a newer job handles the current file
+                        if audio is None or audio.sha256 != sha256: return []
+                        for quality, (bitrate, temp_path) in encoded.items():
+                            variants[quality] = (bitrate, save_file(temp_path, ".mp3"))
+                        existing = {variant.quality: variant for variant in audio.variants}
+                        previous = [variant.file_path for variant in audio.variants]
+                        for quality, (bitrate, stored) in variants.items():
+                            # Updated in place, the unique (audio_id, quality) index forbids insert-then-delete
+                            variant = existing.get(quality.value)
+                            if variant is None:
+                                variant = models.AudioVariant(quality=quality.value)
+                                audio.variants.append(variant)
+                            variant.bitrate, variant.file_path, variant.sha256, variant.size = bitrate, str(stored.path), stored.sha256, stored.size
+                        verse = (audio.sutra.project.name, audio.sutra.chapter, audio.sutra.number)
+                        db.commit()
+                except BaseException:
+                    db.rollback()
+                    release(db, *(str(stored.path) for _, stored in variants.values()))
+                    raise
+                release(db, *previous)
+                content_cache.invalidate(*verse, "audio")
+        finally:
+            for _, temp_path in encoded.values():
+                temp_path.unlink(missing_ok=True)
+        return [stored for _, stored in variants.values()]
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+transcoder = Transcoder(workers=settings.audio_transcode_workers)
@@ -1,13 +1,29 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from app.config import settings
-from app.isha.main import isha
-from app.kena.main import kena
-from app.routers import auth, projects, users
+from app.database import SessionLocal
+from app.isha.transcoding import transcoder
+from app.pagination import PAGINATION_HEADERS
+from app.registry import project_registry
+from app.replicas import mark_read_your_writes
+from app.routers import auth, content, metrics, projects, users
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    project_registry.warm(SessionLocal)
+    # Jobs dropped by the previous shutdown
+    transcoder.resume()
+    yield
+    # Queued transcoding jobs are dropped (resumed at the next startup), the running ones finish in the background
+    transcoder.shutdown()
+
 
 app = FastAPI(
+    lifespan=lifespan,
     docs_url=None if settings.env == "production" else "/docs",
     redoc_url=None if settings.env == "production" else "/redoc",
 )
@@ -22,9 +38,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=PAGINATION_HEADERS,
 )
 
 
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    # Successful writes pin the client's following reads to the primary database
+    response = await call_next(request)
+    if request.method in ("POST", "PUT", "PATCH", "DELETE") and response.status_code < 400:
+        mark_read_your_writes(response, settings.db_read_your_writes_seconds)
+    return response
+
+
 @app.get("/healthz")
 def health_check():
     return {"status": "available", "environment": settings.env}
@@ -33,6 +59,6 @@ def health_check():
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(projects.router)
-
-app.mount("/isha", isha)
-app.mount("/kena", kena)
+app.include_router(metrics.router)
+# Last: its /{upanishad} prefix would shadow the routes above
+app.include_router(content.router)
@@ -0,0 +1,115 @@
+"""
+Bring an existing database schema up to date with the models.
+
+`Base.metadata.create_all` only creates missing tables; it never touches tables
+that already exist. Deployments created before an index or column was added to
+the models are upgraded with:
+
+    python -m app.migrations
+
+The upgrade is additive and idempotent: missing tables, columns and indexes are
+created, nothing is dropped. Unique indexes are only created once the existing
+rows satisfy them, otherwise the offending duplicates are reported and the
+index is skipped so they can be cleaned up by hand. The content statistics of
+`app.isha.stats` and the search index of `app.isha.search` are computed on the
+first upgrade, and recorded in `backfills` so that later upgrades leave them to
+the application.
+"""
+
+from sqlalchemy import Engine, func, inspect, select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn
+
+from app.database import Base, engine
+
+# Import the model modules so every table is registered on Base.metadata
+from app import models
+from app.isha import models as isha_models  # noqa: F401
+from app.isha.search import rebuild_index
+from app.isha.stats import rebuild_stats
+
+
+def find_duplicates(bind: Engine, index) -> list[tuple]:
+    """
+    Return the column values that occur more than once for a unique index.
+    """
+    columns = list(index.columns)
+    query = (
+        select(*columns, func.count().label("rows"))
+        .group_by(*columns)
+        .having(func.count() > 1)
+    )
+    with bind.connect() as conn:
+        return [tuple(row) for row in conn.execute(query)]
+
+
+def upgrade(bind: Engine = engine) -> list[str]:
+    """
+    Create missing tables, columns and indexes.
+
+    Returns:
+        list[str]: Human readable description of every change or skipped step.
+    """
+    changes = []
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            table.create(bind)
+            changes.append(f"created table {table.name}")
+            continue
+
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            ddl = CreateColumn(column).compile(dialect=bind.dialect)
+            with bind.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+            changes.append(f"added column {table.name}.{column.name}")
+
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            if index.unique:
+                duplicates = find_duplicates(bind, index)
+                if duplicates:
+                    changes.append(
+                        f"skipped unique index {index.name}: {len(duplicates)} duplicate "
+                        f"value(s) in {table.name}, e.g. {duplicates[0][:-1]}"
+                    )
+                    continue
+            index.create(bind)
+            changes.append(f"created index {index.name}")
+
+    changes.extend(backfill_stats(bind))
+    changes.extend(backfill_search(bind))
+    return changes
+
+
+def backfill(bind: Engine, name: str, rebuild, change: str) -> list[str]:
+    """
+    Run `rebuild` unless the backfill `name` is recorded. The table may already hold rows
+    written by the application since it was created (here or by `create_all` at startup),
+    so whether it is empty does not tell whether it is complete.
+    """
+    with Session(bind) as db:
+        if db.get(models.Backfill, name) is not None: return []
+        rows = rebuild(db)
+        db.add(models.Backfill(name=name))
+        db.commit()
+        return [change.format(rows)] if rows else []
+
+
+def backfill_stats(bind: Engine) -> list[str]:
+    return backfill(bind, "content_stats", rebuild_stats, "computed {} content statistics rows")
+
+
+def backfill_search(bind: Engine) -> list[str]:
+    return backfill(bind, "search_documents", rebuild_index, "indexed {} rows for search")
+
+if __name__ == "__main__":
+    for change in upgrade() or ["schema is up to date"]:
+        print(change)
@@ -31,3 +31,10 @@ class Project(Base):
     img: Mapped[str] = mapped_column(String(500), nullable=True)
 
     sutras = relationship("Sutra", backref="project", cascade="all, delete-orphan")
+
+
+class Backfill(Base):
+    # Data computed once by app.migrations, e.g. "content_stats"
+    __tablename__ = "backfills"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
@@ -1,4 +1,9 @@
+import threading
+import time
+import uuid
+from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta, timezone
+from typing import Optional
 
 import jwt
 from fastapi import Depends, HTTPException, Response, status
@@ -8,6 +13,7 @@ from sqlalchemy.orm import Session
 from app import models, schemas
 from app.config import settings
 from app.database import get_db
+from app.denylist import token_denylist
 
 SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
@@ -15,13 +21,70 @@ ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 REFRESH_TOKEN_EXPIRE_MINUTES = settings.refresh_token_expire_minutes
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    The authenticated caller, built from the verified claims of its access token
+    without a database lookup.
+    """
+
+    user_id: int
+    is_admin: bool
+    jti: Optional[str] = None
+    exp: Optional[int] = None
+
+    @property
+    def id(self) -> int:
+        return self.user_id
+
+
+class UserCache:
+    """
+    Short-lived cache of (exists, is_admin) per user, used when
+    `settings.auth_verify_user` requires checking tokens against the users table.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._users: dict[int, tuple[float, Optional[bool]]] = {}
+
+    def get(self, user_id: int, db: Session) -> Optional[bool]:
+        """
+        Return the user's is_admin flag, or None if the user does not exist.
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._users.get(user_id)
+        if cached and cached[0] > now:
+            return cached[1]
+        user = db.query(models.User.is_admin).filter(models.User.id == user_id).first()
+        is_admin = None if user is None else bool(user.is_admin)
+        with self._lock:
+            self._users[user_id] = (now + self.ttl, is_admin)
+        return is_admin
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache(ttl=settings.auth_user_cache_ttl_seconds)
 
 
 def create_access_token(data: dict):
     to_encode = data.copy()
 
     expire = datetime.now(UTC) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # jti identifies the token in the revocation list
+    to_encode.update({"exp": expire, "iat": datetime.now(UTC), "jti": uuid.uuid4().hex})
 
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
@@ -32,7 +95,7 @@ def create_refresh_token(data: dict):
     to_encode = data.copy()
 
     expire = datetime.now(UTC) + timedelta(minutes=REFRESH_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.now(UTC), "jti": uuid.uuid4().hex})
 
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
@@ -45,6 +108,7 @@ def verify_token(token: str, credentials_exception):
         user_id: int = payload.get("user_id")
         is_admin: bool = payload.get("is_admin")
         exp: int = payload.get("exp")
+        jti: str = payload.get("jti")
 
         if is_admin is None or is_admin == "":
             raise credentials_exception
@@ -55,7 +119,10 @@ def verify_token(token: str, credentials_exception):
         if token_exp_time < current_time:
             raise credentials_exception
 
-        token_data = schemas.TokenData(is_admin=is_admin, user_id=user_id)
+        if jti is not None and token_denylist.is_revoked(jti):
+            raise credentials_exception
+
+        token_data = schemas.TokenData(is_admin=is_admin, user_id=user_id, jti=jti, exp=exp)
 
     except jwt.ExpiredSignatureError:
         raise HTTPException(
@@ -86,27 +153,40 @@ def unset_jwt_cookie(response: Response):
     )
 
 
+def revoke_token(token: str) -> None:
+    """
+    Add a token to the revocation list until it expires. Invalid tokens are ignored.
+    """
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.InvalidTokenError:
+        return
+    if payload.get("jti") and payload.get("exp"):
+        token_denylist.revoke(payload["jti"], payload["exp"])
+
+
 def get_current_user(
     token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-):
+) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail=f"Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     token_data = verify_token(token, credentials_exception)
-    user = db.query(models.User).filter(models.User.id == token_data.user_id).first()
-    return user
-
+    is_admin = token_data.is_admin
+    # The session is only used (and a connection checked out) when freshness is required
+    if settings.auth_verify_user:
+        is_admin = user_cache.get(token_data.user_id, db)
+        if is_admin is None:
+            raise credentials_exception
+    return Principal(user_id=token_data.user_id, is_admin=is_admin, jti=token_data.jti, exp=token_data.exp)
 
-def get_current_admin(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-):
-    admin = get_current_user(token, db)
 
-    if not admin.is_admin:
+def get_current_admin(current_user: Principal = Depends(get_current_user)) -> Principal:
+    if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Not an admin"
         )
 
-    return admin
+    return current_user
@@ -0,0 +1,132 @@
+import base64
+import json
+import threading
+import time
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from fastapi import Query, Response
+
+from app.config import settings
+from app.errors import bad_request_error_response
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Response headers carrying the pagination state; the body stays a plain list
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+PAGINATION_HEADERS = [NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER]
+
+
+class PageParams:
+    """
+    Query parameters shared by the keyset-paginated list endpoints.
+
+    Requests without `limit` and `cursor` get the whole list, as before the
+    endpoints were paginated; a `cursor` without `limit` gets DEFAULT_PAGE_SIZE rows.
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+    ):
+        if limit is None and cursor is not None: limit = DEFAULT_PAGE_SIZE
+        self.limit = limit
+        self.cursor = cursor
+        self.include_total = include_total
+
+    @property
+    def fetch_size(self) -> Optional[int]:
+        # Rows to query: one more than the page to detect the next one, None for all
+        return None if self.limit is None else self.limit + 1
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Encode the sort key of the last row of a page into an opaque cursor.
+    """
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> tuple:
+    """
+    Decode a cursor produced by `encode_cursor` whose values have `types`,
+    e.g. `decode_cursor(cursor, int, int)`, raising 400 if it was tampered with.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        values = None
+    # type() rather than isinstance(): JSON booleans are ints to Python
+    if not isinstance(values, list) or len(values) != len(types) or any(type(value) is not kind for value, kind in zip(values, types)):
+        bad_request_error_response("Invalid pagination cursor.")
+    return tuple(values)
+
+
+def paginate(response: Response, rows: list, page: PageParams, sort_key: Callable[[Any], tuple], total: Optional[Callable[[], int]] = None) -> list:
+    """
+    Trim a page fetched with `limit + 1` rows and set the pagination headers.
+
+    Parameters:
+        response (Response): Response whose headers receive the cursor and total.
+        rows (list): Rows of the page, queried with one extra row to detect the next page.
+        page (PageParams): Pagination parameters of the request.
+        sort_key (Callable): Returns the keyset values of a row.
+        total (Callable, optional): Returns the total row count, only called when requested.
+    """
+    if page.limit is not None and len(rows) > page.limit:
+        rows = rows[: page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*sort_key(rows[-1]))
+    if page.include_total and total is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(total())
+    return rows
+
+
+class CountCache:
+    """
+    Short-lived cache of total row counts so that list endpoints do not run a
+    COUNT(*) per request. Entries expire after `ttl` seconds and are dropped
+    explicitly by the handlers that add or remove rows.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counts: dict[Hashable, tuple[float, int]] = {}
+
+    def get(self, key: Hashable, compute: Callable[[], int]) -> int:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._counts.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+        count = compute()
+        with self._lock:
+            self._counts[key] = (now + self.ttl, count)
+        return count
+
+    async def get_async(self, key: Hashable, compute: Callable[[], Awaitable[int]]) -> int:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._counts.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+        count = await compute()
+        with self._lock:
+            self._counts[key] = (now + self.ttl, count)
+        return count
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._counts.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+count_cache = CountCache(ttl=settings.count_cache_ttl_seconds)
@@ -0,0 +1,105 @@
+"""
+Connection pools instrumented with checkout metrics.
+
+The engines in `app.database` use these pool classes so that `/metrics/pool`
+can report how long requests wait for a connection and how close each pool is
+to exhaustion. Pools are identified by their `pool_logging_name`.
+"""
+
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Upper bounds (milliseconds) of the checkout wait histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolMetrics:
+    """
+    Checkout counters and wait-time histogram of one pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pool = None
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.peak_checked_out = 0
+            self.buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def record_checkout(self, wait: float, checked_out: int) -> None:
+        milliseconds = wait * 1000
+        bucket = next((i for i, bound in enumerate(WAIT_BUCKETS_MS) if milliseconds <= bound), len(WAIT_BUCKETS_MS))
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+            self.buckets[bucket] += 1
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        pool = self.pool
+        capacity = pool.size() + max(pool._max_overflow, 0) if pool is not None else 0
+        checked_out = pool.checkedout() if pool is not None else 0
+        with self._lock:
+            labels = [f"le_{bound}ms" for bound in WAIT_BUCKETS_MS] + ["gt_5000ms"]
+            return {
+                "size": pool.size() if pool is not None else 0,
+                "capacity": capacity,
+                "checked_out": checked_out,
+                "idle": pool.checkedin() if pool is not None else 0,
+                "saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+                "peak_checked_out": self.peak_checked_out,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "wait_histogram": dict(zip(labels, self.buckets)),
+            }
+
+
+pool_metrics: dict[str, PoolMetrics] = {}
+_registry_lock = threading.Lock()
+
+
+def get_pool_metrics(name: str) -> PoolMetrics:
+    with _registry_lock:
+        return pool_metrics.setdefault(name, PoolMetrics())
+
+
+class InstrumentedPoolMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Pools recreated after a disconnect keep reporting under the same name
+        self.metrics = get_pool_metrics(self._orig_logging_name or "default")
+        self.metrics.pool = self
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_checkout(time.perf_counter() - start, self.checkedout())
+        return connection
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
@@ -0,0 +1,95 @@
+"""
+Process-wide registry of the projects, by name.
+
+There are a handful of projects and they almost never change, so the routes
+resolve the project of a request here instead of querying `projects` each
+time. The registry is loaded when the application starts and reloaded:
+
+* right after the project routes create, update or delete a project, and on
+  `POST /projects/reload`;
+* when it is older than `project_registry_ttl_seconds`, so changes made
+  through another worker are seen after at most that delay;
+* when a name is not found, at most once every `MISS_RELOAD_SECONDS` so that
+  unknown names cannot turn every request into a reload.
+"""
+
+import logging
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MISS_RELOAD_SECONDS = 1.0
+
+
+class ProjectInfo(NamedTuple):
+    id: int
+    name: str
+    description: Optional[str]
+    img: Optional[str]
+
+
+class ProjectRegistry:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._projects: Optional[dict[str, ProjectInfo]] = None
+        self._loaded_at = 0.0
+
+    def load(self, db: Session) -> dict[str, ProjectInfo]:
+        """
+        (Re)load every project from the database.
+        """
+        columns = (models.Project.id, models.Project.name, models.Project.description, models.Project.img)
+        projects = {row.name: ProjectInfo(*row) for row in db.execute(select(*columns))}
+        with self._lock:
+            self._projects, self._loaded_at = projects, time.monotonic()
+        return projects
+
+    async def load_async(self, db: AsyncSession) -> dict[str, ProjectInfo]:
+        return await db.run_sync(self.load)
+
+    def warm(self, session_factory) -> None:
+        # At startup; if the database is not reachable yet the first request loads it
+        try:
+            with session_factory() as db:
+                logger.info("project registry loaded with %d projects", len(self.load(db)))
+        except SQLAlchemyError as error:
+            logger.warning("could not load the project registry: %s", error)
+
+    def _lookup(self, name: str) -> tuple[Optional[ProjectInfo], bool]:
+        # The project `name` if known, and whether the registry must be reloaded first
+        with self._lock:
+            projects, age = self._projects, time.monotonic() - self._loaded_at
+        if projects is None or age > self.ttl: return None, True
+        project = projects.get(name)
+        return project, project is None and age > MISS_RELOAD_SECONDS
+
+    def get(self, name: str, db: Session) -> Optional[ProjectInfo]:
+        """
+        The project `name`, None if there is no such project. `db` is only used to reload.
+        """
+        project, reload = self._lookup(name)
+        if reload: project = self.load(db).get(name)
+        return project
+
+    async def get_async(self, name: str, db: AsyncSession) -> Optional[ProjectInfo]:
+        project, reload = self._lookup(name)
+        if reload: project = (await self.load_async(db)).get(name)
+        return project
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._projects = None
+
+
+project_registry = ProjectRegistry(ttl=settings.project_registry_ttl_seconds)
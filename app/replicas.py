@@ -0,0 +1,97 @@
+"""
+Routing of read-only sessions to database replicas.
+
+The async sessions used by the GET handlers are opened on one of the replicas
+listed in `settings.db_replica_urls`, chosen round-robin or by the fewest
+checked-out connections. Writes and authentication keep using the primary
+through the sync `get_db` session.
+
+Replication is asynchronous, so for `lag` seconds (`db_read_your_writes_seconds`)
+after a write the replicas may still return the old rows:
+
+* a successful POST/PUT/DELETE sets a short-lived `read_primary_until` cookie;
+  while it is valid the editor's reads also go to the primary and they see what
+  they just saved. The cookie is `SameSite=lax`, so it only covers browsers on
+  the same site, not cross-site SPAs nor clients authenticating with a bearer
+  token and no cookie jar;
+* so the content reads of every client go to the primary for `lag` seconds
+  after the last content write seen by the process (`written_at`, the last
+  invalidation of the content cache, including those of the other workers).
+  Otherwise a cache miss right after a write would be answered by a lagging
+  replica and its old row cached for the whole content TTL.
+"""
+
+import itertools
+import threading
+import time
+from typing import Callable, Literal, Optional, Sequence
+
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+STICKY_COOKIE = "read_primary_until"
+
+Strategy = Literal["round_robin", "least_connections"]
+
+
+def mark_read_your_writes(response: Response, seconds: int) -> None:
+    """
+    Pin the client's reads to the primary for `seconds` after a write.
+    """
+    if seconds <= 0: return
+    until = int(time.time()) + seconds
+    response.set_cookie(STICKY_COOKIE, str(until), max_age=seconds, httponly=True, samesite="lax")
+
+
+def reads_from_primary(request: Request) -> bool:
+    try:
+        return int(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReadRouter:
+    """
+    Pick the engine serving a read-only request.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: Sequence[AsyncEngine] = (),
+        strategy: Strategy = "round_robin",
+        lag: float = 0,
+        written_at: Callable[[], float] = lambda: 0.0,
+    ):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.strategy = strategy
+        self.lag = lag
+        self.written_at = written_at
+        self._sessions = {
+            engine: async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+            for engine in [primary, *self.replicas]
+        }
+        self._lock = threading.Lock()
+        self._next = itertools.cycle(range(len(self.replicas))) if self.replicas else None
+
+    def _checked_out(self, engine: AsyncEngine) -> int:
+        pool = engine.sync_engine.pool
+        # Pools without a checkout count (NullPool) rank as idle
+        return pool.checkedout() if hasattr(pool, "checkedout") else 0
+
+    def choose(self, request: Optional[Request] = None) -> AsyncEngine:
+        if not self.replicas or (request is not None and reads_from_primary(request)):
+            return self.primary
+        if time.time() - self.written_at() < self.lag:
+            return self.primary
+        with self._lock:
+            start = next(self._next)
+        # Rotating the candidates breaks least-connections ties round-robin
+        candidates = self.replicas[start:] + self.replicas[:start]
+        if self.strategy == "least_connections":
+            return min(candidates, key=self._checked_out)
+        return candidates[0]
+
+    def session(self, request: Optional[Request] = None) -> AsyncSession:
+        return self._sessions[self.choose(request)]()
@@ -1,23 +1,29 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from app import models, oauth2, schemas, utils
 from app.database import get_db
+from app.pagination import count_cache
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
+# The handlers hashing passwords are async and await the hashing pool; their
+# (sync) database calls run on the threadpool
 @router.post("/login")
-def login(
+async def login(
     user_credentials: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db),
 ):
-    user = (
+    user = await run_in_threadpool(
         db.query(models.User)
         .filter(models.User.email == user_credentials.username)
-        .first()
+        .first
     )
 
     if not user:
@@ -25,17 +31,21 @@ def login(
             status_code=status.HTTP_403_FORBIDDEN, detail="Invalid Credentials"
         )
 
-    if not utils.verify_password(user_credentials.password, user.password):
+    if not await utils.verify_password_async(user_credentials.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Invalid Credentials"
         )
 
-    access_token = oauth2.create_access_token(
-        data={"user_id": user.id, "is_admin": user.is_admin}
-    )
-    refresh_token = oauth2.create_refresh_token(
-        data={"user_id": user.id, "is_admin": user.is_admin}
-    )
+    # Read before the commit below expires the user
+    claims = {"user_id": user.id, "is_admin": user.is_admin}
+
+    # Upgrade hashes made with an older cost factor while the password is at hand
+    if utils.password_needs_rehash(user.password):
+        user.password = await utils.hash_password_async(user_credentials.password)
+        await run_in_threadpool(db.commit)
+
+    access_token = oauth2.create_access_token(data=claims)
+    refresh_token = oauth2.create_refresh_token(data=claims)
 
     response = JSONResponse(
         status_code=status.HTTP_200_OK,
@@ -78,25 +88,34 @@ def refresh(request: Request, response: Response, db: Session = Depends(get_db))
 
 
 @router.post("/logout")
-def logout(response: Response):
+def logout(
+    request: Request,
+    response: Response,
+    token: Optional[str] = Depends(oauth2.optional_oauth2_scheme),
+):
+    # Revoke the access and refresh tokens so they cannot be replayed until they expire
+    if token: oauth2.revoke_token(token)
+    refresh_token = request.cookies.get("refresh_token")
+    if refresh_token: oauth2.revoke_token(refresh_token)
     oauth2.unset_jwt_cookie(response)
 
 
 @router.post("/create-admin")
-def create_admin(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
+async def create_admin(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(db.query(models.User).filter(models.User.email == user.email).first)
 
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail="User already exists"
         )
 
-    hashed_password = utils.hash_password(user.password)
+    hashed_password = await utils.hash_password_async(user.password)
     user.password = hashed_password
     new_user = models.User(**user.model_dump(), is_admin=True)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await run_in_threadpool(db.commit)
+    await run_in_threadpool(db.refresh, new_user)
+    count_cache.invalidate(("users",))
 
     return JSONResponse(
         status_code=status.HTTP_201_CREATED, content={"id": new_user.id}
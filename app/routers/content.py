@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import get_async_db
+from app.isha.routers import audio, interpretations, meanings, sutras, transliterations, search, bhashyams, export, ingest, batch, coverage
+from app.registry import project_registry
+
+
+async def valid_upanishad(upanishad: str, db: AsyncSession = Depends(get_async_db)) -> str:
+    if await project_registry.get_async(upanishad, db) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Project {upanishad} not found")
+    return upanishad
+
+
+# The routes of every Upanishad, e.g. /isha/sutras/..., /kena/sutras/...,
+# for each project of the projects table
+router = APIRouter(prefix="/{upanishad}", dependencies=[Depends(valid_upanishad)])
+
+
+@router.get("/healthz", tags=["Health"])
+def health_check(upanishad: str):
+    return {"status": f"{upanishad} - available", "environment": settings.env}
+
+
+router.include_router(sutras.router)
+router.include_router(meanings.router)
+router.include_router(transliterations.router)
+router.include_router(interpretations.router)
+router.include_router(bhashyams.router)
+router.include_router(audio.router)
+router.include_router(search.router)
+router.include_router(export.router)
+router.include_router(ingest.router)
+router.include_router(batch.router)
+router.include_router(coverage.router)
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends
+
+from app import oauth2
+from app.cache import content_cache
+from app.pool import pool_metrics
+
+# Operational data, for admins only
+router = APIRouter(prefix="/metrics", tags=["Metrics"], dependencies=[Depends(oauth2.get_current_admin)])
+
+
+@router.get("/cache")
+def get_cache_metrics():
+    # Hit/miss/eviction counters and current size of the content cache
+    return content_cache.stats()
+
+
+@router.get("/pool")
+def get_pool_metrics():
+    # Checkout wait times and saturation of each database connection pool
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.responses import JSONResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app import models, oauth2, schemas, utils
+from app.cache import content_cache
 from app.database import get_db
-from app.oauth2 import get_current_admin, get_current_user
+from app.isha import models as isha_models
+from app.isha.storage import release
+from app.oauth2 import Principal, get_current_admin, get_current_user
+from app.pagination import PageParams, count_cache, decode_cursor, paginate
+from app.registry import project_registry
 
 router = APIRouter(prefix="/projects", tags=["Projects"])
 
@@ -17,6 +23,14 @@ def get_project_by_id_or_404(project_id: str, db: Session):
         )
     return project
 
+def project_audio_files(project_id: int, db: Session) -> list[str]:
+    audio = select(isha_models.Audio.id).join(isha_models.Sutra).where(isha_models.Sutra.project_id == project_id)
+    query = (
+        select(isha_models.Audio.file_path).where(isha_models.Audio.id.in_(audio))
+        .union(select(isha_models.AudioVariant.file_path).where(isha_models.AudioVariant.audio_id.in_(audio)))
+    )
+    return list(db.scalars(query))
+
 def get_project_or_404(project_name: str, db: Session):
     project = (db.query(models.Project).filter(models.Project.name == project_name).first())
 
@@ -30,9 +44,13 @@ def get_project_or_404(project_name: str, db: Session):
 
 
 @router.get("/")
-def get_projects(db: Session = Depends(get_db)):
-    projects = db.query(models.Project).all()
-    return projects
+def get_projects(response: Response, page: PageParams = Depends(), db: Session = Depends(get_db)):
+    query = db.query(models.Project)
+    if page.cursor:
+        (last_id,) = decode_cursor(page.cursor, int)
+        query = query.filter(models.Project.id > last_id)
+    projects = query.order_by(models.Project.id).limit(page.fetch_size).all()
+    return paginate(response, projects, page, lambda project: (project.id,), lambda: count_cache.get(("projects",), lambda: db.query(models.Project.id).count()))
 
 
 @router.get("_by_id/{project_id}")
@@ -55,7 +73,7 @@ def add_project(
     project: schemas.ProjectCreate,
     name : str, description: str,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     project_db = (
         db.query(models.Project).filter(models.Project.name == project.name).first()
@@ -71,6 +89,8 @@ def add_project(
     db.add(db_project)
     db.commit()
     db.refresh(db_project)
+    count_cache.invalidate(("projects",))
+    project_registry.invalidate()
     # return db_project
     return JSONResponse(status_code=status.HTTP_201_CREATED, content=f"Created project {project.name}")
 
@@ -79,15 +99,37 @@ def update_project(
     project_id: int,
     project: schemas.ProjectUpdate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin),
+    current_user: Principal = Depends(get_current_admin),
+):
+    db_project = get_project_by_id_or_404(project_id, db)
+    old_name = db_project.name
+    if project.name != old_name and db.query(models.Project).filter(models.Project.name == project.name).first():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Project with name {project.name} already exists",
+        )
+    for field, value in project.model_dump().items():
+        setattr(db_project, field, value)
+    db.commit()
+    db.refresh(db_project)
+    project_registry.invalidate()
+    content_cache.invalidate(old_name)
+    return db_project
+
+@router.post("/reload")
+def reload_projects(
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin),
 ):
-    project = get_project_or_404(project_id, db)
+    # Picks up projects changed directly in the database, or through another worker
+    projects = project_registry.load(db)
+    return {"projects": sorted(projects)}
 
 @router.delete("_by_name/{project_name}")
 def delete_project(
     project_name: str,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
 
     project = db.query(models.Project).filter(models.Project.name == project_name).first()
@@ -96,15 +138,21 @@ def delete_project(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Project {project_name} not found",
         )
+    files = project_audio_files(project.id, db)
     db.delete(project)
     db.commit()
+    release(db, *files)
+    count_cache.invalidate(("projects",))
+    count_cache.invalidate(("sutras", project.id))
+    project_registry.invalidate()
+    content_cache.invalidate(project.name)
     return JSONResponse(f"Project {project_name} removed")
 
 @router.delete("_by_id/{project_id}")
 def delete_project(
     project_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
 
     project = db.query(models.Project).filter(models.Project.id == project_id).first()
@@ -113,7 +161,13 @@ def delete_project(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Project {project_id} not found",
         )
+    files = project_audio_files(project.id, db)
     db.delete(project)
     db.commit()
+    release(db, *files)
+    count_cache.invalidate(("projects",))
+    count_cache.invalidate(("sutras", project.id))
+    project_registry.invalidate()
+    content_cache.invalidate(project.name)
     return JSONResponse(f"Project {project_id} {project.name} removed")
 
@@ -1,29 +1,37 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 
 from app import models, oauth2, schemas, utils
 from app.database import get_db
+from app.pagination import PageParams, count_cache, decode_cursor, paginate
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
 @router.get("/", response_model=List[schemas.UserOut])
 def get_users(
+    response: Response,
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
-    current_admin: models.User = Depends(oauth2.get_current_admin),
+    current_admin: oauth2.Principal = Depends(oauth2.get_current_admin),
 ):
-    users = db.query(models.User).all()
-    return users
+    query = db.query(models.User)
+    if page.cursor:
+        (last_id,) = decode_cursor(page.cursor, int)
+        query = query.filter(models.User.id > last_id)
+    users = query.order_by(models.User.id).limit(page.fetch_size).all()
+    return paginate(response, users, page, lambda user: (user.id,), lambda: count_cache.get(("users",), lambda: db.query(models.User.id).count()))
 
 
 @router.get("/{user_id}", response_model=schemas.UserOut)
 def get_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user),
 ):
     user = db.query(models.User).filter(models.User.id == user_id).first()
 
@@ -42,24 +50,26 @@ def get_user(
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
-def create_user(
+async def create_user(
     user: schemas.UserCreate,
     db: Session = Depends(get_db),
-    current_admin: models.User = Depends(oauth2.get_current_admin),
+    current_admin: oauth2.Principal = Depends(oauth2.get_current_admin),
 ):
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
+    # Async to await the password hashing pool, see app.routers.auth
+    db_user = await run_in_threadpool(db.query(models.User).filter(models.User.email == user.email).first)
 
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail="User already exists"
         )
 
-    hashed_password = utils.hash_password(user.password)
+    hashed_password = await utils.hash_password_async(user.password)
     user.password = hashed_password
     new_user = models.User(**user.model_dump())
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await run_in_threadpool(db.commit)
+    await run_in_threadpool(db.refresh, new_user)
+    count_cache.invalidate(("users",))
 
     return JSONResponse(
         status_code=status.HTTP_201_CREATED, content={"id": new_user.id}
@@ -70,7 +80,7 @@ def create_user(
 def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_admin: models.User = Depends(oauth2.get_current_admin),
+    current_admin: oauth2.Principal = Depends(oauth2.get_current_admin),
 ):
     user_to_delete = db.query(models.User).filter(models.User.id == user_id)
 
@@ -81,3 +91,5 @@ def delete_user(
 
     user_to_delete.delete()
     db.commit()
+    count_cache.invalidate(("users",))
+    oauth2.user_cache.invalidate(user_id)
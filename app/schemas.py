@@ -52,3 +52,5 @@ class RefreshToken(BaseModel):
 class TokenData(BaseModel):
     user_id: int
     is_admin: bool
+    jti: str | None = None
+    exp: int | None = None
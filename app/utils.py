@@ -1,23 +1,29 @@
 from enum import Enum
 
-import bcrypt
+from app.hashing import password_hasher
 
 
 # Hash a password before storing it
+# Runs on the bounded password hashing pool, see app.hashing
 def hash_password(plain_password: str) -> str:
-    salt = bcrypt.gensalt()  # Generate a salt
-    hashed_password = bcrypt.hashpw(
-        plain_password.encode("utf-8"), salt
-    )  # Hash the password
-    return hashed_password.decode(
-        "utf-8"
-    )  # Return as a string to store in the database
+    return password_hasher.hash(plain_password)  # Return as a string to store in the database
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(
-        plain_password.encode("utf-8"), hashed_password.encode("utf-8")
-    )
+    return password_hasher.verify(plain_password, hashed_password)
+
+
+# For the async handlers: awaiting does not hold a threadpool thread
+async def hash_password_async(plain_password: str) -> str:
+    return await password_hasher.hash_async(plain_password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify_async(plain_password, hashed_password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    return password_hasher.needs_rehash(hashed_password)
 
 
 class Language(str, Enum):
@@ -40,3 +46,9 @@ class Mode(str, Enum):
     chant = "chant"  # Chant
     teachMe = "teach_me"  # Teach Me
     learnMore = "learn_more"  # Learn More
+
+
+class Quality(str, Enum):
+    low = "low"  # Speech-grade, for slow mobile connections
+    medium = "medium"
+    high = "high"
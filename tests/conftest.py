@@ -1,17 +1,26 @@
+import os
+
+# Cheap password hashes keep the suite fast; production uses settings.bcrypt_rounds
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
 import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 from app import utils
+from app.cache import content_cache
 from app.config import settings
-from app.database import Base, get_db
-from app.isha.main import isha
-from app.kena.main import kena
+from app.database import Base, get_async_db, get_db, to_async_url
+from app.isha.transcoding import transcoder
 from app.main import app
 from app.models import User
-from app.oauth2 import create_access_token
+from app.oauth2 import create_access_token, user_cache
+from app.pagination import count_cache
+from app.registry import project_registry
 
 SQLALCHEMY_DATABASE_URL = settings.test_db_url
 
@@ -19,6 +28,17 @@ engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The test client runs every request on a new event loop, so async connections are not pooled
+async_engine = create_async_engine(to_async_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool)
+
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+@pytest.fixture(autouse=True)
+def audio_store(monkeypatch, tmp_path):
+    # Uploads go to a store per test instead of the working tree
+    monkeypatch.setattr(settings, "audio_store_dir", str(tmp_path / "audio"))
+
 
 @pytest.fixture()
 def session():
@@ -41,11 +61,20 @@ def client(session):
         finally:
             session.close()
 
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
     app.dependency_overrides[get_db] = override_get_db
-    isha.dependency_overrides[get_db] = override_get_db
-    kena.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    transcoder.session_factory = TestingSessionLocal
+    count_cache.clear()
+    content_cache.clear()
+    user_cache.clear()
+    project_registry.invalidate()
 
     yield TestClient(app)
+    transcoder.join(timeout=5)
 
 
 @pytest.fixture
@@ -0,0 +1,178 @@
+"""
+Minimal in-process server speaking the Redis protocol (RESP2), covering the
+commands used by `app.cache.RedisCache`, including WATCH/MULTI/EXEC
+transactions. Lets the cache tests run without an external Redis.
+"""
+
+import fnmatch
+import socketserver
+import threading
+import time
+
+OK = b"+OK\r\n"
+
+
+def encode(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    if isinstance(value, (list, set)):
+        return b"*%d\r\n" % len(value) + b"".join(encode(item) for item in value)
+    if isinstance(value, Exception):
+        return b"-ERR %s\r\n" % str(value).encode()
+    raise TypeError(value)
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        assert line.startswith(b"*"), line
+        args = []
+        for _ in range(int(line[1:])):
+            size = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(size + 2)[:-2])
+        return args
+
+    def send(self, payload: bytes) -> None:
+        with self.write_lock:
+            self.wfile.write(payload)
+            self.wfile.flush()
+
+    def handle(self):
+        self.write_lock = threading.Lock()
+        self.channels = set()
+        self.watched = {}  # key -> version when watched
+        self.queue = None  # commands queued after MULTI
+        try:
+            while (args := self.read_command()) is not None:
+                self.send(self.server.execute(self, args[0].upper().decode(), args[1:]))
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            with self.server.lock:
+                self.server.subscribers.discard(self)
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeRedisHandler)
+        self.lock = threading.RLock()
+        self.strings = {}  # key -> (value, expires_at or None)
+        self.sets = {}
+        self.versions = {}  # key -> number of writes, for WATCH
+        self.subscribers = set()
+        self.commands = []
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address
+        return f"redis://{host}:{port}/0"
+
+    def start(self) -> "FakeRedisServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        with self.lock:
+            for handler in list(self.subscribers):
+                handler.connection.close()
+        self.server_close()
+
+    def _get(self, key):
+        value, expires_at = self.strings.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.strings[key]
+            return None
+        return value
+
+    def _touch(self, *keys) -> None:
+        for key in keys:
+            self.versions[key] = self.versions.get(key, 0) + 1
+
+    def execute(self, handler, command, args) -> bytes:
+        with self.lock:
+            self.commands.append(command)
+            if handler.queue is not None and command not in ("EXEC", "DISCARD", "MULTI", "WATCH"):
+                handler.queue.append((command, args))
+                return b"+QUEUED\r\n"
+            if command == "WATCH":
+                handler.watched.update({key: self.versions.get(key, 0) for key in args})
+                return OK
+            if command == "UNWATCH":
+                handler.watched = {}
+                return OK
+            if command == "MULTI":
+                handler.queue = []
+                return OK
+            if command in ("EXEC", "DISCARD"):
+                queue, handler.queue = handler.queue, None
+                watched, handler.watched = handler.watched, {}
+                if command == "DISCARD":
+                    return OK
+                if any(self.versions.get(key, 0) != version for key, version in watched.items()):
+                    return b"*-1\r\n"
+                replies = [self.execute(handler, *queued) for queued in queue]
+                return b"*%d\r\n" % len(replies) + b"".join(replies)
+            if command == "PING":
+                return b"+PONG\r\n"
+            if command in ("CLIENT", "SELECT"):
+                return OK
+            if command == "EXPIRE":
+                return encode(int(args[0] in self.strings or args[0] in self.sets))
+            if command == "GET":
+                return encode(self._get(args[0]))
+            if command == "MGET":
+                return encode([self._get(key) for key in args])
+            if command == "SET":
+                expires_at = None
+                if len(args) > 2 and args[2].upper() == b"EX":
+                    expires_at = time.monotonic() + int(args[3])
+                self.strings[args[0]] = (args[1], expires_at)
+                self._touch(args[0])
+                return OK
+            if command == "DEL":
+                removed = 0
+                for key in args:
+                    removed += (self.strings.pop(key, None) is not None) + (self.sets.pop(key, None) is not None)
+                self._touch(*args)
+                return encode(removed)
+            if command == "EXISTS":
+                return encode(sum(self._get(key) is not None or key in self.sets for key in args))
+            if command == "SCAN":
+                pattern = args[args.index(b"MATCH") + 1].decode() if b"MATCH" in args else "*"
+                keys = [key for key in [*self.strings, *self.sets] if fnmatch.fnmatchcase(key.decode(), pattern)]
+                return encode([b"0", keys])
+            if command == "SADD":
+                members = self.sets.setdefault(args[0], set())
+                before = len(members)
+                members.update(args[1:])
+                self._touch(args[0])
+                return encode(len(members) - before)
+            if command == "SMEMBERS":
+                return encode(self.sets.get(args[0], set()))
+            if command == "PUBLISH":
+                channel, data = args
+                receivers = [s for s in self.subscribers if channel in s.channels]
+                for subscriber in receivers:
+                    subscriber.send(encode([b"message", channel, data]))
+                return encode(len(receivers))
+            if command == "SUBSCRIBE":
+                handler.channels.update(args)
+                self.subscribers.add(handler)
+                return b"".join(
+                    b"*3\r\n" + encode(b"subscribe") + encode(channel) + encode(count)
+                    for count, channel in enumerate(args, start=1)
+                )
+            if command == "UNSUBSCRIBE":
+                handler.channels.difference_update(args)
+                return b"*3\r\n" + encode(b"unsubscribe") + encode(args[0] if args else None) + encode(len(handler.channels))
+            return encode(Exception(f"unknown command '{command}'"))
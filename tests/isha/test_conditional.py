@@ -0,0 +1,131 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from fastapi import status
+
+from app.cache import content_cache
+from app.conditional import row_validators
+from app.isha import models
+from tests.conftest import TestingSessionLocal
+
+base_url = "/isha/sutras/test/1/1"
+
+
+def create_sutra_with_meaning(authorized_admin):
+    response = authorized_admin.post("/projects/?name=test&description=testdesc", json={"name": "test"})
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/isha/sutras/", json={"sutra": {"chapter": 1, "number": 1, "text": "Sutra"}, "project": {"name": "test"}})
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post(f"{base_url}/meaning", json={"language": "en", "text": "Meaning"})
+    assert response.status_code == status.HTTP_201_CREATED
+
+
+def test_content_responses_carry_validators(client, authorized_admin):
+    create_sutra_with_meaning(authorized_admin)
+    for url in (base_url, f"{base_url}/meaning?lang=en"):
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["etag"].startswith('"')
+        assert response.headers["last-modified"].endswith("GMT")
+        assert "max-age" in response.headers["cache-control"]
+    response = client.get(f"{base_url}/full")
+    assert response.status_code == status.HTTP_200_OK
+    assert "etag" in response.headers
+    assert "last-modified" not in response.headers
+
+
+def test_if_none_match_returns_304(client, authorized_admin):
+    create_sutra_with_meaning(authorized_admin)
+    etag = client.get(f"{base_url}/meaning?lang=en").headers["etag"]
+
+    response = client.get(f"{base_url}/meaning?lang=en", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    response = client.get(f"{base_url}/meaning?lang=en", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    # Validators of other variants do not match
+    response = client.get(f"{base_url}/meaning?lang=sa", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_if_none_match_is_answered_on_cache_miss(client, authorized_admin):
+    create_sutra_with_meaning(authorized_admin)
+    etag = client.get(f"{base_url}/meaning?lang=en").headers["etag"]
+    content_cache.clear()
+    response = client.get(f"{base_url}/meaning?lang=en", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+def test_update_changes_etag(client, authorized_admin):
+    create_sutra_with_meaning(authorized_admin)
+    etag = client.get(f"{base_url}/meaning?lang=en").headers["etag"]
+    full_etag = client.get(f"{base_url}/full").headers["etag"]
+
+    response = authorized_admin.put(f"{base_url}/meaning?lang=en", json={"language": "en", "text": "New meaning"})
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    response = client.get(f"{base_url}/meaning?lang=en", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["text"] == "New meaning"
+    assert response.headers["etag"] != etag
+    response = client.get(f"{base_url}/full", headers={"If-None-Match": full_etag})
+    assert response.status_code == status.HTTP_200_OK
+
+    # Removing content from the aggregated view changes its validator too
+    full_etag = response.headers["etag"]
+    response = authorized_admin.delete(f"{base_url}/meaning?lang=en")
+    assert response.status_code == status.HTTP_200_OK
+    response = client.get(f"{base_url}/full", headers={"If-None-Match": full_etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["meanings"] == []
+
+
+def test_recreated_row_changes_etag(client, authorized_admin):
+    create_sutra_with_meaning(authorized_admin)
+    response = client.get(f"{base_url}/meaning?lang=en")
+    etag, meaning_id = response.headers["etag"], response.json()["id"]
+
+    response = authorized_admin.delete(f"{base_url}/meaning?lang=en")
+    assert response.status_code == status.HTTP_200_OK
+    response = authorized_admin.post(f"{base_url}/meaning", json={"language": "en", "text": "Other meaning"})
+    assert response.status_code == status.HTTP_201_CREATED
+    response = client.get(f"{base_url}/meaning?lang=en", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["text"] == "Other meaning"
+    # The id of the deleted row is not reused
+    assert response.json()["id"] != meaning_id
+    assert response.headers["etag"] != etag
+
+
+def test_if_modified_since(client, authorized_admin):
+    create_sutra_with_meaning(authorized_admin)
+    last_modified = client.get(base_url).headers["last-modified"]
+    response = client.get(base_url, headers={"If-Modified-Since": last_modified})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    response = client.get(base_url, headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"})
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_row_validators_include_modification_time():
+    # A row recreated under a reused id starts at version 1 again
+    old = SimpleNamespace(__tablename__="meanings", id=1, version=1, updated_at=datetime(2024, 1, 1))
+    new = SimpleNamespace(__tablename__="meanings", id=1, version=1, updated_at=datetime(2024, 1, 2))
+    assert row_validators(old).etag != row_validators(new).etag
+
+
+def test_overlapping_edits_last_one_wins(client, authorized_admin, session):
+    create_sutra_with_meaning(authorized_admin)
+    other = TestingSessionLocal()
+    try:
+        # Both editors loaded version 1
+        first = session.query(models.Meaning).one()
+        second = other.query(models.Meaning).one()
+        first.text = "First edit"
+        session.commit()
+        second.text = "Second edit"
+        other.commit()
+    finally:
+        other.close()
+    session.expire_all()
+    meaning = session.query(models.Meaning).one()
+    assert (meaning.text, meaning.version) == ("Second edit", 3)
@@ -0,0 +1,84 @@
+import pytest
+from fastapi import status
+from sqlalchemy import select
+
+from app.isha import models
+from app.isha.stats import rebuild_stats, to_bitmap, verses
+
+@pytest.fixture
+def chapter(authorized_admin):
+    response = authorized_admin.post("/projects/?name=test&description=testdesc", json={"name": "test", "description": "testopanishad"})
+    assert response.status_code == status.HTTP_201_CREATED
+    for number in range(1, 5):
+        response = authorized_admin.post("/isha/sutras/", json={"sutra": {"chapter": 1, "number": number, "text": f"Sutra 1.{number}"}, "project": {"name": "test"}})
+        assert response.status_code == status.HTTP_201_CREATED
+    for number in (1, 3):
+        response = authorized_admin.post(f"/isha/sutras/test/1/{number}/meaning", json={"language": "en", "text": f"Meaning 1.{number}"})
+        assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/isha/sutras/test/1/2/interpretation", json={"language": "en", "philosophy": "dva", "text": "Dvaita 1.2"})
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/isha/sutras/", json={"sutra": {"chapter": 2, "number": 1, "text": "Sutra 2.1"}, "project": {"name": "test"}})
+    assert response.status_code == status.HTTP_201_CREATED
+
+def stats(session):
+    rows = session.scalars(select(models.ContentStat)).all()
+    return {(row.chapter, row.kind, row.language, row.philosophy): (row.count, verses(row.coverage)) for row in rows}
+
+def test_bitmap():
+    assert verses(to_bitmap([1, 3, 8, 17])) == [1, 3, 8, 17]
+    assert to_bitmap([]) == b"" and verses(b"") == []
+
+def test_coverage(client, chapter):
+    response = client.get("/isha/coverage?project_name=test&chapter=1")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [
+        {"chapter": 1, "kind": "interpretation", "language": "en", "philosophy": "dva", "count": 1, "verses": [2], "missing": [1, 3, 4]},
+        {"chapter": 1, "kind": "meaning", "language": "en", "philosophy": None, "count": 2, "verses": [1, 3], "missing": [2, 4]},
+        {"chapter": 1, "kind": "sutra", "language": None, "philosophy": None, "count": 4, "verses": [1, 2, 3, 4], "missing": []},
+    ]
+    response = client.get("/isha/coverage?project_name=test&kind=sutra")
+    assert [(item["chapter"], item["count"]) for item in response.json()] == [(1, 4), (2, 1)]
+    assert client.get("/isha/coverage?project_name=test&kind=meaning&lang=sa").json() == []
+    assert client.get("/isha/sutras/total-count?project_name=test").json() == 5
+    assert client.get("/isha/coverage?project_name=missing").status_code == status.HTTP_404_NOT_FOUND
+
+def test_total_count_without_stats(client, session, chapter):
+    # A database whose statistics were never computed still counts its sutras
+    session.execute(models.ContentStat.__table__.delete())
+    session.commit()
+    assert client.get("/isha/sutras/total-count?project_name=test").json() == 5
+
+def test_verse_numbers_are_bounded(authorized_admin, session, chapter):
+    for number in (-1, 400000000):
+        response = authorized_admin.post("/isha/sutras/", json={"sutra": {"chapter": 1, "number": number, "text": "Sutra"}, "project": {"name": "test"}})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert max(len(row.coverage) for row in session.scalars(select(models.ContentStat))) == 1
+
+def test_stats_follow_writes(client, authorized_admin, session, chapter):
+    response = authorized_admin.put("/isha/sutras/test/1/3/meaning?lang=en", json={"language": "kn", "text": "Meaning 1.3 kn"})
+    assert response.status_code < 300
+    response = authorized_admin.delete("/isha/sutras/test/1/1/meaning?lang=en")
+    assert response.status_code < 300
+    response = authorized_admin.delete("/isha/sutras/test/1/2")
+    assert response.status_code < 300
+    sutra_id = client.get("/isha/sutras/test/2/1").json()["id"]
+    response = authorized_admin.put("/isha/sutras/test/2/1", json={"id": sutra_id, "chapter": 1, "number": 5, "text": "Sutra 1.5"})
+    assert response.status_code < 300
+
+    incremental = stats(session)
+    assert incremental == {
+        (1, "sutra", "", ""): (4, [1, 3, 4, 5]),
+        (1, "meaning", "kn", ""): (1, [3]),
+    }
+    assert rebuild_stats(session) == 2
+    assert stats(session) == incremental
+    assert client.get("/isha/sutras/total-count?project_name=test").json() == 4
+
+def test_rebuild_stats(session, client, chapter):
+    expected = stats(session)
+    session.execute(models.ContentStat.__table__.delete())
+    session.commit()
+    assert stats(session) == {}
+    project_id = session.scalar(select(models.Sutra.project_id))
+    assert rebuild_stats(session, project_id) == len(expected) == 4
+    assert stats(session) == expected
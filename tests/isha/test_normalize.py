@@ -0,0 +1,31 @@
+import pytest
+
+from app.isha.normalize import normalize, tokenize
+
+
+@pytest.mark.parametrize("variant, canonical", [
+    ("इदम्", "इदं"),  # final m + virama / anusvara
+    ("गङ्गा", "गंगा"),  # nasal + virama before a consonant
+    ("सँस्कृत", "संस्कृत"),  # chandrabindu
+    ("\u0958लम", "कलम"),  # nukta, precomposed
+    ("क\u093cलम", "कलम"),  # nukta, combining
+    ("सोऽहम्", "सोहं"),  # avagraha
+    ("ई॒शा वा॒स्य॑म्", "ईशा वास्यं"),  # Vedic accents
+    ("क्\u200dष", "क्ष"),  # ZWJ
+    ("ಇದಮ್", "ಇದಂ"),  # Kannada
+    ("ఇదమ్", "ఇదం"),  # Telugu
+    ("അവന്\u200d", "അവ\u0d7b"),  # Malayalam chillu, ZWJ and atomic forms
+    ("īśāvāsyam idaṃ", "ISAVASYAM IDAM"),  # IAST diacritics and case
+    ("१०", "10"),  # Devanagari digits
+])
+def test_variants_normalize_alike(variant, canonical):
+    assert normalize(variant) == normalize(canonical)
+
+
+def test_tamil_nasals_are_kept():
+    assert normalize("அம்மா") == "அம்மா"
+
+
+def test_tokenize_splits_on_punctuation():
+    assert tokenize("ईशा वास्यमिदं सर्वं। यत्किञ्च जगत्यां जगत्॥") == ["ईशा", "वास्यमिदं", "सर्वं", "यत्किंच", "जगत्यां", "जगत्"]
+    assert tokenize("Īśā-vāsyam, idaṃ!") == ["isa", "vasyam", "idam"]
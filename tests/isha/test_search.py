@@ -0,0 +1,90 @@
+import pytest
+from fastapi import status
+
+from app.isha import models
+from app.isha.search import rebuild_index
+
+@pytest.fixture
+def project_data():
+    def _project_data():
+        return {"name": 'test', "description": "testopanishad"}
+    return _project_data
+@pytest.fixture
+def content(authorized_admin):
+    # Indexed under the project of the URL, which searches default to
+    for number, text in [(1, "ईशा वास्यमिदं सर्वं"), (2, "कुर्वन्नेवेह कर्माणि")]:
+        response = authorized_admin.post("/isha/sutras/", json={"sutra": {"chapter": 1, "number": number, "text": text}, "project": {"name": "isha"}})
+        assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/isha/sutras/isha/1/1/meaning", json={"language": "en", "text": "All this is pervaded by the Lord"})
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/isha/sutras/isha/1/2/meaning", json={"language": "en", "text": "Performing works here, one should wish to live"})
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/isha/sutras/isha/1/2/bhashyam", json={"language": "en", "text": "Works performed without attachment to the Lord do not bind; works works works", "philosophy": "adv"})
+    assert response.status_code == status.HTTP_201_CREATED
+
+def test_search_ranks_across_content(client, content):
+    response = client.get("/isha/search/works")
+    assert response.status_code == status.HTTP_200_OK
+    results = response.json()
+    # The bhashyam repeats the term and ranks first; bhashyams are searched too
+    assert [(result["kind"], result["sutra_no"]) for result in results] == [("bhashyam", 2), ("meaning", 2)]
+    assert results[0]["mode"] == "bhashyam - adv"
+    assert results[0]["chapter"] == 1
+    assert results[0]["project"] == "isha"
+    assert results[0]["score"] > results[1]["score"]
+
+def test_search_all_terms_and_prefix(client, content):
+    results = client.get("/isha/search/lord%20perv").json()
+    assert [(result["kind"], result["sutra_no"]) for result in results] == [("meaning", 1)]
+    results = client.get("/isha/search/ईशा").json()
+    assert [(result["kind"], result["text"]) for result in results] == [("sutra", "ईशा वास्यमिदं सर्वं")]
+    assert client.get("/isha/search/nothing").json() == []
+
+def test_search_token_prefix_of_another(client, authorized_admin, content):
+    response = authorized_admin.post("/isha/sutras/", json={"sutra": {"chapter": 1, "number": 3, "text": "sarvam khalu idam brahman"}, "project": {"name": "isha"}})
+    assert response.status_code == status.HTTP_201_CREATED
+    for query in ("brahman", "brahma", "brahma%20brahman", "brahman%20brahma"):
+        assert [result["sutra_no"] for result in client.get(f"/isha/search/{query}").json()] == [3]
+    assert client.get("/isha/search/brahma%20lord").json() == []
+
+def test_search_normalizes_scripts(client, authorized_admin, content):
+    response = authorized_admin.post("/isha/sutras/isha/1/1/transliteration", json={"language": "en", "text": "īśā vāsyam idaṃ sarvam"})
+    assert response.status_code == status.HTTP_201_CREATED
+    results = client.get("/isha/search/isa%20idam").json()
+    assert [(result["kind"], result["lang"]) for result in results] == [("transliteration", "en")]
+    # Final म् and anusvara, and a zero-width joiner, are spelled alike
+    results = client.get("/isha/search/वास्यमिदम्").json()
+    assert [result["kind"] for result in results] == ["sutra"]
+    results = client.get("/isha/search/सर्\u200dवं").json()
+    assert [result["kind"] for result in results] == ["sutra"]
+
+def test_search_filters_and_pagination(client, content):
+    assert len(client.get("/isha/search/lord?limit=1").json()) == 1
+    assert len(client.get("/isha/search/lord?limit=1&offset=1").json()) == 1
+    assert client.get("/isha/search/lord?limit=1&offset=2").json() == []
+    assert client.get("/isha/search/lord?project_name=other").json() == []
+
+def test_search_defaults_to_url_project(client, authorized_admin, project_data, content):
+    response = authorized_admin.post("/projects/?name=test&description=testdesc", json=project_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/isha/sutras/", json={"sutra": {"chapter": 1, "number": 1, "text": "sarvam khalu idam brahman"}, "project": {"name": "test"}})
+    assert response.status_code == status.HTTP_201_CREATED
+    assert client.get("/isha/search/brahman").json() == []
+    assert [result["project"] for result in client.get("/isha/search/brahman?project_name=test").json()] == ["test"]
+
+def test_search_follows_writes(client, authorized_admin, content):
+    response = authorized_admin.put("/isha/sutras/isha/1/1/meaning?lang=en", json={"language": "en", "text": "Everything is enveloped by the Lord"})
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert client.get("/isha/search/pervaded").json() == []
+    assert len(client.get("/isha/search/enveloped").json()) == 1
+
+    response = authorized_admin.delete("/isha/sutras/isha/1/2")
+    assert response.status_code == status.HTTP_200_OK
+    assert client.get("/isha/search/works").json() == []
+
+def test_rebuild_index(client, session, content):
+    session.query(models.SearchPosting).delete()
+    session.commit()
+    assert client.get("/isha/search/works").json() == []
+    assert rebuild_index(session) == 5
+    assert len(client.get("/isha/search/works").json()) == 2
@@ -1,6 +1,8 @@
 import pytest
 from fastapi import status
 
+from app.pagination import encode_cursor
+
 
 @pytest.fixture
 def sutra_data():
@@ -143,3 +145,93 @@ def test_delete_sutra(
     # print(f"sutra data: {sutra_data["project"]["name"]}/{sutra_data["sutra"]["chapter"]}/{sutra_data["sutra"]["number"]}")
     response = test_client.delete(f"/isha/sutras/{sutra_data["project"]["name"]}/{sutra_data["sutra"]["chapter"]}/{sutra_data["sutra"]["number"]}")
     assert response.status_code == expected_status
+
+def test_get_sutra_scoped_to_project(authorized_admin, sutra_data, project_data):
+    response = authorized_admin.post(f"/projects/?name={sutra_data()['project']['name']}&description={sutra_data()['project']['description']}", json=project_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/projects/?name=other&description=other", json={"name": "other", "description": "other"})
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/isha/sutras/", json=sutra_data())
+    assert response.status_code == status.HTTP_201_CREATED
+
+    # Same chapter/number in another project must not resolve to this sutra
+    response = authorized_admin.get(f"/isha/sutras/other/{sutra_data()["sutra"]["chapter"]}/{sutra_data()["sutra"]["number"]}")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = authorized_admin.get(f"/isha/sutras/missing/{sutra_data()["sutra"]["chapter"]}/{sutra_data()["sutra"]["number"]}")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+def test_get_sutra_full(client, authorized_admin, sutra_data, project_data):
+    response = authorized_admin.post(f"/projects/?name={sutra_data()['project']['name']}&description={sutra_data()['project']['description']}", json=project_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/isha/sutras/", json=sutra_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    sutra_url = f"/isha/sutras/{sutra_data()["project"]["name"]}/{sutra_data()["sutra"]["chapter"]}/{sutra_data()["sutra"]["number"]}"
+    for language in ["en", "sa"]:
+        response = authorized_admin.post(f"{sutra_url}/meaning", json={"language": language, "text": f"Meaning {language}"})
+        assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post(f"{sutra_url}/interpretation", json={"language": "en", "text": "Interpretation", "philosophy": "dva"})
+    assert response.status_code == status.HTTP_201_CREATED
+
+    response = client.get(f"{sutra_url}/full")
+    assert response.status_code == status.HTTP_200_OK
+    full = response.json()
+    assert full["text"] == sutra_data()["sutra"]["text"]
+    assert sorted(meaning["language"] for meaning in full["meanings"]) == ["en", "sa"]
+    assert full["interpretations"] == [{"id": 1, "language": "en", "text": "Interpretation", "philosophy": "dva"}]
+    assert full["transliterations"] == full["bhashyams"] == full["audios"] == []
+
+    response = client.get(f"{sutra_url}/full?langs=sa&phils=adv")
+    assert response.status_code == status.HTTP_200_OK
+    full = response.json()
+    assert [meaning["language"] for meaning in full["meanings"]] == ["sa"]
+    assert full["interpretations"] == []
+
+    response = client.get(f"/isha/sutras/{sutra_data()["project"]["name"]}/{sutra_data()["sutra"]["chapter"]}/99/full")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+def test_get_sutras_paginated(client, authorized_admin, sutra_data, project_data):
+    response = authorized_admin.post(f"/projects/?name={sutra_data()['project']['name']}&description={sutra_data()['project']['description']}", json=project_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    for chapter, number in [(2, 1), (1, 2), (1, 1)]:
+        response = authorized_admin.post("/isha/sutras/", json={"sutra": {"chapter": chapter, "number": number, "text": "Test Sutra text"}, "project": sutra_data()["project"]})
+        assert response.status_code == status.HTTP_201_CREATED
+
+    response = client.get(f"/isha/sutras/?project_name={sutra_data()['project']['name']}&limit=2&include_total=true")
+    assert response.status_code == status.HTTP_200_OK
+    assert [(sutra["chapter"], sutra["number"]) for sutra in response.json()] == [(1, 1), (1, 2)]
+    assert response.headers["X-Total-Count"] == "3"
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get(f"/isha/sutras/?project_name={sutra_data()['project']['name']}&limit=2&cursor={cursor}")
+    assert [(sutra["chapter"], sutra["number"]) for sutra in response.json()] == [(2, 1)]
+    assert "X-Next-Cursor" not in response.headers
+    assert "X-Total-Count" not in response.headers
+
+    response = client.get(f"/isha/sutras/total-count?project_name={sutra_data()['project']['name']}")
+    assert response.json() == 3
+    response = authorized_admin.delete(f"/isha/sutras/{sutra_data()['project']['name']}/1/1")
+    assert response.status_code == status.HTTP_200_OK
+    response = client.get(f"/isha/sutras/total-count?project_name={sutra_data()['project']['name']}")
+    assert response.json() == 2
+
+    for cursor in ("garbage", encode_cursor({"a": 1}, [2]), encode_cursor("x", None), encode_cursor(True, 1), encode_cursor(1)):
+        response = client.get(f"/isha/sutras/?project_name={sutra_data()['project']['name']}&cursor={cursor}")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    # Without limit nor cursor the whole list is returned, as before pagination
+    response = client.get(f"/isha/sutras/?project_name={sutra_data()['project']['name']}")
+    assert len(response.json()) == 2
+    assert "X-Next-Cursor" not in response.headers
+    response = client.get(f"/isha/sutras/?project_name={sutra_data()['project']['name']}&limit=0")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_update_sutra_onto_existing_verse(authorized_admin, sutra_data, project_data):
+    response = authorized_admin.post(f"/projects/?name={sutra_data()['project']['name']}&description={sutra_data()['project']['description']}", json=project_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    for number in (10, 11):
+        response = authorized_admin.post("/isha/sutras/", json={**sutra_data(), "sutra": {**sutra_data()["sutra"], "number": number}})
+        assert response.status_code == status.HTTP_201_CREATED
+    url = f"/isha/sutras/{sutra_data()['project']['name']}/0"
+    response = authorized_admin.put(f"{url}/11", json={"id": 2, "chapter": 0, "number": 10, "text": "Moved sutra"})
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert authorized_admin.get(f"{url}/11").json()["text"] == sutra_data()["sutra"]["text"]
@@ -0,0 +1,10 @@
+import pytest
+
+from app.models import Project
+
+
+@pytest.fixture(autouse=True)
+def upanishad(session):
+    # Content routes are served under /{project name}
+    session.add(Project(name="kena"))
+    session.commit()
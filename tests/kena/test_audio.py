@@ -1,9 +1,19 @@
+import hashlib
+import io
 import tempfile
+import threading
+import wave
 
+import numpy as np
 import pytest
-from fastapi import status
+from fastapi import HTTPException, Request, UploadFile, status
 import os
 
+from app.config import settings
+from app.isha import models
+from app.isha.storage import MULTIPART_OVERHEAD, blob_path, save_upload
+from app.isha.transcoding import Transcoder, transcoder
+
 # BASE_URL = "http://localhost:8100"
 # UPANISHADS = "isha"
 entity_suffix = "audio"
@@ -40,7 +50,8 @@ def add_audio(upanishad: str = "test", chapter: int = 0, sutra_no: int = 10, mod
     return files
 
 @pytest.mark.parametrize("client_type",["client", "authorized_client","authorized_admin",],)
-def test_get_audio(client_type, client, authorized_client, authorized_admin, project_data, sutra_data, audio_data,):
+def test_get_audio(client_type, client, authorized_client, authorized_admin, project_data, sutra_data, audio_data, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "audio_store_dir", str(tmp_path))
     response = authorized_admin.post("/projects/?name=test&description=testdesc", json=project_data())
     assert response.status_code == status.HTTP_201_CREATED
     response = authorized_admin.post("/kena/sutras/", json=sutra_data())
@@ -66,7 +77,7 @@ def test_get_audio(client_type, client, authorized_client, authorized_admin, pro
         test_client = clients[client_type]
         response = test_client.get(f"/kena/sutras/{sutra_data()["project"]["name"]}/{sutra_data()["sutra"]["chapter"]}/{sutra_data()["sutra"]["number"]}/{entity_suffix}?mode={audio_data()["mode"]}")
         assert response.status_code == status.HTTP_200_OK
-        assert response.json() == {"file_path": f"static/kena/{audio_data()["mode"]}/sutra_{sutra_data()["sutra"]["number"]}.mp3"}
+        assert response.json() == {"file_path": f"{tmp_path}/e3/b0/{hashlib.sha256(b"").hexdigest()}.mp3"}
 @pytest.mark.parametrize("client_type, expected_status",
     [
         ("client", status.HTTP_401_UNAUTHORIZED,),  # Unauthorized client should return 401
@@ -108,7 +119,8 @@ def test_add_audio(client_type, expected_status, client, authorized_client, auth
         ("authorized_admin", status.HTTP_204_NO_CONTENT,),  # Authorized admin should also return 201
     ],
 )
-def test_update_audio(client_type, expected_status, client, authorized_client, authorized_admin, project_data, sutra_data, audio_data,):
+def test_update_audio(client_type, expected_status, client, authorized_client, authorized_admin, project_data, sutra_data, audio_data, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "audio_store_dir", str(tmp_path))
     response = authorized_admin.post("/projects/?name=test&description=testdesc", json=project_data())
     assert response.status_code == status.HTTP_201_CREATED
     response = authorized_admin.post("/kena/sutras/", json=sutra_data())
@@ -151,7 +163,7 @@ def test_update_audio(client_type, expected_status, client, authorized_client, a
             if response.status_code == status.HTTP_202_ACCEPTED:
                 response = test_client.get(f"/kena/sutras/{sutra_data()["project"]["name"]}/{sutra_data()["sutra"]["chapter"]}/{sutra_data()["sutra"]["number"]}/{entity_suffix}?lang={audio_data()["filepath"]}&phil={audio_data()["mode"]}",)
                 assert response.status_code == status.HTTP_200_OK
-                assert response.json() == {"file_path": f"static/kena/{audio_data()["mode"]}/sutra_{sutra_data()["sutra"]["number"]}.mp3"}
+                assert response.json() == {"file_path": f"{tmp_path}/e3/b0/{hashlib.sha256(b"").hexdigest()}.mp3"}
 @pytest.mark.parametrize("client_type, expected_status",
     [
         ("client", status.HTTP_401_UNAUTHORIZED,),  # Unauthorized client should return 401
@@ -186,3 +198,246 @@ def test_delete_audio(client_type, expected_status, client, authorized_client, a
         test_client = clients[client_type]
         response = test_client.delete(f"/kena/sutras/{sutra_data()["project"]["name"]}/{sutra_data()["sutra"]["chapter"]}/{sutra_data()["sutra"]["number"]}/{entity_suffix}?mode={audio_data()["mode"]}")
         assert response.status_code == expected_status
+
+
+def test_audio_upload_is_hashed(authorized_admin, session, project_data, sutra_data):
+    response = authorized_admin.post("/projects/?name=test&description=testdesc", json=project_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/kena/sutras/", json=sutra_data())
+    assert response.status_code == status.HTTP_201_CREATED
+
+    content = os.urandom(3 * 1024 * 1024 + 17)  # Spans several chunks
+    response = authorized_admin.post(f"/kena/sutras/test/0/10/{entity_suffix}?mode=chant", files={"file": ("audio.mp3", content, "audio/mpeg")})
+    assert response.status_code == status.HTTP_201_CREATED
+    audio = session.query(models.Audio).one()
+    assert audio.sha256 == hashlib.sha256(content).hexdigest()
+    assert audio.size == len(content)
+    with open(audio.file_path, "rb") as stored: assert stored.read() == content
+
+
+def test_audio_upload_size_limit(monkeypatch, authorized_admin, session, project_data, sutra_data):
+    response = authorized_admin.post("/projects/?name=test&description=testdesc", json=project_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/kena/sutras/", json=sutra_data())
+    assert response.status_code == status.HTTP_201_CREATED
+
+    monkeypatch.setattr(settings, "audio_max_upload_bytes", 1024)
+    response = authorized_admin.post(f"/kena/sutras/test/0/10/{entity_suffix}?mode=chant", files={"file": ("audio.mp3", b"x" * 1025, "audio/mpeg")})
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert session.query(models.Audio).count() == 0
+    response = authorized_admin.post(f"/kena/sutras/test/0/10/{entity_suffix}?mode=chant", files={"file": ("audio.mp3", b"x" * 1024, "audio/mpeg")})
+    assert response.status_code == status.HTTP_201_CREATED
+
+    # Rejected from its Content-Length, before the body is parsed
+    monkeypatch.setattr(Request, "form", lambda *args, **kwargs: pytest.fail("the body was parsed"))
+    response = authorized_admin.put(f"/kena/sutras/test/0/10/{entity_suffix}?mode=chant", files={"file": ("audio.mp3", b"x" * (1024 + MULTIPART_OVERHEAD), "audio/mpeg")})
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+
+def test_save_upload_is_content_addressed(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "audio_store_dir", str(tmp_path))
+    stored = save_upload(UploadFile(io.BytesIO(b"recording"), filename="a.MP3"), max_bytes=100)
+    sha256 = hashlib.sha256(b"recording").hexdigest()
+    assert stored.path == tmp_path / sha256[:2] / sha256[2:4] / f"{sha256}.mp3"
+    assert save_upload(UploadFile(io.BytesIO(b"recording"), filename="b.mp3"), max_bytes=100).path == stored.path
+    with pytest.raises(HTTPException):
+        save_upload(UploadFile(io.BytesIO(b"x" * 101), filename="c.mp3"), max_bytes=100)
+    # The failed upload left no temporary file behind
+    assert sorted(path.name for path in tmp_path.rglob("*") if path.is_file()) == [stored.path.name]
+
+
+def test_audio_stream_ranges(client, authorized_admin, project_data, sutra_data):
+    response = authorized_admin.post("/projects/?name=test&description=testdesc", json=project_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/kena/sutras/", json=sutra_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    content = os.urandom(100_000)
+    response = authorized_admin.post(f"/kena/sutras/test/0/10/{entity_suffix}?mode=chant", files={"file": ("audio.mp3", content, "audio/mpeg")})
+    assert response.status_code == status.HTTP_201_CREATED
+    sha256 = response.json()["audio"]["sha256"]
+    url = f"/kena/sutras/test/0/10/{entity_suffix}/stream?mode=chant"
+
+    response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == content
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["etag"] == f'"{sha256}"'
+    assert response.headers["cache-control"] == settings.audio_cache_control
+
+    response = client.get(url, headers={"Range": "bytes=1000-1999"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == content[1000:2000]
+    assert response.headers["content-range"] == f"bytes 1000-1999/{len(content)}"
+
+    # If-Range with the current ETag resumes, a stale one gets the whole file
+    response = client.get(url, headers={"Range": "bytes=-10", "If-Range": f'"{sha256}"'})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == content[-10:]
+    response = client.get(url, headers={"Range": "bytes=-10", "If-Range": '"stale"'})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == content
+
+    response = client.get(url, headers={"Range": f"bytes={len(content)}-"})
+    assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+
+    response = client.get(url, headers={"If-None-Match": f'"{sha256}"'})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+
+    response = client.get(f"{url}&v={sha256}")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["cache-control"] == settings.audio_immutable_cache_control
+
+
+def test_audio_stream_not_found(client, authorized_admin, project_data, sutra_data):
+    response = authorized_admin.post("/projects/?name=test&description=testdesc", json=project_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/kena/sutras/", json=sutra_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    response = client.get(f"/kena/sutras/test/0/10/{entity_suffix}/stream?mode=chant")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_audio_storage_is_deduplicated(monkeypatch, tmp_path, session, authorized_admin, project_data, sutra_data):
+    monkeypatch.setattr(settings, "audio_store_dir", str(tmp_path))
+    response = authorized_admin.post("/projects/?name=test&description=testdesc", json=project_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    for chapter in (0, 1):
+        sutra = sutra_data()
+        sutra["sutra"]["chapter"] = chapter
+        response = authorized_admin.post("/kena/sutras/", json=sutra)
+        assert response.status_code == status.HTTP_201_CREATED
+
+    # Same sutra number in two chapters, plus a second mode with the same recording
+    paths = set()
+    for chapter, mode in ((0, "chant"), (1, "chant"), (1, "teach_me")):
+        response = authorized_admin.post(f"/kena/sutras/test/{chapter}/10/{entity_suffix}?mode={mode}", files={"file": ("audio.mp3", b"same recording", "audio/mpeg")})
+        assert response.status_code == status.HTTP_201_CREATED
+        paths.add(response.json()["audio"]["file_path"])
+    response = authorized_admin.post(f"/kena/sutras/test/0/10/{entity_suffix}?mode=teach_me", files={"file": ("audio.mp3", b"other recording", "audio/mpeg")})
+    assert response.status_code == status.HTTP_201_CREATED
+    other = response.json()["audio"]["file_path"]
+    shared = blob_path(hashlib.sha256(b"same recording").hexdigest(), ".mp3")
+    assert paths == {str(shared)}
+    assert other != str(shared)
+
+    # The shared file stays until its last reference is gone
+    response = authorized_admin.delete(f"/kena/sutras/test/0/10/{entity_suffix}?mode=chant")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert shared.exists()
+    response = authorized_admin.put(f"/kena/sutras/test/1/10/{entity_suffix}?mode=chant", files={"file": ("audio.mp3", b"other recording", "audio/mpeg")})
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert shared.exists()
+    response = authorized_admin.delete("/kena/sutras/test/1/10")
+    assert response.status_code == status.HTTP_200_OK
+    assert not shared.exists()
+    assert os.path.exists(other)
+    response = authorized_admin.delete("/projects_by_name/test")
+    assert response.status_code == status.HTTP_200_OK
+    assert not os.path.exists(other)
+
+
+@pytest.fixture
+def fake_ffmpeg(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "audio_store_dir", str(tmp_path))
+    monkeypatch.setattr(Transcoder, "available", True)
+    release = threading.Event()
+    release.set()
+
+    def encode(self, source, destination, bitrate, channels):
+        release.wait(5)
+        destination.write_bytes(source.read_bytes() + f"@{bitrate}k".encode())
+    monkeypatch.setattr(Transcoder, "encode", encode)
+    yield release
+    transcoder.join(timeout=5)
+
+
+def test_audio_variants(fake_ffmpeg, client, session, authorized_admin, project_data, sutra_data):
+    response = authorized_admin.post("/projects/?name=test&description=testdesc", json=project_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/kena/sutras/", json=sutra_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    url = f"/kena/sutras/test/0/10/{entity_suffix}?mode=chant"
+
+    fake_ffmpeg.clear()  # Hold the job until the original has been served
+    response = authorized_admin.post(url, files={"file": ("audio.wav", b"recording", "audio/wav")})
+    assert response.status_code == status.HTTP_201_CREATED
+    original = response.json()["audio"]["file_path"]
+    response = client.get(url, headers={"Save-Data": "on"})
+    assert response.json() == {"file_path": original}
+    assert response.headers["vary"] == "Save-Data"
+    etag = response.headers["etag"]
+    fake_ffmpeg.set()
+    transcoder.join(timeout=5)
+
+    variants = {variant.quality: variant for variant in session.query(models.AudioVariant)}
+    assert set(variants) == {"low", "medium", "high"}
+    assert open(variants["low"].file_path, "rb").read() == b"recording@32k"
+    response = client.get(url, headers={"Save-Data": "on", "If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"file_path": variants["low"].file_path}
+    # The original has its own ETag
+    response = client.get(url, headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"file_path": original}
+    response = client.get(f"{url}&quality=high", headers={"Save-Data": "on"})
+    assert response.json() == {"file_path": variants["high"].file_path}
+    response = client.get(url)
+    assert response.json() == {"file_path": original}
+    response = client.get(f"/kena/sutras/test/0/10/{entity_suffix}/stream?mode=chant&quality=medium")
+    assert response.content == b"recording@64k"
+
+    # A new recording replaces the variants of the previous one
+    response = authorized_admin.put(url, files={"file": ("audio.wav", b"new recording", "audio/wav")})
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    transcoder.join(timeout=5)
+    session.expire_all()
+    low = session.query(models.AudioVariant).filter_by(quality="low").one()
+    assert open(low.file_path, "rb").read() == b"new recording@32k"
+    assert not os.path.exists(variants["low"].file_path)
+    response = authorized_admin.delete(url)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert not os.path.exists(low.file_path)
+
+
+def wav_bytes(samples, sample_rate=8000, width=2, channels=1):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(width)
+        writer.setframerate(sample_rate)
+        writer.writeframes((np.repeat(samples, channels) * (2 ** (8 * width - 1) - 1)).astype(f"<i{width}").tobytes())
+    return buffer.getvalue()
+
+
+def test_audio_meta(monkeypatch, tmp_path, client, authorized_admin, project_data, sutra_data):
+    monkeypatch.setattr(settings, "audio_store_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "audio_peaks_count", 4)
+    response = authorized_admin.post("/projects/?name=test&description=testdesc", json=project_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/kena/sutras/", json=sutra_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    url = f"/kena/sutras/test/0/10/{entity_suffix}"
+
+    # Two seconds of a 440 Hz sine, silent in the second half
+    t = np.arange(16000) / 8000
+    samples = np.sin(2 * np.pi * 440 * t) * (t < 1)
+    response = authorized_admin.post(f"{url}?mode=chant", files={"file": ("audio.wav", wav_bytes(samples), "audio/wav")})
+    assert response.status_code == status.HTTP_201_CREATED
+    transcoder.join(timeout=5)  # Measured in the background
+    response = client.get(f"{url}/meta?mode=chant")
+    assert response.status_code == status.HTTP_200_OK
+    meta = response.json()
+    assert (meta["duration"], meta["sample_rate"], meta["channels"]) == (2.0, 8000, 1)
+    assert meta["loudness"] == pytest.approx(-6.02, abs=0.05)  # -3 dBFS over half the time
+    assert meta["peaks"][:2] == [pytest.approx(1.0, abs=0.01)] * 2 and meta["peaks"][2:] == [0.0, 0.0]
+    assert "etag" in response.headers
+
+    # Replacing the recording updates its measurements
+    response = authorized_admin.put(f"{url}?mode=chant", files={"file": ("audio.mp3", b"not decodable here", "audio/mpeg")})
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    transcoder.join(timeout=5)
+    response = client.get(f"{url}/meta?mode=chant")
+    assert response.json() == {"duration": None, "sample_rate": None, "channels": None, "loudness": None, "peaks": None}
+    response = client.get(f"{url}/meta?mode=teach_me")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
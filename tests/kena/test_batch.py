@@ -0,0 +1,74 @@
+import pytest
+from fastapi import status
+from sqlalchemy import event
+
+from tests.conftest import async_engine
+
+@pytest.fixture
+def chapter(authorized_admin):
+    response = authorized_admin.post("/projects/?name=test&description=testdesc", json={"name": "test", "description": "testopanishad"})
+    assert response.status_code == status.HTTP_201_CREATED
+    for chapter in (1, 2):
+        for number in range(1, 6):
+            response = authorized_admin.post("/kena/sutras/", json={"sutra": {"chapter": chapter, "number": number, "text": f"Sutra {chapter}.{number}"}, "project": {"name": "test"}})
+            assert response.status_code == status.HTTP_201_CREATED
+            for language in ("en", "sa"):
+                response = authorized_admin.post(f"/kena/sutras/test/{chapter}/{number}/meaning", json={"language": language, "text": f"Meaning {chapter}.{number} {language}"})
+                assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/kena/sutras/test/1/2/interpretation", json={"language": "en", "philosophy": "dva", "text": "Dvaita 1.2"})
+    assert response.status_code == status.HTTP_201_CREATED
+
+def test_batch_meanings(client, chapter):
+    response = client.get("/kena/meanings?project_name=test&chapter=1&numbers=2-4&lang=en")
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert [meaning["text"] for meaning in body] == ["Meaning 1.2 en", "Meaning 1.3 en", "Meaning 1.4 en"]
+    assert body[0]["sutra"] == {"id": body[0]["sutra"]["id"], "chapter": 1, "number": 2}
+    response = client.get("/kena/meanings?project_name=test&chapter=2&numbers=1,3-4,5&lang=sa")
+    assert [meaning["sutra"]["number"] for meaning in response.json()] == [1, 3, 4, 5]
+    # Without numbers the whole chapter is returned
+    response = client.get("/kena/meanings?project_name=test&chapter=2")
+    assert len(response.json()) == 5
+
+def test_batch_other_kinds(client, chapter):
+    response = client.get("/kena/interpretations?project_name=test&chapter=1&numbers=1-5&lang=en&phil=dva")
+    assert [(item["sutra"]["number"], item["text"]) for item in response.json()] == [(2, "Dvaita 1.2")]
+    assert client.get("/kena/transliterations?project_name=test&chapter=1&numbers=1-5").json() == []
+    assert client.get("/kena/bhashyams?project_name=test&chapter=1").json() == []
+
+def test_batch_unknown_project(client, chapter):
+    for _ in range(2):
+        response = client.get("/kena/meanings?project_name=missing&chapter=1")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+def test_batch_invalidation(client, authorized_admin, chapter):
+    url = "/kena/meanings?project_name=test&chapter=1&numbers=1-3&lang=en"
+    response = client.get(url)
+    etag = response.headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == status.HTTP_304_NOT_MODIFIED
+
+    response = authorized_admin.put("/kena/sutras/test/1/2/meaning", json={"language": "en", "text": "Revised"})
+    assert response.status_code < 300
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()[1]["text"] == "Revised"
+
+    response = authorized_admin.delete("/kena/sutras/test/1/3")
+    assert response.status_code == status.HTTP_200_OK
+    assert [meaning["sutra"]["number"] for meaning in client.get(url).json()] == [1, 2]
+
+def test_batch_single_query(client, chapter):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        response = client.get("/kena/meanings?project_name=test&chapter=1&numbers=1-5&lang=en")
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", listener)
+    assert len(response.json()) == 5
+    assert len(statements) == 1
+
+@pytest.mark.parametrize("numbers", ["a-b", "5-1", "1-"])
+def test_batch_invalid_numbers(client, numbers):
+    response = client.get(f"/kena/meanings?chapter=1&numbers={numbers}")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
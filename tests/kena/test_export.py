@@ -0,0 +1,43 @@
+import json
+
+import pytest
+from fastapi import status
+
+from app.isha.routers import export
+
+@pytest.fixture
+def project_data():
+    def _project_data():
+        return {"name": 'test', "description": "testopanishad"}
+    return _project_data
+@pytest.fixture
+def sutras(authorized_admin, project_data):
+    response = authorized_admin.post("/projects/?name=test&description=testdesc", json=project_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    # Inserted out of order to check the export walks (chapter, number)
+    for chapter, number in [(2, 1), (1, 2), (1, 1)]:
+        response = authorized_admin.post("/kena/sutras/", json={"sutra": {"chapter": chapter, "number": number, "text": f"Sutra {chapter}.{number}"}, "project": {"name": "test"}})
+        assert response.status_code == status.HTTP_201_CREATED
+        for language in ["en", "sa"]:
+            response = authorized_admin.post(f"/kena/sutras/test/{chapter}/{number}/meaning", json={"language": language, "text": f"Meaning {chapter}.{number} {language}"})
+            assert response.status_code == status.HTTP_201_CREATED
+
+def test_export_ndjson(client, sutras, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+    response = client.get("/kena/export?project_name=test&langs=en")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [(line["chapter"], line["number"]) for line in lines] == [(1, 1), (1, 2), (2, 1)]
+    assert [meaning["text"] for meaning in lines[0]["meanings"]] == ["Meaning 1.1 en"]
+
+def test_export_chapter_json(client, sutras):
+    response = client.get("/kena/export?project_name=test&chapter=1&format=json")
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert [sutra["number"] for sutra in body] == [1, 2]
+    assert len(body[0]["meanings"]) == 2
+
+def test_export_unknown_project(client):
+    response = client.get("/kena/export?project_name=missing")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+from fastapi import status
+
+@pytest.fixture
+def project(authorized_admin):
+    response = authorized_admin.post("/projects/?name=test&description=testdesc", json={"name": "test", "description": "testopanishad"})
+    assert response.status_code == status.HTTP_201_CREATED
+
+def bundle(chapter_count=2, numbers=3, text="Sutra"):
+    return [
+        {
+            "chapter": chapter,
+            "number": number,
+            "text": f"{text} {chapter}.{number}",
+            "meanings": [{"language": "en", "text": f"Meaning {chapter}.{number}"}],
+            "interpretations": [{"language": "en", "philosophy": "adv", "text": f"Advaita {chapter}.{number}"}],
+        }
+        for chapter in range(1, chapter_count + 1) for number in range(1, numbers + 1)
+    ]
+
+def upload(client, records, format="ndjson", project_name="test"):
+    if format == "ndjson": body = "\n".join(json.dumps(record) for record in records)
+    elif format == "json": body = json.dumps(records)
+    else: body = records
+    return client.post(f"/kena/import?project_name={project_name}", files={"file": (f"bundle.{format}", body.encode("utf-8"))})
+
+def test_import_ndjson(client, authorized_admin, project):
+    response = upload(authorized_admin, bundle())
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"project": "test", "sutras": 6, "meanings": 6, "transliterations": 0, "interpretations": 6, "bhashyams": 0}
+    assert client.get("/kena/sutras/total-count?project_name=test").json() == 6
+    assert client.get("/kena/sutras/test/2/3/meaning?lang=en").json()["text"] == "Meaning 2.3"
+    assert client.get("/kena/sutras/test/1/2/interpretation?lang=en&phil=adv").json()["text"] == "Advaita 1.2"
+    # Rows written by the import are searchable
+    assert {result["kind"] for result in client.get("/kena/search/advaita?project_name=test").json()} == {"interpretation"}
+
+def test_import_upserts(client, authorized_admin, project):
+    assert upload(authorized_admin, bundle()).status_code == status.HTTP_200_OK
+    etag = client.get("/kena/sutras/test/1/1").headers["etag"]
+    unchanged = client.get("/kena/sutras/test/1/1/meaning?lang=en").headers["etag"]
+
+    records = bundle(chapter_count=1, numbers=1, text="Revised")
+    records[0]["meanings"].append({"language": "sa", "text": "Artha 1.1"})
+    response = upload(authorized_admin, records, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert client.get("/kena/sutras/total-count?project_name=test").json() == 6
+    response = client.get("/kena/sutras/test/1/1")
+    assert response.json()["text"] == "Revised 1.1"
+    assert response.headers["etag"] != etag
+    assert client.get("/kena/sutras/test/1/1/meaning?lang=en").headers["etag"] == unchanged
+    assert client.get("/kena/sutras/test/1/1/meaning?lang=sa").json()["text"] == "Artha 1.1"
+
+def test_import_csv(client, authorized_admin, project):
+    rows = (
+        "chapter,number,kind,language,philosophy,text\n"
+        "1,1,sutra,,,ईशा वास्यमिदं सर्वं\n"
+        "1,1,transliteration,en,,isha vasyam idam sarvam\n"
+        "1,1,bhashyam,sa,dva,\"Bhashyam, with a comma\"\n"
+    )
+    response = upload(authorized_admin, rows, format="csv")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["bhashyams"] == 1
+    assert client.get("/kena/sutras/test/1/1").json()["text"] == "ईशा वास्यमिदं सर्वं"
+    assert client.get("/kena/sutras/test/1/1/bhashyam?lang=sa&phil=dva").json()["text"] == "Bhashyam, with a comma"
+
+def test_import_rejects_invalid_bundle(client, authorized_admin, project):
+    records = bundle()
+    records[1]["meanings"][0]["language"] = "xx"
+    del records[4]["chapter"]
+    response = upload(authorized_admin, records)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert [error.split(",")[0] for error in response.json()["detail"]] == ["record 2", "record 5"]
+    # Nothing was written
+    assert client.get("/kena/sutras/total-count?project_name=test").json() == 0
+
+    records = [{"chapter": 9, "number": 9, "meanings": [{"language": "en", "text": "Orphan"}]}]
+    response = upload(authorized_admin, records)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["detail"] == ["sutra 9.9 has no text and does not exist"]
+    assert upload(authorized_admin, "chapter,number,kind\n1,1,commentary\n", format="csv").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+def test_import_exported_bundle(client, authorized_admin, project):
+    assert upload(authorized_admin, bundle()).status_code == status.HTTP_200_OK
+    exported = client.get("/kena/export?project_name=test").text
+    response = authorized_admin.post("/projects/?name=copy&description=copy", json={"name": "copy", "description": "copy"})
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/kena/import?project_name=copy", files={"file": ("export.ndjson", exported.encode("utf-8"))})
+    assert response.status_code == status.HTTP_200_OK
+    copied = client.get("/kena/export?project_name=copy").text
+    strip = lambda text: [{key: value for key, value in json.loads(line).items() if key != "id"} for line in text.splitlines()]
+    assert [record["text"] for record in strip(copied)] == [record["text"] for record in strip(exported)]
+
+@pytest.mark.parametrize("client_type, expected_status", [("client", status.HTTP_401_UNAUTHORIZED), ("authorized_client", status.HTTP_403_FORBIDDEN)])
+def test_import_requires_admin(client_type, expected_status, client, authorized_client, project):
+    clients = {"client": client, "authorized_client": authorized_client}
+    assert upload(clients[client_type], bundle()).status_code == expected_status
+
+def test_import_unknown_project(authorized_admin):
+    assert upload(authorized_admin, bundle(), project_name="missing").status_code == status.HTTP_404_NOT_FOUND
@@ -94,3 +94,25 @@ def test_delete_meaning(client_type, expected_status, client, authorized_client,
     test_client = clients[client_type]
     response = test_client.delete(f"/kena/sutras/{sutra_data()["project"]["name"]}/{sutra_data()["sutra"]["chapter"]}/{sutra_data()["sutra"]["number"]}/{entity_suffix}?lang={meaning_data()["language"]}")
     assert response.status_code == expected_status
+def test_add_meaning_duplicate(authorized_admin, project_data, sutra_data, meaning_data,):
+    response = authorized_admin.post("/projects/?name=kena_test&description=testdesc", json=project_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/kena/sutras/", json=sutra_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post(f"/kena/sutras/{sutra_data()["project"]["name"]}/{sutra_data()["sutra"]["chapter"]}/{sutra_data()["sutra"]["number"]}/{entity_suffix}", json=meaning_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post(f"/kena/sutras/{sutra_data()["project"]["name"]}/{sutra_data()["sutra"]["chapter"]}/{sutra_data()["sutra"]["number"]}/{entity_suffix}", json=meaning_data())
+    assert response.status_code == status.HTTP_409_CONFLICT
+def test_update_meaning_to_existing_language(authorized_admin, project_data, sutra_data, meaning_data,):
+    response = authorized_admin.post("/projects/?name=kena_test&description=testdesc", json=project_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/kena/sutras/", json=sutra_data())
+    assert response.status_code == status.HTTP_201_CREATED
+    url = f"/kena/sutras/{sutra_data()["project"]["name"]}/{sutra_data()["sutra"]["chapter"]}/{sutra_data()["sutra"]["number"]}/{entity_suffix}"
+    for language in ("en", "hi"):
+        response = authorized_admin.post(url, json={**meaning_data(), "language": language})
+        assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.put(f"{url}?lang=hi", json={**meaning_data(), "language": "en"})
+    assert response.status_code == status.HTTP_409_CONFLICT
+    response = authorized_admin.get(f"{url}?lang=hi")
+    assert response.status_code == status.HTTP_200_OK
@@ -0,0 +1,140 @@
+import asyncio
+import threading
+
+import bcrypt
+import pytest
+from fastapi import HTTPException, status
+from sqlalchemy import event
+
+from app.config import settings
+from app.denylist import RedisDenylist
+from app.hashing import PasswordHasher, password_hasher
+from app.models import User
+from app.oauth2 import create_access_token
+from tests.conftest import engine
+from tests.fake_redis import FakeRedisServer
+
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def login(client, email="admin@example.com", password="123"):
+    response = client.post("/auth/login", data={"username": email, "password": password})
+    assert response.status_code == status.HTTP_200_OK
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_writes_do_not_look_up_the_user(authorized_admin, statements):
+    response = authorized_admin.post("/projects/?name=test&description=testdesc", json={"name": "test"})
+    assert response.status_code == status.HTTP_201_CREATED
+    assert not [statement for statement in statements if "FROM users" in statement]
+
+
+def test_tokens_carry_a_jti(test_admin):
+    assert create_access_token({"user_id": 1, "is_admin": True}) != create_access_token({"user_id": 1, "is_admin": True})
+
+
+def test_logout_revokes_tokens(client, test_admin):
+    headers = login(client)
+    response = client.post("/projects/?name=test&description=testdesc", json={"name": "test"}, headers=headers)
+    assert response.status_code == status.HTTP_201_CREATED
+
+    response = client.post("/auth/logout", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+
+    response = client.post("/projects/?name=other&description=testdesc", json={"name": "other"}, headers=headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    # A fresh login is not affected
+    response = client.post("/projects/?name=other&description=testdesc", json={"name": "other"}, headers=login(client))
+    assert response.status_code == status.HTTP_201_CREATED
+
+
+def test_verify_user_rejects_removed_users(monkeypatch, client, authorized_admin, authorized_client, test_user):
+    monkeypatch.setattr(settings, "auth_verify_user", True)
+    response = authorized_client.post("/projects/?name=test&description=testdesc", json={"name": "test"})
+    assert response.status_code == status.HTTP_201_CREATED
+
+    response = authorized_admin.delete(f"/users/{test_user['id']}")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    response = authorized_client.post("/projects/?name=other&description=testdesc", json={"name": "other"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    # Without verification the signed claims are trusted until the token expires
+    monkeypatch.setattr(settings, "auth_verify_user", False)
+    response = authorized_client.post("/projects/?name=other&description=testdesc", json={"name": "other"})
+    assert response.status_code == status.HTTP_201_CREATED
+
+
+def test_redis_denylist_is_shared():
+    server = FakeRedisServer().start()
+    try:
+        first, second = RedisDenylist(server.url, "test"), RedisDenylist(server.url, "test")
+        first.revoke("abc", expires_at=4102444800)
+        assert second.is_revoked("abc")
+        assert not second.is_revoked("def")
+        second.clear()
+        assert not first.is_revoked("abc")
+    finally:
+        server.stop()
+
+
+def test_login_rehashes_outdated_hashes(client, session, test_admin):
+    test_admin.password = bcrypt.hashpw(b"123", bcrypt.gensalt(rounds=5)).decode()
+    session.commit()
+    login(client)
+    stored = session.query(User.password).filter(User.email == "admin@example.com").scalar()
+    assert stored.split("$")[2] == f"{settings.bcrypt_rounds:02d}"
+    # The upgraded hash still verifies
+    login(client)
+
+
+def test_password_hashing_is_bounded():
+    hasher = PasswordHasher(workers=1, queue_size=1)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+
+    waiting = threading.Thread(target=hasher._run, args=(slow,))
+    waiting.start()
+    assert started.wait(5)
+    with pytest.raises(HTTPException) as error:
+        hasher.hash("123")
+    assert error.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert error.value.headers["Retry-After"]
+    release.set()
+    waiting.join()
+    assert hasher.verify("123", hasher.hash("123"))
+
+
+def test_async_hashing_waits_without_blocking_the_loop():
+    hasher = PasswordHasher(workers=1, queue_size=2)
+    release = threading.Event()
+    hasher._submit(release.wait, 5)  # Occupies the only hashing thread
+
+    async def hash_while_busy():
+        hashed = asyncio.ensure_future(hasher.hash_async("123"))
+        await asyncio.sleep(0.05)
+        assert not hashed.done()  # The loop keeps running while the hash waits
+        release.set()
+        return await hasher.verify_async("123", await hashed)
+
+    assert asyncio.run(hash_while_busy())
+
+
+def test_login_is_rejected_when_hashing_is_saturated(monkeypatch, client, test_admin):
+    monkeypatch.setattr(password_hasher, "_slots", threading.BoundedSemaphore(1))
+    password_hasher._slots.acquire()
+    response = client.post("/auth/login", data={"username": "admin@example.com", "password": "123"})
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert "retry-after" in response.headers
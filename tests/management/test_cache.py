@@ -0,0 +1,190 @@
+import socket
+import time
+
+import pytest
+from fastapi import status
+
+from app.cache import MemoryCache, RedisCache, content_key
+from app.utils import Language, Philosophy
+from tests.fake_redis import FakeRedisServer
+
+
+@pytest.fixture()
+def redis_server():
+    server = FakeRedisServer().start()
+    yield server
+    server.stop()
+
+
+def make_redis_cache(url):
+    cache = RedisCache(url=url, namespace="test", ttl=60, local_max_bytes=1000, local_ttl=60)
+    assert cache.subscribed.wait(5)
+    return cache
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_lru_eviction_by_size():
+    cache = MemoryCache(max_bytes=30, ttl=60)
+    cache.set(("a",), "x" * 10)
+    cache.set(("b",), "x" * 10)
+    assert cache.get(("a",)) is not None  # "a" is now the most recently used
+    cache.set(("c",), "x" * 10)
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) is not None and cache.get(("c",)) is not None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= 30
+    # Values larger than the whole cache are not stored
+    cache.set(("d",), "x" * 100)
+    assert cache.get(("d",)) is None
+
+
+def test_ttl_expiry():
+    cache = MemoryCache(max_bytes=1000, ttl=0.01)
+    cache.set(("a",), 1)
+    time.sleep(0.02)
+    assert cache.get(("a",)) is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_prefix_invalidation():
+    cache = MemoryCache(max_bytes=1000, ttl=60)
+    cache.set(content_key("isha", 1, 1, "meaning", Language.en), 1)
+    cache.set(content_key("isha", 1, 1, "bhashyam", Language.en, Philosophy.advaita), 2)
+    cache.set(content_key("isha", 1, 2, "meaning", Language.en), 3)
+    cache.invalidate("isha", 1, 1, "meaning")
+    assert cache.get(("isha", 1, 1, "meaning", "en")) is None
+    assert cache.get(("isha", 1, 1, "bhashyam", "en", "adv")) == 2
+    cache.invalidate("isha")
+    assert cache.stats()["entries"] == 0
+
+
+def test_content_reads_are_cached(client, authorized_admin):
+    response = authorized_admin.post("/projects/?name=test&description=testdesc", json={"name": "test"})
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/test/sutras/", json={"sutra": {"chapter": 1, "number": 1, "text": "Sutra"}, "project": {"name": "test"}})
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/test/sutras/test/1/1/meaning", json={"language": "en", "text": "Old meaning"})
+    assert response.status_code == status.HTTP_201_CREATED
+
+    assert client.get("/test/sutras/test/1/1/meaning?lang=en").json()["text"] == "Old meaning"
+    before = authorized_admin.get("/metrics/cache").json()
+    assert client.get("/test/sutras/test/1/1/meaning?lang=en").json()["text"] == "Old meaning"
+    assert authorized_admin.get("/metrics/cache").json()["hits"] == before["hits"] + 1
+
+    # Writes invalidate the cached entry
+    response = authorized_admin.put("/test/sutras/test/1/1/meaning?lang=en", json={"language": "en", "text": "New meaning"})
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert client.get("/test/sutras/test/1/1/meaning?lang=en").json()["text"] == "New meaning"
+    assert client.get("/test/sutras/test/1/1/full").json()["meanings"][0]["text"] == "New meaning"
+
+    response = authorized_admin.delete("/test/sutras/test/1/1")
+    assert response.status_code == status.HTTP_200_OK
+    assert client.get("/test/sutras/test/1/1/meaning?lang=en").status_code == status.HTTP_404_NOT_FOUND
+    assert client.get("/test/sutras/test/1/1/full").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_redis_cache_is_shared_between_workers(redis_server):
+    first, second = make_redis_cache(redis_server.url), make_redis_cache(redis_server.url)
+    try:
+        key = content_key("isha", 1, 1, "meaning", Language.en)
+        first.set(key, {"text": "Old meaning"})
+        assert second.get(key) == {"text": "Old meaning"}
+        assert second.local.get(key) == {"text": "Old meaning"}
+        # Served from the local copy: no further GET reaches the server
+        gets = redis_server.commands.count("GET")
+        assert second.get(key) == {"text": "Old meaning"}
+        assert redis_server.commands.count("GET") == gets
+
+        # An invalidation in one worker reaches the local copies of the others
+        first.invalidate("isha", 1, 1, "meaning")
+        wait_until(lambda: second.local.get(key) is None)
+        assert second.get(key) is None
+        assert first.get(key) is None
+
+        first.set(key, {"text": "New meaning"})
+        first.set(content_key("isha", 1, 2, "meaning", Language.en), {"text": "Other verse"})
+        assert second.get(key) == {"text": "New meaning"}
+        first.invalidate("isha", 1, 1)
+        wait_until(lambda: second.local.get(key) is None)
+        assert second.get(("isha", 1, 2, "meaning", "en")) == {"text": "Other verse"}
+
+        second.clear()
+        wait_until(lambda: first.local.stats()["entries"] == 0)
+        assert first.get(("isha", 1, 2, "meaning", "en")) is None
+        assert first.stats()["backend"] == "redis"
+    finally:
+        first.close()
+        second.close()
+
+
+def test_redis_cache_degrades_to_misses_without_server():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    cache = RedisCache(url=f"redis://127.0.0.1:{port}/0", namespace="test", ttl=60, local_max_bytes=1000, local_ttl=60)
+    try:
+        assert cache.get_or_load(("isha", 1, 1, "sutra"), lambda: {"text": "Sutra"}) == {"text": "Sutra"}
+        cache.local.clear()
+        assert cache.get(("isha", 1, 1, "sutra")) is None
+        cache.invalidate("isha")
+        assert cache.stats()["errors"] >= 3
+    finally:
+        cache.close()
+
+
+def test_redis_invalidation_drops_entries_stored_meanwhile(redis_server, monkeypatch):
+    cache = make_redis_cache(redis_server.url)
+    try:
+        cache.set(content_key("isha", 1, 1, "meaning", Language.en), {"text": "Meaning"})
+        other = content_key("isha", 1, 1, "bhashyam", Language.en, Philosophy.advaita)
+        execute, raced = redis_server.execute, []
+
+        def racing(handler, command, args):
+            reply = execute(handler, command, args)
+            if command == "SMEMBERS" and not raced:
+                # Another worker caches an entry of the verse between the read and the delete
+                raced.append(command)
+                execute(handler, "SET", [cache._key(other).encode(), b'"Bhashyam"'])
+                execute(handler, "SADD", [cache._tag(("isha", 1, 1)).encode(), cache._key(other).encode()])
+            return reply
+
+        monkeypatch.setattr(redis_server, "execute", racing)
+        cache.invalidate("isha", 1, 1)
+        assert raced
+        assert cache.get(other) is None
+        assert cache.get(("isha", 1, 1, "meaning", "en")) is None
+    finally:
+        cache.close()
+
+
+def test_load_invalidated_meanwhile_is_not_stored():
+    cache = MemoryCache(max_bytes=1000, ttl=60)
+    key = content_key("isha", 1, 1, "meaning", Language.en)
+    generation = cache.generation(key)
+    cache.invalidate("isha", 1, 1)  # A write commits while the old row is being read
+    cache.set(key, {"text": "Old meaning"}, generation)
+    assert cache.get(key) is None
+    cache.set(key, {"text": "New meaning"}, cache.generation(key))
+    assert cache.get(key) == {"text": "New meaning"}
+
+
+def test_redis_load_invalidated_by_another_worker_is_not_stored(redis_server):
+    first, second = make_redis_cache(redis_server.url), make_redis_cache(redis_server.url)
+    try:
+        key = content_key("isha", 1, 1, "meaning", Language.en)
+        generation = first.generation(key)
+        second.invalidate("isha", 1, 1, "meaning")
+        first.set(key, {"text": "Old meaning"}, generation)
+        assert first.get(key) is None and second.get(key) is None
+        first.set(key, {"text": "New meaning"}, first.generation(key))
+        assert second.get(key) == {"text": "New meaning"}
+    finally:
+        first.close()
+        second.close()
@@ -0,0 +1,69 @@
+from sqlalchemy import create_engine, inspect, text
+
+from app.isha import models as isha_models
+from app.migrations import upgrade
+
+
+def legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE meanings (id INTEGER PRIMARY KEY, language VARCHAR(50) NOT NULL, text TEXT NOT NULL, sutra_id INTEGER)"))
+    return engine
+
+
+def test_upgrade_creates_missing_indexes(tmp_path):
+    engine = legacy_engine(tmp_path)
+    changes = upgrade(engine)
+    assert "created index ix_meanings_sutra_language" in changes
+    assert "created table sutras" in changes
+
+    indexes = {index["name"]: index for index in inspect(engine).get_indexes("meanings")}
+    assert indexes["ix_meanings_sutra_language"]["unique"]
+    # Running it again is a no-op
+    assert upgrade(engine) == []
+
+
+def test_upgrade_skips_unique_index_with_duplicates(tmp_path):
+    engine = legacy_engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO meanings (language, text, sutra_id) VALUES ('en', 'a', 1), ('en', 'b', 1)"))
+    changes = upgrade(engine)
+    assert any(change.startswith("skipped unique index ix_meanings_sutra_language") for change in changes)
+
+    indexes = {index["name"] for index in inspect(engine).get_indexes("meanings")}
+    assert "ix_meanings_sutra_language" not in indexes
+
+
+def test_upgrade_adds_version_columns(tmp_path):
+    engine = legacy_engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO meanings (language, text, sutra_id) VALUES ('en', 'a', 1)"))
+    changes = upgrade(engine)
+    assert "added column meanings.version" in changes
+    assert "added column meanings.updated_at" in changes
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version, updated_at FROM meanings")).one() == (1, None)
+
+
+def test_upgrade_computes_content_stats_and_search_index(tmp_path):
+    engine = legacy_engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE projects (id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL)"))
+        conn.execute(text("CREATE TABLE sutras (id INTEGER PRIMARY KEY, chapter INTEGER NOT NULL, number INTEGER NOT NULL, text TEXT NOT NULL, project_id INTEGER)"))
+        conn.execute(text("INSERT INTO projects (id, name) VALUES (1, 'test')"))
+        conn.execute(text("INSERT INTO sutras (id, chapter, number, text, project_id) VALUES (1, 1, 1, 'a', 1), (2, 1, 2, 'b', 1)"))
+        conn.execute(text("INSERT INTO meanings (language, text, sutra_id) VALUES ('en', 'a', 1)"))
+    # Created at startup, and written to by the application before the upgrade ran
+    isha_models.ContentStat.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO content_stats (project_id, chapter, kind, language, philosophy, count, coverage) VALUES (1, 1, 'sutra', '', '', 1, X'04')"))
+
+    changes = upgrade(engine)
+    assert changes[-2:] == ["computed 2 content statistics rows", "indexed 3 rows for search"]
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT kind, count FROM content_stats ORDER BY kind")).all() == [("meaning", 1), ("sutra", 2)]
+        assert conn.execute(text("SELECT COUNT(*) FROM search_documents")).scalar() == 3
+    # Only once: statistics and index are maintained by the application afterwards
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM content_stats"))
+    assert upgrade(engine) == []
@@ -0,0 +1,41 @@
+import pytest
+from fastapi import status
+from sqlalchemy import create_engine, exc
+
+from app.pool import InstrumentedQueuePool, get_pool_metrics
+
+
+def test_pool_metrics_track_checkouts_and_saturation(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+        pool_logging_name="test_pool",
+    )
+    metrics = get_pool_metrics("test_pool")
+    metrics.reset()
+
+    with engine.connect():
+        snapshot = metrics.snapshot()
+        assert snapshot["checked_out"] == 1
+        assert snapshot["saturation"] == 1.0
+        # The pool is exhausted: the next checkout waits for pool_timeout and fails
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    snapshot = metrics.snapshot()
+    assert snapshot["checked_out"] == 0
+    assert snapshot["checkouts"] == 1
+    assert snapshot["timeouts"] == 1
+    assert snapshot["peak_checked_out"] == 1
+    assert sum(snapshot["wait_histogram"].values()) == 1
+    engine.dispose()
+
+
+def test_pool_metrics_endpoint(client, authorized_admin):
+    assert client.get("/metrics/pool").status_code == status.HTTP_401_UNAUTHORIZED
+    response = authorized_admin.get("/metrics/pool")
+    assert response.status_code == status.HTTP_200_OK
+    assert {"saturation", "checkouts", "timeouts", "wait_max_ms"} <= set(response.json()["primary"])
@@ -2,6 +2,10 @@ import re
 
 import pytest
 from fastapi import status
+from sqlalchemy import event
+
+from app.models import Project
+from tests.conftest import async_engine
 
 @pytest.fixture
 def project_data():
@@ -30,3 +34,68 @@ def test_create_project_duplicate(authorized_admin, project_data):
 def test_get_projects(authorized_admin):
     response = authorized_admin.get("/projects/")
     assert response.status_code == status.HTTP_200_OK
+
+def test_get_projects_paginated(authorized_admin):
+    for name in ["first", "second", "third"]:
+        response = authorized_admin.post(f"/projects/?name={name}&description=testdesc", json={"name": name})
+        assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.get("/projects/?limit=2&include_total=true")
+    assert [project["name"] for project in response.json()] == ["first", "second"]
+    assert response.headers["X-Total-Count"] == "3"
+    response = authorized_admin.get(f"/projects/?limit=2&cursor={response.headers['X-Next-Cursor']}")
+    assert [project["name"] for project in response.json()] == ["third"]
+    assert "X-Next-Cursor" not in response.headers
+
+def test_content_is_served_per_project(authorized_admin, client):
+    assert client.get("/mundaka/healthz").status_code == status.HTTP_404_NOT_FOUND
+    assert client.get("/mundaka/sutras/total-count").status_code == status.HTTP_404_NOT_FOUND
+
+    # A new project is served as soon as it is created, without another router
+    response = authorized_admin.post("/projects/?name=mundaka&description=mundakopanishad", json={"name": "mundaka"})
+    assert response.status_code == status.HTTP_201_CREATED
+    assert client.get("/mundaka/healthz").json()["status"] == "mundaka - available"
+    response = authorized_admin.post("/mundaka/sutras/", json={"sutra": {"chapter": 1, "number": 1, "text": "Sutra"}, "project": {"name": "mundaka"}})
+    assert response.status_code == status.HTTP_201_CREATED
+    assert client.get("/mundaka/sutras/total-count").json() == 1
+
+    response = authorized_admin.delete("/projects_by_name/mundaka")
+    assert response.status_code == status.HTTP_200_OK
+    assert client.get("/mundaka/healthz").status_code == status.HTTP_404_NOT_FOUND
+
+def test_renamed_project_is_served_under_its_new_name(authorized_admin, client):
+    response = authorized_admin.post("/projects/?name=test&description=testdesc", json={"name": "test"})
+    assert response.status_code == status.HTTP_201_CREATED
+    project_id = authorized_admin.get("/projects_by_name/test").json()["id"]
+    authorized_admin.post("/test/sutras/", json={"sutra": {"chapter": 1, "number": 1, "text": "Sutra"}, "project": {"name": "test"}})
+    assert client.get("/test/sutras/test/1/1").status_code == status.HTTP_200_OK
+
+    response = authorized_admin.put(f"/projects/{project_id}", json={"name": "renamed", "description": "renamed"})
+    assert response.status_code == status.HTTP_200_OK
+    assert client.get("/test/sutras/test/1/1").status_code == status.HTTP_404_NOT_FOUND
+    assert client.get("/renamed/sutras/renamed/1/1").json()["text"] == "Sutra"
+
+def test_reload_projects(authorized_admin, client, session, monkeypatch):
+    monkeypatch.setattr("app.registry.MISS_RELOAD_SECONDS", 3600)
+    authorized_admin.post("/projects/?name=test&description=testdesc", json={"name": "test"})
+    assert client.get("/test/healthz").status_code == status.HTTP_200_OK
+    # Added behind the application's back: unknown until the registry is reloaded
+    session.add(Project(name="other"))
+    session.commit()
+    assert client.get("/other/healthz").status_code == status.HTTP_404_NOT_FOUND
+    assert client.post("/projects/reload").status_code == status.HTTP_401_UNAUTHORIZED
+    assert authorized_admin.post("/projects/reload").json() == {"projects": ["other", "test"]}
+    assert client.get("/other/healthz").status_code == status.HTTP_200_OK
+
+def test_reads_do_not_query_projects(authorized_admin, client):
+    authorized_admin.post("/projects/?name=test&description=testdesc", json={"name": "test"})
+    authorized_admin.post("/test/sutras/", json={"sutra": {"chapter": 1, "number": 1, "text": "Sutra"}, "project": {"name": "test"}})
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        assert client.get("/test/sutras/").status_code == status.HTTP_200_OK
+        assert client.get("/test/sutras/total-count").json() == 1
+        assert client.get("/test/sutras/test/1/1").status_code == status.HTTP_200_OK
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", listener)
+    assert statements and not any("FROM projects" in statement for statement in statements)
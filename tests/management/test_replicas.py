@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+from fastapi import status
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from starlette.requests import Request
+
+from app.cache import content_cache
+from app.database import Base, get_async_db, to_async_url
+from app.isha import models
+from app.isha.routers import utils
+from app.main import app
+from app.models import Project
+from app.replicas import STICKY_COOKIE, ReadRouter
+from tests.conftest import async_engine as primary_engine
+
+
+def make_request(cookie=None):
+    headers = [(b"cookie", f"{STICKY_COOKIE}={cookie}".encode())] if cookie else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+@pytest.fixture()
+def replica_urls(tmp_path):
+    # SQLite files standing in for replicas; only the first one has the sutra
+    urls = []
+    for index in range(2):
+        url = f"sqlite:///{tmp_path / f'replica{index}.db'}"
+        engine = create_engine(url)
+        Base.metadata.create_all(engine)
+        with Session(engine) as db:
+            project = Project(name="test")
+            db.add(project)
+            db.flush()
+            if index == 0: db.add(models.Sutra(chapter=1, number=1, text="Replica sutra", project_id=project.id))
+            db.commit()
+        engine.dispose()
+        urls.append(url)
+    return urls
+
+
+@pytest.fixture()
+def replicas(replica_urls):
+    return [create_async_engine(to_async_url(url), poolclass=NullPool) for url in replica_urls]
+
+
+def test_round_robin_and_sticky_reads(replicas):
+    router = ReadRouter(primary_engine, replicas)
+    assert [router.choose(make_request()) for _ in range(4)] == replicas * 2
+    assert router.choose(make_request(cookie="9999999999")) is primary_engine
+    # Expired or garbled stickiness is ignored
+    assert router.choose(make_request(cookie="1")) in replicas
+    assert router.choose(make_request(cookie="x")) in replicas
+    assert ReadRouter(primary_engine).choose(make_request()) is primary_engine
+
+
+def test_least_connections(replica_urls):
+    engines = [create_async_engine(to_async_url(url), poolclass=AsyncAdaptedQueuePool) for url in replica_urls]
+    router = ReadRouter(primary_engine, engines, strategy="least_connections")
+
+    async def choose_while_first_is_busy():
+        async with engines[0].connect():
+            return {router.choose() for _ in range(4)}
+
+    assert asyncio.run(choose_while_first_is_busy()) == {engines[1]}
+    assert {router.choose() for _ in range(4)} == set(engines)
+    for engine in engines: asyncio.run(engine.dispose())
+
+
+def test_reads_go_to_replicas_until_the_client_writes(client, authorized_admin, replicas):
+    router = ReadRouter(primary_engine, replicas)
+
+    async def override_get_async_db(request: Request):
+        async with router.session(request) as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+
+    response = authorized_admin.post("/projects/?name=test&description=testdesc", json={"name": "test"})
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/test/sutras/", json={"sutra": {"chapter": 1, "number": 1, "text": "Primary sutra"}, "project": {"name": "test"}})
+    assert response.status_code == status.HTTP_201_CREATED
+    assert STICKY_COOKIE in response.cookies
+
+    # The editor reads their own write from the primary
+    assert client.get("/test/sutras/test/1/1").json()["text"] == "Primary sutra"
+
+    # Other readers are spread over the replicas
+    client.cookies.clear()
+    results = []
+    for _ in range(2):
+        content_cache.clear()
+        response = client.get("/test/sutras/test/1/1")
+        results.append(response.json()["text"] if response.status_code == status.HTTP_200_OK else response.status_code)
+    assert results == ["Replica sutra", status.HTTP_404_NOT_FOUND]
+
+
+def test_reads_go_to_the_primary_after_a_content_write(client, authorized_admin, replicas):
+    router = ReadRouter(primary_engine, replicas[:1], lag=10, written_at=lambda: content_cache.invalidated_at)
+
+    async def override_get_async_db(request: Request):
+        async with router.session(request) as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+
+    response = authorized_admin.post("/projects/?name=test&description=testdesc", json={"name": "test"})
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/test/sutras/", json={"sutra": {"chapter": 1, "number": 1, "text": "Primary sutra"}, "project": {"name": "test"}})
+    assert response.status_code == status.HTTP_201_CREATED
+
+    # A client without the sticky cookie (e.g. a bearer token) reads the write from the primary
+    client.cookies.clear()
+    assert client.get("/test/sutras/test/1/1").json()["text"] == "Primary sutra"
+
+    # Once the replicas have caught up, reads go to them again
+    router.lag = 0
+    content_cache.clear()
+    assert client.get("/test/sutras/test/1/1").json()["text"] == "Replica sutra"
+
+
+def test_content_read_within_the_lag_is_not_cached(client, authorized_admin, replicas, monkeypatch):
+    # As if the invalidation had not reached the worker choosing the session yet
+    router = ReadRouter(primary_engine, replicas[:1])
+    monkeypatch.setattr(utils, "read_router", router)
+
+    async def override_get_async_db(request: Request):
+        async with router.session(request) as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+
+    response = authorized_admin.post("/projects/?name=test&description=testdesc", json={"name": "test"})
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.post("/test/sutras/", json={"sutra": {"chapter": 1, "number": 1, "text": "Primary sutra"}, "project": {"name": "test"}})
+    assert response.status_code == status.HTTP_201_CREATED
+
+    client.cookies.clear()
+    assert client.get("/test/sutras/test/1/1").json()["text"] == "Replica sutra"
+    assert content_cache.stats()["entries"] == 0
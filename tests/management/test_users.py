@@ -66,6 +66,16 @@ def test_admin_specific_access(authorized_client, user_data):
     assert response.status_code == status.HTTP_403_FORBIDDEN
 
 
+def test_get_users_paginated(authorized_admin, user_data):
+    response = authorized_admin.post("/users", json=user_data("second@example.com"))
+    assert response.status_code == status.HTTP_201_CREATED
+    response = authorized_admin.get("/users/?limit=1&include_total=true")
+    assert [user["email"] for user in response.json()] == ["admin@example.com"]
+    assert response.headers["X-Total-Count"] == "2"
+    response = authorized_admin.get(f"/users/?limit=1&cursor={response.headers['X-Next-Cursor']}")
+    assert [user["email"] for user in response.json()] == ["second@example.com"]
+
+
 # def test_user_password_change(client, test_user):
 #     # Log in and change password
 #     new_password_data = {
@@ -79,3 +89,4 @@ def test_admin_specific_access(authorized_client, user_data):
 #     login_data = {"email": test_user["email"], "password": "newpassword123"}
 #     response = client.post("/login", json=login_data)
 #     assert response.status_code == status.HTTP_200_OK
+